@@ -0,0 +1,188 @@
+# api/async_client.py
+import asyncio
+import time
+
+import aiohttp
+
+from api.cache import chave_cache, get_response_cache, ttl_para
+from api.coalescing import NAO_ENCONTRADO, inflight
+from api.codec import decode_response, DecodeError
+from api.client import (
+    calcular_retry_after,
+    tratar_resposta_sem_sucesso,
+    endpoint_de,
+    API_REQUESTS,
+    API_RATE_LIMITED,
+    API_RETRIES,
+    API_FAILURES,
+    API_BYTES,
+    API_CACHE_HITS,
+    API_COALESCED,
+    API_LATENCY,
+    API_RATE_WAIT,
+)
+from api.quota import quota
+from api.rate_limiter import rate_limiter
+from utils.profiling import section
+from config.settings import (
+    BETSAPI_TOKEN,
+    BASE_URL_V1,
+    BASE_URL_V2,
+    MAX_RETRIES,
+    RETRY_DELAY_SECONDS,
+    ASYNC_MAX_IN_FLIGHT,
+)
+
+
+class AsyncBetsAPIClient:
+    """
+    Cliente asyncio com a mesma interface do BetsAPIClient.
+
+    Usa o mesmo token bucket do processo, então centenas de requisições podem
+    ficar em voo numa única thread sem ultrapassar a cota do plano.
+
+    Uso:
+        async with AsyncBetsAPIClient() as client:
+            paginas = await asyncio.gather(*(client.get_ended_events(page=p) for p in (1, 2, 3)))
+    """
+
+    def __init__(self, max_in_flight=ASYNC_MAX_IN_FLIGHT):
+        self.token = BETSAPI_TOKEN
+        self.base_url_v1 = BASE_URL_V1
+        self.base_url_v2 = BASE_URL_V2
+        self.max_in_flight = max_in_flight
+        self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Cria a sessão HTTP (uma por event loop)."""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _make_request(self, url, params=None, final=False, event_timestamp=None):
+        """Equivalente assíncrono de BetsAPIClient._make_request (inclusive o cache em disco)."""
+        if self.session is None:
+            await self.open()
+        params = dict(params or {})
+
+        endpoint = endpoint_de(url)
+        cache = get_response_cache()
+        ttl = ttl_para(url, params, final, event_timestamp)
+        if cache is not None and ttl != 0:
+            cached = cache.get(url, params)
+            if cached is not None:
+                API_CACHE_HITS.inc(endpoint=endpoint)
+                return cached
+
+        # Compartilha a requisição com chamadas idênticas em voo (deste loop, de outros ou do cliente síncrono)
+        resultado, origem = await inflight.do_async(
+            chave_cache(url, params), lambda: self._requisitar(url, params, endpoint, cache, ttl)
+        )
+        if origem is not None:
+            API_COALESCED.inc(endpoint=endpoint, reason=origem)
+        return None if resultado is NAO_ENCONTRADO else resultado
+
+    async def _requisitar(self, url, params, endpoint, cache, ttl):
+        """Requisição HTTP com retries (sem coalescência); grava no cache em disco se 'ttl' permitir."""
+        params["token"] = self.token
+
+        for attempt in range(MAX_RETRIES):
+            if attempt > 0:
+                API_RETRIES.inc(endpoint=endpoint)
+            try:
+                with API_RATE_WAIT.time(), section("rate_limit_wait", cpu=False):
+                    await quota.wait_async()
+                    await rate_limiter.acquire_async(low_priority=quota.low_priority())
+
+                inicio = time.perf_counter()
+                async with self.session.get(url, params=params) as response:
+                    with section("http_wait", cpu=False):
+                        corpo = await response.read()
+                    API_LATENCY.observe(time.perf_counter() - inicio, endpoint=endpoint)
+                    API_REQUESTS.inc(endpoint=endpoint, status=response.status)
+                    quota.record(endpoint, response.status, response.headers)
+                    API_BYTES.inc(len(corpo), endpoint=endpoint)
+
+                    if response.status == 429:
+                        API_RATE_LIMITED.inc(endpoint=endpoint)
+                        retry_after = calcular_retry_after(response.headers, attempt)
+                        print(f"Aviso: Rate limit atingido (429). Pausando todas as requisições por {retry_after} segundos...")
+                        rate_limiter.pause(retry_after)
+                        continue
+
+                    response.raise_for_status()
+                    with section("json_decode"):
+                        data = decode_response(endpoint, corpo)
+
+                if data.get("success") != 1:
+                    resultado, repetir = tratar_resposta_sem_sucesso(data, url, params)
+                    if not repetir:
+                        return resultado
+                    await asyncio.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
+                    continue
+
+                if cache is not None and ttl != 0:
+                    cache.put(url, params, data, ttl)
+                return data
+
+            except asyncio.TimeoutError:
+                API_REQUESTS.inc(endpoint=endpoint, status="timeout")
+                quota.record(endpoint, "timeout")  # Pode ter sido contada pela API
+                print(f"Erro: Timeout na requisição para {url}. Tentativa {attempt + 1}/{MAX_RETRIES}")
+                await asyncio.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
+            except aiohttp.ClientError as e:
+                print(f"Erro na requisição para {url}: {e}. Tentativa {attempt + 1}/{MAX_RETRIES}")
+                await asyncio.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
+            except DecodeError as e:
+                print(f"Erro ao decodificar JSON da resposta de {url}: {e}")
+                break  # Não tentar novamente se o JSON for inválido
+            except Exception as e:
+                print(f"Erro inesperado durante a requisição para {url}: {e}")
+                break
+
+        API_FAILURES.inc(endpoint=endpoint)
+        print(f"Erro: Falha ao realizar requisição para {url} após {MAX_RETRIES} tentativas.")
+        return None
+
+    async def get_ended_events(self, page=1, sport_id=1, skip_esports=0, day_str=None, league_id=None):
+        """Busca eventos encerrados. Mesmos parâmetros de BetsAPIClient.get_ended_events."""
+        url = f"{self.base_url_v1}/events/ended"
+        params = {"sport_id": sport_id, "skip_esports": skip_esports, "page": page}
+        if day_str:
+            params["day"] = day_str
+        if league_id:
+            params["league_id"] = league_id
+        return await self._make_request(url, params)
+
+    async def get_event_odds_summary(self, event_id, final=False, event_timestamp=None):
+        """Busca o resumo das odds para um evento específico."""
+        if not event_id:
+            return None
+        url = f"{self.base_url_v2}/event/odds/summary"
+        return await self._make_request(url, {"event_id": event_id}, final=final, event_timestamp=event_timestamp)
+
+    async def get_event_odds(self, event_id, final=False, event_timestamp=None):
+        """Busca o histórico completo de odds de um evento."""
+        if not event_id:
+            return None
+        url = f"{self.base_url_v2}/event/odds"
+        return await self._make_request(url, {"event_id": event_id}, final=final, event_timestamp=event_timestamp)
+
+    async def get_event_details(self, event_id, final=False, event_timestamp=None):
+        """Busca detalhes de um evento específico, incluindo placar."""
+        if not event_id:
+            return None
+        url = f"{self.base_url_v1}/event/view"
+        return await self._make_request(url, {"event_id": event_id}, final=final, event_timestamp=event_timestamp)
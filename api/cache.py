@@ -0,0 +1,206 @@
+# api/cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+from api import codec
+from config.settings import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_MAX_MB,
+    CACHE_IMMUTABLE_AFTER_DAYS,
+    CACHE_RECENT_TTL_SECONDS,
+)
+
+NAO_CACHEAR = 0  # TTL que indica que a resposta não deve ser cacheada
+NUNCA_EXPIRA = None  # TTL para respostas imutáveis
+
+
+def chave_cache(url, params):
+    """Chave endereçada pelo conteúdo: endpoint + parâmetros ordenados, sem o token."""
+    itens = sorted((k, str(v)) for k, v in (params or {}).items() if k != "token")
+    bruto = url + "?" + "&".join(f"{k}={v}" for k, v in itens)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def _ttl_pela_idade(dia):
+    """Dias com mais de CACHE_IMMUTABLE_AFTER_DAYS nunca expiram; hoje/ontem usam um TTL curto."""
+    idade = (datetime.now(timezone.utc).date() - dia).days
+    return NUNCA_EXPIRA if idade >= CACHE_IMMUTABLE_AFTER_DAYS else CACHE_RECENT_TTL_SECONDS
+
+
+def ttl_para(url, params, final=False, event_timestamp=None):
+    """
+    Regras de TTL por endpoint. Retorna segundos, NUNCA_EXPIRA ou NAO_CACHEAR.
+    - final=True: o jogo já terminou. A idade vem de 'event_timestamp' e segue a
+      mesma regra de /events/ended: a BetsAPI ainda completa odds e placar de jogos
+      de hoje/ontem, então só jogos mais antigos nunca expiram (sem horário: TTL curto).
+    - /events/ended com 'day': dias com mais de CACHE_IMMUTABLE_AFTER_DAYS nunca expiram;
+      dias recentes usam um TTL curto. Sem 'day' a página muda a todo momento.
+    """
+    if final:
+        if event_timestamp is None:
+            return CACHE_RECENT_TTL_SECONDS
+        return _ttl_pela_idade(event_timestamp.astimezone(timezone.utc).date())
+    if url.endswith("/events/ended"):
+        day_str = (params or {}).get("day")
+        if not day_str:
+            return NAO_CACHEAR
+        try:
+            dia = datetime.strptime(str(day_str), "%Y%m%d").date()
+        except ValueError:
+            return NAO_CACHEAR
+        return _ttl_pela_idade(dia)
+    return NAO_CACHEAR
+
+
+def resposta_cacheavel(url, data):
+    """
+    Resumo de odds sem as odds 'start' da Bet365 não é cacheado: a API costuma
+    preencher depois, e o cache faria o jogo ficar sem odds para sempre.
+    """
+    if url.endswith("/event/odds/summary"):
+        bet365 = ((data or {}).get("results") or {}).get("Bet365") or {}
+        return bool((bet365.get("odds") or {}).get("start"))
+    return True
+
+
+class ResponseCache:
+    """
+    Cache de respostas da API em SQLite, com JSON comprimido (zlib).
+    Limitado por tamanho com remoção LRU e contadores de hit/miss.
+    Seguro para uso entre threads (uma conexão protegida por lock).
+    """
+
+    def __init__(self, path, max_bytes):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.execute("PRAGMA synchronous=NORMAL;")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            );
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);")
+        self._db.commit()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses;").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, url, params):
+        """Retorna a resposta decodificada ou None (miss ou expirada)."""
+        key = chave_cache(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT body, size, expires_at FROM responses WHERE key = ?;", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, size, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._db.execute("DELETE FROM responses WHERE key = ?;", (key,))
+                self._db.commit()
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?;", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return codec.loads(zlib.decompress(body))
+
+    def put(self, url, params, data, ttl):
+        """Armazena a resposta. ttl=None nunca expira; ttl=0 (ou resposta incompleta) não armazena."""
+        if ttl == NAO_CACHEAR or not resposta_cacheavel(url, data):
+            return
+        key = chave_cache(url, params)
+        body = zlib.compress(codec.dumps_bytes(data))
+        now = time.time()
+        expires_at = None if ttl is NUNCA_EXPIRA else now + ttl
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?;", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, url, body, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?);",
+                (key, url, body, len(body), expires_at, now),
+            )
+            self._total_bytes += len(body) - (old[0] if old else 0)
+            self.stores += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Remove as entradas menos usadas até ficar em 90% do limite (chamar com lock)."""
+        alvo = int(self.max_bytes * 0.9)
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_access ASC;").fetchall()
+        removidas = []
+        for key, size in rows:
+            if self._total_bytes <= alvo:
+                break
+            removidas.append((key,))
+            self._total_bytes -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?;", removidas)
+        self.evictions += len(removidas)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "size_bytes": self._total_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Retorna o cache do processo (ou None se desabilitado/indisponível)."""
+    global _cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ResponseCache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Aviso: Cache de respostas indisponível ({e}). Seguindo sem cache.")
+                return None
+        return _cache
+
+
+def print_cache_stats():
+    """Imprime os contadores do cache, se ele foi usado nesta execução."""
+    if _cache is None:
+        return
+    stats = _cache.stats()
+    print(
+        f"Cache de respostas: {stats['hits']} hits, {stats['misses']} misses "
+        f"({stats['hit_rate'] * 100:.1f}%), {stats['stores']} gravações, {stats['evictions']} remoções, "
+        f"{stats['size_bytes'] / (1024 * 1024):.1f} MB"
+    )
@@ -1,16 +1,65 @@
 # api/client.py
 import requests
 import time
-import json
+from urllib.parse import urlsplit
+from api.cache import chave_cache, get_response_cache, ttl_para
+from api.coalescing import NAO_ENCONTRADO, inflight
+from api.codec import decode_response, DecodeError
+from api.quota import quota
+from api.rate_limiter import rate_limiter
+from utils import metrics
+from utils.profiling import section
 from config.settings import (
     BETSAPI_TOKEN,
     BASE_URL_V1,
     BASE_URL_V2,
-    REQUEST_DELAY_SECONDS,
     MAX_RETRIES,
     RETRY_DELAY_SECONDS,
 )
 
+# Métricas compartilhadas pelos clientes sync e async (label 'endpoint' = caminho da URL)
+API_REQUESTS = metrics.counter("betsapi_api_requests_total", "Requisições HTTP à BetsAPI por endpoint e status")
+API_RATE_LIMITED = metrics.counter("betsapi_api_rate_limited_total", "Respostas 429 recebidas por endpoint")
+API_RETRIES = metrics.counter("betsapi_api_retries_total", "Novas tentativas de requisição por endpoint")
+API_FAILURES = metrics.counter("betsapi_api_failures_total", "Requisições que falharam após todas as tentativas")
+API_BYTES = metrics.counter("betsapi_api_bytes_received_total", "Bytes de corpo de resposta recebidos por endpoint")
+API_CACHE_HITS = metrics.counter("betsapi_api_cache_hits_total", "Respostas servidas do cache em disco por endpoint")
+API_COALESCED = metrics.counter(
+    "betsapi_api_coalesced_total", "Requisições evitadas por endpoint (chamada idêntica em voo ou 'event not found' recente)"
+)
+API_LATENCY = metrics.histogram("betsapi_api_request_seconds", "Latência das requisições HTTP por endpoint")
+API_RATE_WAIT = metrics.histogram("betsapi_api_rate_limiter_wait_seconds", "Espera por um token do limitador de taxa")
+
+
+def endpoint_de(url):
+    """Caminho da URL usado como label das métricas (ex: /v1/events/ended)."""
+    return urlsplit(url).path or url
+
+
+def calcular_retry_after(headers, attempt):
+    """Lê o header Retry-After (em segundos) ou usa o backoff padrão."""
+    default = RETRY_DELAY_SECONDS * (attempt + 2)
+    try:
+        return int(headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+
+def tratar_resposta_sem_sucesso(data, url, params):
+    """
+    Interpreta uma resposta com success != 1.
+    Retorna (resultado, deve_tentar_novamente). Usado pelos clientes sync e async.
+    "event not found" retorna NAO_ENCONTRADO (cache negativo de api.coalescing).
+    """
+    error_message = data.get("error", "Erro desconhecido da API (success != 1)")
+    print(f"Erro na resposta da API para {url} com params {params}: {error_message}")
+    if "event not found" in error_message.lower():
+        return NAO_ENCONTRADO, False  # Evento não encontrado é um caso esperado, não um erro fatal
+    if "no results" in error_message.lower():  # Tratar "no results for ..." como sucesso vazio
+        print(f"Info: Nenhum resultado encontrado para {url} com params {params} ({error_message})")
+        return {"success": 1, "results": [], "pager": None}, False  # Retorna estrutura vazia
+    return None, True
+
 
 class BetsAPIClient:
     def __init__(self):
@@ -19,50 +68,83 @@ class BetsAPIClient:
         self.base_url_v2 = BASE_URL_V2
         self.session = requests.Session()  # Usar sessão para melhor performance e reuso de conexão
 
-    def _make_request(self, url, params=None):
-        """Método interno para realizar requisições com tratamento de erros e retries."""
+    def _make_request(self, url, params=None, final=False, event_timestamp=None):
+        """
+        Método interno para realizar requisições com tratamento de erros e retries.
+        Respostas imutáveis (ver api.cache.ttl_para) são servidas do cache em disco;
+        'final=True' indica jogo já encerrado; 'event_timestamp' decide por quanto tempo a resposta vale.
+        """
         if params is None:
             params = {}
+
+        endpoint = endpoint_de(url)
+        cache = get_response_cache()
+        ttl = ttl_para(url, params, final, event_timestamp)
+        if cache is not None and ttl != 0:
+            cached = cache.get(url, params)
+            if cached is not None:
+                API_CACHE_HITS.inc(endpoint=endpoint)
+                return cached
+
+        # Chamadores simultâneos da mesma URL/parâmetros (inclusive de outras threads) dividem uma requisição
+        resultado, origem = inflight.do(
+            chave_cache(url, params), lambda: self._requisitar(url, params, endpoint, cache, ttl)
+        )
+        if origem is not None:
+            API_COALESCED.inc(endpoint=endpoint, reason=origem)
+        return None if resultado is NAO_ENCONTRADO else resultado
+
+    def _requisitar(self, url, params, endpoint, cache, ttl):
+        """Requisição HTTP com retries (sem coalescência); grava no cache em disco se 'ttl' permitir."""
         params["token"] = self.token  # Adiciona token a todos os requests
 
         last_exception = None
         for attempt in range(MAX_RETRIES):
+            if attempt > 0:
+                API_RETRIES.inc(endpoint=endpoint)
             try:
-                # Adiciona um delay antes de cada requisição
-                time.sleep(REQUEST_DELAY_SECONDS)
+                # Aguarda um token do limitador compartilhado por todo o processo (backfill cede a vez)
+                with API_RATE_WAIT.time(), section("rate_limit_wait"):
+                    quota.wait()
+                    rate_limiter.acquire(low_priority=quota.low_priority())
 
-                response = self.session.get(url, params=params, timeout=30)  # Timeout de 30s
+                with API_LATENCY.time(endpoint=endpoint), section("http_wait"):
+                    response = self.session.get(url, params=params, timeout=30)  # Timeout de 30s
+                API_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+                quota.record(endpoint, response.status_code, response.headers)
+                API_BYTES.inc(len(response.content), endpoint=endpoint)
 
                 # Verifica erro 429 (Too Many Requests)
                 if response.status_code == 429:
-                    retry_after = int(response.headers.get("Retry-After", RETRY_DELAY_SECONDS * (attempt + 2)))
-                    print(f"Aviso: Rate limit atingido (429). Esperando {retry_after} segundos...")
-                    time.sleep(retry_after)
+                    API_RATE_LIMITED.inc(endpoint=endpoint)
+                    retry_after = calcular_retry_after(response.headers, attempt)
+                    print(f"Aviso: Rate limit atingido (429). Pausando todas as requisições por {retry_after} segundos...")
+                    rate_limiter.pause(retry_after)  # A próxima tentativa espera no próprio limitador
                     last_exception = requests.exceptions.RequestException("Rate limit atingido (429)")
                     continue  # Tenta novamente
 
                 response.raise_for_status()  # Levanta exceção para erros HTTP (4xx, 5xx)
 
-                data = response.json()
+                with section("json_decode"):
+                    data = decode_response(endpoint, response.content)
 
                 # Verifica a flag 'success' na resposta da API
                 if data.get("success") != 1:
-                    error_message = data.get("error", "Erro desconhecido da API (success != 1)")
-                    print(f"Erro na resposta da API para {url} com params {params}: {error_message}")
-                    # Tratar erros específicos da API aqui se necessário
-                    if "event not found" in error_message.lower():
-                        return None  # Evento não encontrado é um caso esperado, não um erro fatal
-                    if "no results" in error_message.lower():  # Tratar "no results for ..." como sucesso vazio
-                        print(f"Info: Nenhum resultado encontrado para {url} com params {params} ({error_message})")
-                        return {"success": 1, "results": [], "pager": None}  # Retorna estrutura vazia
-                    last_exception = ValueError(f"API Error: {error_message}")
+                    resultado, repetir = tratar_resposta_sem_sucesso(data, url, params)
+                    if not repetir:
+                        return resultado
+                    last_exception = ValueError(f"API Error: {data.get('error')}")
                     # Espera antes de tentar novamente em caso de erro da API
                     time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
                     continue
 
+                if cache is not None and ttl != 0:
+                    cache.put(url, params, data, ttl)
                 return data
 
             except requests.exceptions.Timeout:
+                API_REQUESTS.inc(endpoint=endpoint, status="timeout")
+                quota.record(endpoint, "timeout")  # Pode ter sido contada pela API
                 print(f"Erro: Timeout na requisição para {url}. Tentativa {attempt + 1}/{MAX_RETRIES}")
                 last_exception = requests.exceptions.Timeout("Request timed out")
                 time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
@@ -70,7 +152,7 @@ class BetsAPIClient:
                 print(f"Erro na requisição para {url}: {e}. Tentativa {attempt + 1}/{MAX_RETRIES}")
                 last_exception = e
                 time.sleep(RETRY_DELAY_SECONDS * (attempt + 1))
-            except json.JSONDecodeError as e:
+            except DecodeError as e:
                 print(f"Erro ao decodificar JSON da resposta de {url}: {e}. Conteúdo: {response.text[:200]}...")
                 last_exception = e
                 # Não tentar novamente se o JSON for inválido
@@ -82,6 +164,7 @@ class BetsAPIClient:
                 break
 
         # Se todas as tentativas falharam
+        API_FAILURES.inc(endpoint=endpoint)
         print(f"Erro: Falha ao realizar requisição para {url} após {MAX_RETRIES} tentativas.")
         if last_exception:
             # Poderia logar a exceção aqui
@@ -116,22 +199,60 @@ class BetsAPIClient:
 
         return self._make_request(url, params)
 
-    def get_event_odds_summary(self, event_id):
-        """Busca o resumo das odds para um evento específico."""
+    def get_inplay_events(self, page=1, sport_id=1, skip_esports=0, league_id=None):
+        """
+        Busca os eventos em andamento (mesmo formato de /events/ended, com 'timer').
+        Nunca é cacheado: o placar e o relógio mudam a cada poucos segundos.
+        """
+        url = f"{self.base_url_v1}/events/inplay"
+        params = {"sport_id": sport_id, "skip_esports": skip_esports, "page": page}
+        if league_id:
+            params["league_id"] = league_id
+        return self._make_request(url, params)
+
+    def get_upcoming_events(self, page=1, sport_id=1, skip_esports=0, league_id=None):
+        """
+        Busca os eventos agendados (mesmo formato de /events/ended, sem placar), do mais próximo ao mais distante.
+        Nunca é cacheado: jogos entram, saem e mudam de horário a todo momento.
+        """
+        url = f"{self.base_url_v1}/events/upcoming"
+        params = {"sport_id": sport_id, "skip_esports": skip_esports, "page": page}
+        if league_id:
+            params["league_id"] = league_id
+        return self._make_request(url, params)
+
+    def get_event_odds_summary(self, event_id, final=False, event_timestamp=None):
+        """
+        Busca o resumo das odds para um evento específico.
+        Passar final=True e event_timestamp para jogos já encerrados: a resposta é cacheada
+        (sem expiração depois de CACHE_IMMUTABLE_AFTER_DAYS, ver api.cache.ttl_para).
+        """
         if not event_id:
             return None
         url = f"{self.base_url_v2}/event/odds/summary"
         params = {"event_id": event_id}
         # print(f"Buscando odds summary para Event ID: {event_id}")
-        return self._make_request(url, params)
+        return self._make_request(url, params, final=final, event_timestamp=event_timestamp)
 
-    def get_event_details(self, event_id):
+    def get_event_odds(self, event_id, final=False, event_timestamp=None):
+        """
+        Busca o histórico completo de odds (todos os ticks de cada mercado) de um evento.
+        Passar final=True e event_timestamp para jogos já encerrados: a resposta é cacheada
+        (sem expiração depois de CACHE_IMMUTABLE_AFTER_DAYS, ver api.cache.ttl_para).
+        """
+        if not event_id:
+            return None
+        url = f"{self.base_url_v2}/event/odds"
+        params = {"event_id": event_id}
+        return self._make_request(url, params, final=final, event_timestamp=event_timestamp)
+
+    def get_event_details(self, event_id, final=False, event_timestamp=None):
         """Busca detalhes de um evento específico, incluindo placar."""
         if not event_id:
             return None
         url = f"{self.base_url_v1}/event/view"
         params = {"event_id": event_id}
-        return self._make_request(url, params)
+        return self._make_request(url, params, final=final, event_timestamp=event_timestamp)
 
     # --- Métodos potenciais para busca histórica (se a API permitir) ---
     # def get_historical_events(self, date_from, date_to, sport_id=1, page=1):
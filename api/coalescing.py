@@ -0,0 +1,138 @@
+# api/coalescing.py
+import asyncio
+import threading
+import time
+
+from config.settings import REQUEST_COALESCING_ENABLED, NOT_FOUND_TTL_SECONDS
+
+# Resultado de "event not found": vai para o cache negativo e vira None para o chamador
+NAO_ENCONTRADO = object()
+
+MAX_NAO_ENCONTRADOS = 50000  # Acima disso, descarta as entradas expiradas
+
+
+class _Chamada:
+    """Uma requisição em voo e quem está esperando por ela."""
+
+    __slots__ = ("concluida", "resultado", "erro", "futuros")
+
+    def __init__(self):
+        self.concluida = threading.Event()  # Threads esperando
+        self.resultado = None
+        self.erro = None
+        self.futuros = []  # (loop, asyncio.Future) de corrotinas esperando
+
+
+def _resolver(futuro, resultado, erro):
+    if futuro.done():
+        return  # Corrotina cancelada enquanto esperava
+    if erro is not None:
+        futuro.set_exception(erro)
+    else:
+        futuro.set_result(resultado)
+
+
+class SingleFlight:
+    """
+    Coalescência de requisições idênticas (single-flight) entre threads e corrotinas.
+
+    A chave é a URL com os parâmetros normalizados, sem o token (api.cache.chave_cache).
+    O primeiro chamador de uma chave faz a requisição; quem chega enquanto ela
+    está em voo espera e recebe o mesmo resultado já decodificado, que por isso
+    deve ser tratado como somente leitura. Corrotinas esperam num Future do seu
+    próprio loop, então o cliente síncrono e o asyncio compartilham as chamadas.
+    "event not found" fica num cache negativo por NOT_FOUND_TTL_SECONDS.
+    """
+
+    def __init__(self, enabled=REQUEST_COALESCING_ENABLED, not_found_ttl=NOT_FOUND_TTL_SECONDS):
+        self.enabled = enabled
+        self.not_found_ttl = not_found_ttl
+        self._em_voo = {}  # chave -> _Chamada
+        self._nao_encontrados = {}  # chave -> instante (time.monotonic) em que expira
+        self._lock = threading.Lock()
+
+    def _entrar(self, chave):
+        """Retorna (chamada, origem): origem None = este chamador faz a requisição."""
+        with self._lock:
+            expira = self._nao_encontrados.get(chave)
+            if expira is not None:
+                if expira > time.monotonic():
+                    return None, "not_found"
+                del self._nao_encontrados[chave]
+            chamada = self._em_voo.get(chave)
+            if chamada is not None:
+                return chamada, "in_flight"
+            chamada = self._em_voo[chave] = _Chamada()
+            return chamada, None
+
+    def _sair(self, chave, chamada, resultado, erro):
+        with self._lock:
+            self._em_voo.pop(chave, None)
+            if erro is None and resultado is NAO_ENCONTRADO and self.not_found_ttl > 0:
+                agora = time.monotonic()
+                if len(self._nao_encontrados) >= MAX_NAO_ENCONTRADOS:
+                    self._nao_encontrados = {c: e for c, e in self._nao_encontrados.items() if e > agora}
+                self._nao_encontrados[chave] = agora + self.not_found_ttl
+            chamada.resultado, chamada.erro = resultado, erro
+            futuros, chamada.futuros = chamada.futuros, []
+            chamada.concluida.set()
+        for loop, futuro in futuros:
+            try:
+                loop.call_soon_threadsafe(_resolver, futuro, resultado, erro)
+            except RuntimeError:
+                pass  # Loop já encerrado
+
+    def do(self, chave, fn):
+        """
+        Executa fn() uma única vez entre os chamadores simultâneos de 'chave'.
+        Retorna (resultado, origem), com origem None, "in_flight" ou "not_found".
+        """
+        if not self.enabled:
+            return fn(), None
+        chamada, origem = self._entrar(chave)
+        if origem == "not_found":
+            return NAO_ENCONTRADO, origem
+        if origem == "in_flight":
+            chamada.concluida.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado, origem
+
+        try:
+            resultado = fn()
+        except BaseException as e:
+            self._sair(chave, chamada, None, e)
+            raise
+        self._sair(chave, chamada, resultado, None)
+        return resultado, None
+
+    async def do_async(self, chave, fn):
+        """Versão asyncio de do(): 'fn' é uma função assíncrona sem argumentos."""
+        if not self.enabled:
+            return await fn(), None
+        chamada, origem = self._entrar(chave)
+        if origem == "not_found":
+            return NAO_ENCONTRADO, origem
+        if origem == "in_flight":
+            futuro = asyncio.get_running_loop().create_future()
+            with self._lock:
+                concluida = chamada.concluida.is_set()
+                if not concluida:
+                    chamada.futuros.append((futuro.get_loop(), futuro))
+            if concluida:
+                if chamada.erro is not None:
+                    raise chamada.erro
+                return chamada.resultado, origem
+            return await futuro, origem
+
+        try:
+            resultado = await fn()
+        except BaseException as e:
+            self._sair(chave, chamada, None, e)
+            raise
+        self._sair(chave, chamada, resultado, None)
+        return resultado, None
+
+
+# Instância única por processo: workers do backfill, thread de placares e cliente async compartilham as chamadas
+inflight = SingleFlight()
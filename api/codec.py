@@ -0,0 +1,166 @@
+# api/codec.py
+"""
+Camada de JSON do coletor: decodifica respostas da API e codifica odds para o banco.
+
+Usa orjson ou msgspec quando instalados (são opcionais) e cai para o json da
+biblioteca padrão. JSON_BACKEND força um backend ("orjson", "msgspec" ou "json").
+
+Para os endpoints conhecidos (ENDPOINT_SCHEMAS) a resposta é validada contra o
+envelope esperado: com msgspec a decodificação e a validação acontecem numa única
+passada em C; nos demais backends a validação é feita em Python sobre o dict.
+Respostas fora do schema levantam SchemaError (subclasse de ValueError).
+"""
+import json
+import types
+from typing import Any, TypedDict, Union, get_args, get_origin, get_type_hints
+
+from config.settings import JSON_BACKEND
+
+try:
+    import orjson
+except ImportError:  # Opcional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # Opcional
+    msgspec = None
+
+
+class SchemaError(ValueError):
+    """Resposta da API com JSON válido mas fora do formato esperado."""
+
+
+# ----- Schemas dos envelopes (campos opcionais: respostas de erro só trazem success/error) -----
+
+
+class EndedEventsResponse(TypedDict, total=False):
+    """/v1/events/ended (e /v1/events/inplay, /v1/events/upcoming e /v1/event/view, mesmo formato de lista)."""
+
+    success: int
+    error: str
+    pager: Union[dict[str, Any], None]
+    results: list[dict[str, Any]]
+
+
+class OddsSummaryResponse(TypedDict, total=False):
+    """/v2/event/odds/summary: results é um dict por casa de apostas (lista vazia sem odds)."""
+
+    success: int
+    error: str
+    results: Union[dict[str, Any], list[Any]]
+
+
+class EventOddsResponse(TypedDict, total=False):
+    """/v2/event/odds: results traz 'stats' e 'odds' (lista de ticks por mercado)."""
+
+    success: int
+    error: str
+    results: Union[dict[str, Any], list[Any]]
+
+
+ENDPOINT_SCHEMAS = {
+    "/v1/events/ended": EndedEventsResponse,
+    "/v1/events/inplay": EndedEventsResponse,
+    "/v1/events/upcoming": EndedEventsResponse,
+    "/v1/event/view": EndedEventsResponse,
+    "/v2/event/odds/summary": OddsSummaryResponse,
+    "/v2/event/odds": EventOddsResponse,
+}
+
+
+# ----- Backends -----
+
+
+def _escolher_backend(preferido):
+    disponiveis = {"orjson": orjson is not None, "msgspec": msgspec is not None, "json": True}
+    if preferido != "auto":
+        if not disponiveis.get(preferido):
+            print(f"Aviso: JSON_BACKEND={preferido} indisponível; usando detecção automática.")
+        else:
+            return preferido
+    return next(nome for nome in ("orjson", "msgspec", "json") if disponiveis[nome])
+
+
+BACKEND = _escolher_backend(JSON_BACKEND)
+
+if BACKEND == "orjson":
+    _loads = orjson.loads
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj)
+
+elif BACKEND == "msgspec":
+    _loads = msgspec.json.decode
+
+    def dumps_bytes(obj):
+        return msgspec.json.encode(obj)
+
+else:
+    _loads = json.loads
+
+    def dumps_bytes(obj):
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+# Exceções de JSON inválido de todos os backends (orjson já herda de json.JSONDecodeError)
+DecodeError = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+
+def loads(data):
+    """Decodifica JSON de bytes ou str."""
+    return _loads(data)
+
+
+def dumps(obj):
+    """Codifica em JSON compacto como str (psycopg2 envia str para colunas JSONB)."""
+    return dumps_bytes(obj).decode("utf-8")
+
+
+# ----- Validação -----
+
+
+def _tipos_aceitos(anotacao):
+    """Converte uma anotação do schema em tipos para isinstance (só o nível de cima)."""
+    origem = get_origin(anotacao)
+    if origem is Union or origem is types.UnionType:
+        return tuple(tipo for arg in get_args(anotacao) for tipo in _tipos_aceitos(arg))
+    if anotacao is type(None) or anotacao is None:
+        return (type(None),)
+    if anotacao is Any:
+        return (object,)
+    return (origem or anotacao,)
+
+
+def _campos(schema):
+    return {campo: _tipos_aceitos(anotacao) for campo, anotacao in get_type_hints(schema).items()}
+
+
+_CAMPOS = {endpoint: _campos(schema) for endpoint, schema in ENDPOINT_SCHEMAS.items()}
+_DECODERS = (
+    {endpoint: msgspec.json.Decoder(schema) for endpoint, schema in ENDPOINT_SCHEMAS.items()} if msgspec is not None else {}
+)
+
+
+def validate(endpoint, data):
+    """Confere o envelope de 'data' contra o schema do endpoint (sem schema, só exige um objeto)."""
+    if not isinstance(data, dict):
+        raise SchemaError(f"{endpoint}: esperado um objeto JSON, recebido {type(data).__name__}")
+    for campo, tipos in _CAMPOS.get(endpoint, {}).items():
+        if campo in data and not isinstance(data[campo], tipos):
+            raise SchemaError(f"{endpoint}: campo '{campo}' com tipo inesperado ({type(data[campo]).__name__})")
+    return data
+
+
+def decode_response(endpoint, body):
+    """
+    Decodifica o corpo de uma resposta da API e valida o envelope.
+    Levanta uma das exceções de DecodeError (SchemaError incluída) se o corpo for inválido.
+    """
+    decoder = _DECODERS.get(endpoint)
+    if decoder is not None:
+        try:
+            return decoder.decode(body)  # TypedDict: devolve dicts comuns, já validados
+        except msgspec.ValidationError as e:
+            raise SchemaError(f"{endpoint}: {e}") from e
+    return validate(endpoint, _loads(body))
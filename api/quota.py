@@ -0,0 +1,210 @@
+# api/quota.py
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from config.settings import QUOTA_HOURLY_LIMIT, QUOTA_RESERVE_CALLS
+from utils import metrics
+
+QUOTA_REMAINING = metrics.gauge("betsapi_api_quota_remaining", "Chamadas restantes na hora atual (headers ou contagem própria)")
+QUOTA_THROTTLED = metrics.counter(
+    "betsapi_api_quota_throttled_total", "Esperas de jobs de baixa prioridade para preservar a reserva da cota"
+)
+
+PRIORIDADE_ALTA = 0
+PRIORIDADE_BAIXA = 1
+
+# Modos em massa: cedem a vez e respeitam QUOTA_RESERVE_CALLS
+PRIORIDADE_DO_MODO = {"backfill": PRIORIDADE_BAIXA, "odds-history": PRIORIDADE_BAIXA}
+
+_job_atual = ContextVar("betsapi_quota_job", default=None)  # (nome, prioridade) do job da thread/corrotina
+
+
+def inicio_da_hora(agora=None):
+    agora = agora or datetime.now(timezone.utc)
+    return agora.replace(minute=0, second=0, microsecond=0)
+
+
+def _inteiro(valor):
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+class QuotaManager:
+    """
+    Contabilidade da cota horária do token da BetsAPI.
+
+    Conta cada chamada HTTP por (hora, modo, endpoint); as contagens são gravadas
+    em api_usage (db/api_usage.py) e somadas às de outros processos, então o uso
+    da hora vale para o daemon e um backfill rodando ao mesmo tempo. Headers
+    X-RateLimit-Limit/Remaining/Reset, quando presentes, têm prioridade sobre a
+    contagem própria.
+
+    O modo vem de set_mode() (o --mode do processo) e pode ser trocado por thread
+    ou corrotina com job(): é assim que a thread de placares de um backfill conta
+    como 'update-scores' e mantém a prioridade alta. Jobs de baixa prioridade
+    esperam a virada da hora quando restam QUOTA_RESERVE_CALLS ou menos.
+    """
+
+    def __init__(self, hourly_limit=QUOTA_HOURLY_LIMIT, reserve=QUOTA_RESERVE_CALLS):
+        self.hourly_limit = hourly_limit
+        self.reserve = reserve
+        self.mode = "default"
+        self._lock = threading.Lock()
+        self._pendentes = {}  # (hora, modo, endpoint) -> [chamadas, 429s] ainda não gravadas
+        self._hora = inicio_da_hora()
+        self._usadas_na_hora = 0  # Gravadas no banco (todos os processos) + deste processo desde então
+        self._cabecalho = None  # (limite, restante, reinício em epoch, hora em que foi lido)
+        self._liberado = threading.Event()  # Desliga as esperas no encerramento
+        QUOTA_REMAINING.set_function(self.remaining)
+
+    # ----- Modo e prioridade -----
+
+    def set_mode(self, mode):
+        """Define o modo do processo (rótulo padrão das contagens e prioridade)."""
+        self.mode = mode
+        self._liberado.clear()
+
+    @contextmanager
+    def job(self, nome, prioridade=PRIORIDADE_ALTA):
+        """Conta as chamadas do bloco como 'nome', com a prioridade informada (vale para a thread/corrotina atual)."""
+        token = _job_atual.set((nome, prioridade))
+        try:
+            yield
+        finally:
+            _job_atual.reset(token)
+
+    def current(self):
+        """(modo, prioridade) do chamador."""
+        job = _job_atual.get()
+        if job is not None:
+            return job
+        return self.mode, PRIORIDADE_DO_MODO.get(self.mode, PRIORIDADE_ALTA)
+
+    def low_priority(self):
+        return self.current()[1] == PRIORIDADE_BAIXA
+
+    # ----- Contagem -----
+
+    def _virar_hora(self, agora):
+        hora = inicio_da_hora(agora)
+        if hora != self._hora:
+            self._hora = hora
+            self._usadas_na_hora = 0
+
+    def record(self, endpoint, status=None, headers=None):
+        """Registra uma chamada feita (inclusive 429 e timeout) e lê os headers de limite, se houver."""
+        agora = datetime.now(timezone.utc)
+        modo = self.current()[0]
+        with self._lock:
+            self._virar_hora(agora)
+            contagem = self._pendentes.setdefault((self._hora, modo, endpoint), [0, 0])
+            contagem[0] += 1
+            contagem[1] += 1 if status == 429 else 0
+            self._usadas_na_hora += 1
+        if headers is not None:
+            self._ler_cabecalhos(headers, agora)
+
+    def _ler_cabecalhos(self, headers, agora):
+        limite = _inteiro(headers.get("X-RateLimit-Limit"))
+        restante = _inteiro(headers.get("X-RateLimit-Remaining"))
+        if restante is None:
+            return
+        reinicio = _inteiro(headers.get("X-RateLimit-Reset"))
+        if reinicio is not None and reinicio < 10**9:
+            reinicio += int(agora.timestamp())  # Segundos até o reinício em vez de epoch
+        with self._lock:
+            self._cabecalho = (limite, restante, reinicio, inicio_da_hora(agora))
+
+    def take_pending(self):
+        """Retira as contagens ainda não gravadas: {(hora, modo, endpoint): (chamadas, 429s)}."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+        return {chave: tuple(valor) for chave, valor in pendentes.items()}
+
+    def restore_pending(self, pendentes):
+        """Devolve contagens que não puderam ser gravadas."""
+        with self._lock:
+            for chave, (chamadas, limitadas) in pendentes.items():
+                contagem = self._pendentes.setdefault(chave, [0, 0])
+                contagem[0] += chamadas
+                contagem[1] += limitadas
+
+    def set_hour_usage(self, hora, total):
+        """Uso da hora somado no banco (todos os processos), mais o que este processo ainda não gravou."""
+        with self._lock:
+            self._virar_hora(datetime.now(timezone.utc))
+            if hora == self._hora:
+                ainda_nao_gravadas = sum(
+                    contagem[0] for (hora_, _, _), contagem in self._pendentes.items() if hora_ == hora
+                )
+                self._usadas_na_hora = total + ainda_nao_gravadas
+
+    # ----- Orçamento -----
+
+    def remaining(self):
+        """Chamadas restantes na hora atual."""
+        agora = datetime.now(timezone.utc)
+        with self._lock:
+            self._virar_hora(agora)
+            if self._cabecalho is not None:
+                _, restante, reinicio, lido_na_hora = self._cabecalho
+                if reinicio is not None and reinicio > agora.timestamp():
+                    return restante
+                if reinicio is None and lido_na_hora == self._hora:
+                    return restante
+            return max(0, self.hourly_limit - self._usadas_na_hora)
+
+    def _segundos_ate_reinicio(self, agora):
+        if self._cabecalho is not None and self._cabecalho[2] is not None and self._cabecalho[2] > agora.timestamp():
+            return self._cabecalho[2] - agora.timestamp()
+        return 3600 - (agora - inicio_da_hora(agora)).total_seconds()
+
+    def wait_seconds(self):
+        """Quanto o chamador deve esperar antes da próxima chamada (0 = liberado)."""
+        if not self.low_priority() or self._liberado.is_set() or self.remaining() > self.reserve:
+            return 0.0
+        return max(1.0, self._segundos_ate_reinicio(datetime.now(timezone.utc)))
+
+    def wait(self):
+        """Bloqueia jobs de baixa prioridade enquanto a cota restante estiver na reserva."""
+        espera = self.wait_seconds()
+        if espera <= 0:
+            return
+        QUOTA_THROTTLED.inc(mode=self.current()[0])
+        print(
+            f"Aviso: Cota quase no fim ({self.remaining()} chamadas restantes). "
+            f"Pausando {self.current()[0]} por até {espera:.0f}s..."
+        )
+        while espera > 0 and not self._liberado.is_set():
+            self._liberado.wait(min(espera, 30))
+            espera = self.wait_seconds()
+
+    async def wait_async(self):
+        """Versão asyncio de wait()."""
+        espera = self.wait_seconds()
+        if espera <= 0:
+            return
+        QUOTA_THROTTLED.inc(mode=self.current()[0])
+        while espera > 0 and not self._liberado.is_set():
+            await asyncio.sleep(min(espera, 30))
+            espera = self.wait_seconds()
+
+    def release(self):
+        """Encerramento: libera quem está esperando a cota (o processo está parando)."""
+        self._liberado.set()
+
+    def budget_hours(self, chamadas, requests_per_second):
+        """Horas necessárias para 'chamadas' respeitando a taxa e a reserva horária."""
+        with self._lock:
+            limite = self._cabecalho[0] if self._cabecalho is not None and self._cabecalho[0] else self.hourly_limit
+        por_hora = min(requests_per_second * 3600, max(1, limite - self.reserve))
+        return chamadas / por_hora
+
+
+# Instância única por processo, como o limitador de taxa
+quota = QuotaManager()
@@ -0,0 +1,112 @@
+# api/rate_limiter.py
+import asyncio
+import threading
+import time
+
+from config.settings import API_REQUESTS_PER_SECOND, API_RATE_BURST
+
+
+class TokenBucket:
+    """
+    Token bucket compartilhado entre threads e corrotinas.
+
+    Cada chamada reserva um token sob lock e recebe quanto tempo precisa esperar;
+    a espera acontece fora do lock, então o mesmo orçamento de req/s vale para
+    o cliente síncrono, para os workers do backfill e para o cliente asyncio.
+
+    Chamadas de baixa prioridade (backfill) não reservam token enquanto houver
+    uma de alta prioridade esperando: novos jogos e placares passam na frente
+    em vez de entrar na fila atrás das reservas do backfill.
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("A taxa do token bucket deve ser positiva.")
+        self.rate = float(rate)
+        self.capacity = float(max(1, capacity))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._blocked_until = 0.0  # Pausa global (Retry-After) vale para todo o bucket
+        self._alta_esperando = 0  # Chamadas de alta prioridade aguardando um token
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Reserva um token. Retorna (segundos de espera, reservado?)."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now, False
+
+            self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return wait, True
+
+    def _ceder(self):
+        """Segundos que uma chamada de baixa prioridade deve aguardar antes de tentar reservar (0 = pode reservar)."""
+        with self._lock:
+            return 1.0 / self.rate if self._alta_esperando else 0.0
+
+    def _esperando(self, delta):
+        with self._lock:
+            self._alta_esperando += delta
+
+    def _still_valid(self):
+        """Verifica se nenhuma pausa foi aplicada enquanto a reserva aguardava."""
+        return time.monotonic() >= self._blocked_until
+
+    def acquire(self, low_priority=False):
+        """Bloqueia a thread atual até haver um token disponível."""
+        if low_priority:
+            while (ceder := self._ceder()) > 0:
+                time.sleep(ceder)
+        else:
+            self._esperando(1)
+        try:
+            while True:
+                wait, reserved = self._reserve()
+                if wait > 0:
+                    time.sleep(wait)
+                if reserved and self._still_valid():
+                    return
+        finally:
+            if not low_priority:
+                self._esperando(-1)
+
+    async def acquire_async(self, low_priority=False):
+        """Versão asyncio de acquire(): suspende apenas a corrotina atual."""
+        if low_priority:
+            while (ceder := self._ceder()) > 0:
+                await asyncio.sleep(ceder)
+        else:
+            self._esperando(1)
+        try:
+            while True:
+                wait, reserved = self._reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if reserved and self._still_valid():
+                    return
+        finally:
+            if not low_priority:
+                self._esperando(-1)
+
+    def pause(self, seconds):
+        """
+        Suspende o bucket inteiro por 'seconds' (ex: Retry-After de um 429).
+        Reservas feitas antes da pausa são descartadas e refeitas depois dela,
+        evitando uma rajada de requisições quando a pausa termina.
+        """
+        if seconds <= 0:
+            return
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._blocked_until:
+                self._blocked_until = until
+            self._tokens = 0.0
+            self._last = self._blocked_until  # Não acumula tokens durante a pausa
+
+
+# Instância única por processo: todos os clientes (sync e async) compartilham a cota
+rate_limiter = TokenBucket(API_REQUESTS_PER_SECOND, API_RATE_BURST)
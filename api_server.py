@@ -0,0 +1,284 @@
+# api_server.py
+"""
+Servidor de leitura (JSON) dos jogos recentes, ao lado do coletor (main.py).
+
+Responde a partir do índice em memória de db/hot_cache.py, aquecido do Postgres
+na inicialização e atualizado por polling das mudanças gravadas pelo coletor.
+Respostas levam ETag; com If-None-Match igual a resposta é 304 sem corpo.
+Só IDs fora da janela em memória consultam o banco.
+
+Rotas:
+    GET /health
+    GET /events/recent?limit=50&league_id=
+    GET /events/<event_id>
+    GET /players/<nome>/games?limit=10&league_id=
+    GET /players/<nome>/form
+    GET /h2h?player_a=<nome>&player_b=<nome>
+    GET /metrics
+
+Uso:
+    python api_server.py [--port 8080] [--window-hours 72]
+"""
+import argparse
+import hashlib
+import re
+import signal
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from api import codec
+from config.settings import READ_SERVER_HOST, READ_SERVER_PORT, READ_SERVER_REFRESH_SECONDS, READ_SERVER_WINDOW_HOURS
+from db.database import close_db_pool, get_db_connection
+from db.h2h import H2HIndex, ensure_h2h_tables
+from db.hot_cache import HotIndex, event_to_json, fetch_event, iso_value as _iso
+from utils import metrics
+from utils.scheduler import PeriodicScheduler
+
+READ_REQUESTS = metrics.counter("betsapi_read_requests_total", "Requisições ao servidor de leitura por rota e status")
+READ_INDEX_EVENTS = metrics.gauge("betsapi_read_index_events", "Eventos no índice em memória do servidor de leitura")
+
+MAX_LIMIT = 500
+MAX_RESPOSTAS_EM_CACHE = 10000
+
+running = True
+index = HotIndex()
+h2h_index = H2HIndex()
+
+# Corpo já codificado por URL: {path: (version, etag, corpo)}; invalidado quando o índice muda
+_respostas = {}
+_respostas_lock = threading.Lock()
+
+
+class RequisicaoInvalida(ValueError):
+    """Parâmetro ausente ou inválido (resposta 400)."""
+
+
+class NaoEncontrado(LookupError):
+    """Recurso inexistente (resposta 404)."""
+
+
+def _inteiro(params, nome, padrao=None, maximo=None):
+    valor = params.get(nome, [None])[0]
+    if valor in (None, ""):
+        return padrao
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise RequisicaoInvalida(f"'{nome}' deve ser um inteiro")
+    if numero < 0:
+        raise RequisicaoInvalida(f"'{nome}' deve ser positivo")
+    return min(numero, maximo) if maximo else numero
+
+
+def _texto(params, nome):
+    valor = (params.get(nome, [""])[0] or "").strip()
+    if not valor:
+        raise RequisicaoInvalida(f"parâmetro '{nome}' é obrigatório")
+    return valor
+
+
+# ----- Rotas (retornam (dados, cacheável)) -----
+
+
+def rota_health(params):
+    return {
+        "status": "ok",
+        "events": len(index),
+        "version": index.version,
+        "h2h_version": h2h_index.version,
+        "window_hours": index.window.total_seconds() / 3600,
+        "loaded_at": index.loaded_at.isoformat() if index.loaded_at else None,
+    }, False
+
+
+def rota_recentes(params):
+    limit = _inteiro(params, "limit", 50, MAX_LIMIT)
+    eventos = index.recent(limit=limit, league_id=_inteiro(params, "league_id"))
+    return {"events": [event_to_json(evento) for evento in eventos]}, True
+
+
+def rota_evento(params, event_id):
+    encontrado = index.get(event_id)
+    cacheavel = True
+    if encontrado is None:
+        # Fora da janela em memória: consulta o banco (resposta não entra no cache)
+        with get_db_connection() as conn:
+            encontrado = fetch_event(conn, event_id)
+        cacheavel = False
+    if encontrado is None:
+        raise NaoEncontrado(f"evento {event_id} não encontrado")
+    evento, odds = encontrado
+    return {"event": event_to_json(evento, odds)}, cacheavel
+
+
+def rota_jogador(params, player_name):
+    limit = _inteiro(params, "limit", 10, MAX_LIMIT)
+    eventos = index.player_games(player_name, limit=limit, league_id=_inteiro(params, "league_id"))
+    return {"player": player_name, "events": [event_to_json(evento) for evento in eventos]}, True
+
+
+def _sem_marcas(row):
+    return {chave: _iso(valor) for chave, valor in row.items() if chave != "updated_at"}
+
+
+def rota_confronto(params):
+    player_a = _texto(params, "player_a")
+    player_b = _texto(params, "player_b")
+    confronto = h2h_index.head_to_head(player_a, player_b)
+    if confronto is None:
+        raise NaoEncontrado(f"nenhum confronto entre {player_a} e {player_b}")
+    return {"h2h": _sem_marcas(confronto)}, True
+
+
+def rota_forma(params, player_name):
+    forma = h2h_index.form(player_name)
+    if forma is None:
+        raise NaoEncontrado(f"jogador {player_name} sem jogos com placar")
+    return {"form": _sem_marcas(forma)}, True
+
+
+ROTAS = (
+    (re.compile(r"^/health$"), rota_health),
+    (re.compile(r"^/events/recent$"), rota_recentes),
+    (re.compile(r"^/events/(\d+)$"), rota_evento),
+    (re.compile(r"^/players/([^/]+)/games$"), rota_jogador),
+    (re.compile(r"^/players/([^/]+)/form$"), rota_forma),
+    (re.compile(r"^/h2h$"), rota_confronto),
+)
+
+
+def responder(path):
+    """Resolve 'path' (com query string) em (status, etag, corpo), reaproveitando respostas já codificadas."""
+    versao = (index.version, h2h_index.version)
+    with _respostas_lock:
+        em_cache = _respostas.get(path)
+    if em_cache is not None and em_cache[0] == versao:
+        return 200, em_cache[1], em_cache[2], "hit"
+
+    url = urlsplit(path)
+    params = parse_qs(url.query)
+    for padrao, rota in ROTAS:
+        match = padrao.match(url.path)
+        if not match:
+            continue
+        try:
+            dados, cacheavel = rota(params, *(unquote(grupo) for grupo in match.groups()))
+        except RequisicaoInvalida as e:
+            return 400, None, codec.dumps_bytes({"error": str(e)}), "erro"
+        except NaoEncontrado as e:
+            return 404, None, codec.dumps_bytes({"error": str(e)}), "erro"
+        corpo = codec.dumps_bytes(dados)
+        etag = '"' + hashlib.sha1(corpo).hexdigest()[:20] + '"'
+        if cacheavel:
+            with _respostas_lock:
+                if len(_respostas) >= MAX_RESPOSTAS_EM_CACHE:
+                    _respostas.clear()
+                _respostas[path] = (versao, etag, corpo)
+        return 200, etag, corpo, "miss"
+    return 404, None, codec.dumps_bytes({"error": "rota não encontrada"}), "erro"
+
+
+class _ReadHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            corpo = metrics.registry.render_prometheus().encode("utf-8")
+            self._enviar(200, corpo, "text/plain; version=0.0.4")
+            return
+        try:
+            status, etag, corpo, origem = responder(self.path)
+        except Exception as e:
+            print(f"Erro ao responder {self.path}: {e}")
+            status, etag, corpo, origem = 500, None, codec.dumps_bytes({"error": "erro interno"}), "erro"
+        rota = urlsplit(self.path).path.split("/")[1] or "/"
+        if etag is not None and etag in (self.headers.get("If-None-Match") or ""):
+            READ_REQUESTS.inc(route=rota, status=304, cache=origem)
+            self._enviar(304, b"", etag=etag)
+            return
+        READ_REQUESTS.inc(route=rota, status=status, cache=origem)
+        self._enviar(status, corpo, "application/json", etag)
+
+    def _enviar(self, status, corpo, content_type=None, etag=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={READ_SERVER_REFRESH_SECONDS}")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if corpo:
+            self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        pass  # Sem log por requisição (o volume de leitura é alto)
+
+
+def refresh_index():
+    """Aplica no índice as mudanças gravadas pelo coletor desde a última leitura."""
+    with get_db_connection() as conn:
+        alterados = index.refresh(conn)
+        h2h_index.refresh(conn)
+    if alterados:
+        print(f"[Leitura] {alterados} eventos atualizados no índice (versão {index.version}, {len(index)} em memória).")
+
+
+def signal_handler(sig, frame):
+    """Captura sinais (como Ctrl+C) para parar o servidor."""
+    global running
+    if running:
+        print("\nRecebido sinal de interrupção. Finalizando servidor de leitura...")
+        running = False
+    else:
+        print("Finalização forçada.")
+        sys.exit(1)
+
+
+def main():
+    global index
+    parser = argparse.ArgumentParser(description="Servidor de leitura (JSON) dos jogos recentes.")
+    parser.add_argument("--host", default=READ_SERVER_HOST, help="Endereço de escuta.")
+    parser.add_argument("--port", type=int, default=READ_SERVER_PORT, help="Porta HTTP.")
+    parser.add_argument(
+        "--window-hours", type=int, default=READ_SERVER_WINDOW_HOURS, help="Horas de jogos mantidas em memória (24 a 72)."
+    )
+    parser.add_argument(
+        "--refresh-seconds", type=int, default=READ_SERVER_REFRESH_SECONDS, help="Intervalo de leitura das mudanças."
+    )
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    index = HotIndex(window_hours=args.window_hours)
+    READ_INDEX_EVENTS.set_function(lambda: len(index))
+    inicio = datetime.now(timezone.utc)
+    with get_db_connection() as conn:
+        ensure_h2h_tables(conn)  # Podem ainda não existir se o coletor nunca gravou confrontos
+        total = index.warm(conn)
+        pares = h2h_index.refresh(conn)
+    print(
+        f"Índice aquecido com {total} eventos das últimas {args.window_hours}h e {pares} confrontos/formas "
+        f"em {(datetime.now(timezone.utc) - inicio).total_seconds():.1f}s."
+    )
+
+    server = ThreadingHTTPServer((args.host, args.port), _ReadHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="read-http", daemon=True).start()
+    print(f"Servidor de leitura em http://{args.host}:{args.port}")
+
+    scheduler = PeriodicScheduler(should_run=lambda: running)
+    scheduler.add_job("refresh-index", args.refresh_seconds, refresh_index, run_at_start=False)
+    try:
+        scheduler.run_forever()
+    finally:
+        scheduler.shutdown()
+        server.shutdown()
+        close_db_pool()
+    print("Servidor de leitura finalizado.")
+
+
+if __name__ == "__main__":
+    main()
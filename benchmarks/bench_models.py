@@ -0,0 +1,118 @@
+# benchmarks/bench_models.py
+"""
+Mede o custo de parsing e o tamanho em memória dos registros de db/models.py,
+usando os payloads sintéticos da BetsAPI falsa (sem rede e sem banco).
+
+Compara Event/OddsSnapshot com dicts equivalentes (o formato anterior) e
+projeta a memória de uma janela de DAYS_TO_KEEP dias de uma liga:
+
+    python benchmarks/bench_models.py --games 20000 --games-per-day 480 --days 60
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_betsapi import FakeBetsAPIConfig, FakeBetsAPIData  # noqa: E402
+from db.models import EVENT_COLUMNS, Event, OddsSnapshot, parse_odds_summary  # noqa: E402
+
+
+def gerar_payloads(quantidade, games_per_day):
+    """Jogos da primeira liga de eSoccer em dias consecutivos, com seus resumos de odds."""
+    data = FakeBetsAPIData(FakeBetsAPIConfig(games_per_day=games_per_day, missing_odds_ratio=0.0))
+    payloads = []
+    dia = date(2024, 1, 1)
+    while len(payloads) < quantidade:
+        for index in range(min(games_per_day, quantidade - len(payloads))):
+            jogo = data.jogo(dia.strftime("%Y%m%d"), 0, index)
+            payloads.append((jogo, data.odds_summary({"event_id": jogo["id"]})))
+        dia += timedelta(days=1)
+    return payloads
+
+
+def parsear(payloads):
+    registros = []
+    for jogo, resumo in payloads:
+        evento = Event.from_api(jogo)
+        odds, _ = parse_odds_summary(resumo, evento.event_id, evento.event_timestamp)
+        registros.append((evento, odds))
+    return registros
+
+
+def como_registros(registros):
+    """Cópia dos registros reaproveitando os valores: mede só o custo dos contêineres."""
+    return [(Event(*evento.row()), [OddsSnapshot(*odd.row(True)) for odd in odds]) for evento, odds in registros]
+
+
+def como_dicts(registros):
+    """Os mesmos valores no formato antigo (dict por evento e por mercado)."""
+    return [
+        (
+            {coluna: valor for coluna, valor in zip(EVENT_COLUMNS, evento.row())},
+            [
+                {
+                    "event_id": odd.event_id,
+                    "bookmaker": odd.bookmaker,
+                    "odds_market": odd.odds_market,
+                    "odds_timestamp": odd.odds_timestamp,
+                    "odds_data": odd.odds_data,
+                    "event_timestamp": odd.event_timestamp,
+                }
+                for odd in odds
+            ],
+        )
+        for evento, odds in registros
+    ]
+
+
+def memoria(construir):
+    """Bytes alocados (e mantidos) por construir()."""
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    resultado = construir()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return depois - antes, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de parsing e memória de Event/OddsSnapshot.")
+    parser.add_argument("--games", type=int, default=20000, help="Jogos parseados na medição.")
+    parser.add_argument("--games-per-day", type=int, default=480, help="Jogos por dia da liga (projeção).")
+    parser.add_argument("--days", type=int, default=60, help="Dias da janela projetada (DAYS_TO_KEEP).")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições do parsing (vale a melhor).")
+    args = parser.parse_args()
+
+    payloads = gerar_payloads(args.games, args.games_per_day)
+
+    melhor = None
+    for _ in range(args.repeat):
+        inicio = time.perf_counter()
+        registros = parsear(payloads)
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+
+    bytes_registros, registros = memoria(lambda: parsear(payloads))
+    bytes_conteineres, _ = memoria(lambda: como_registros(registros))
+    bytes_dicts, _ = memoria(lambda: como_dicts(registros))
+    odds_por_jogo = sum(len(odds) for _, odds in registros) / len(registros)
+    por_jogo = bytes_registros / len(registros)
+    janela = args.games_per_day * args.days
+
+    print(f"Jogos: {len(registros)} ({odds_por_jogo:.1f} mercados de odds por jogo)")
+    print(f"Parsing: {melhor / len(registros) * 1e6:.1f} µs/jogo ({len(registros) / melhor:,.0f} jogos/s)")
+    print(f"Memória total: {por_jogo:,.0f} bytes/jogo (registros, datetimes e JSON das odds)")
+    print(
+        f"Contêineres: {bytes_conteineres / len(registros):,.0f} bytes/jogo com __slots__ "
+        f"vs {bytes_dicts / len(registros):,.0f} com dicts"
+    )
+    print(f"Janela de {args.days} dias ({janela:,} jogos): ~{por_jogo * janela / 2**20:,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
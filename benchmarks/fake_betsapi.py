@@ -0,0 +1,398 @@
+# benchmarks/fake_betsapi.py
+"""
+Servidor HTTP local que imita os endpoints da BetsAPI usados pelo coletor:
+
+    /v1/events/ended        páginas de jogos encerrados (filtro por dia e liga)
+    /v1/events/inplay       jogos em andamento (placar parcial e relógio)
+    /v1/events/upcoming     jogos agendados (sem placar), do mais próximo ao mais distante
+    /v2/event/odds/summary  resumo de odds da Bet365
+    /v2/event/odds          histórico de odds (ticks por mercado)
+    /v1/event/view          detalhes do evento (placar)
+
+Os dados são sintéticos e determinísticos: o mesmo dia/liga sempre gera os mesmos
+jogos, então execuções diferentes do benchmark são comparáveis. Latência, erros
+429 e o header Retry-After são configuráveis.
+
+Uso isolado:
+    python benchmarks/fake_betsapi.py --port 8765 --latency-ms 80 --rate-429 0.01
+
+E no coletor:
+    API_BASE_URL=http://127.0.0.1:8765/v1 API_BASE_URL_V2=http://127.0.0.1:8765/v2 python main.py ...
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Mesmas ligas de config.settings.ESOCCER_LEAGUE_IDS (não importa settings para rodar sem .env)
+ESOCCER_LEAGUES = {
+    "38439": "Esoccer Battle Volta - 6 mins play",
+    "37298": "Esoccer H2H GG League - 8 mins play",
+    "22614": "Esoccer Battle - 8 mins play",
+    "23114": "Esoccer GT Leagues – 12 mins play",
+    "33440": "Esoccer Adriatic League - 10 mins play",
+}
+# Liga de outro eSport, para exercitar o classificador no modo daily (sem filtro de liga)
+OTHER_LEAGUES = {"99001": "CS:GO - ESL Challenger"}
+
+PLAYERS = ["Boulevard", "Kray", "Nikkitta", "Hotshot", "Koftovsky", "Arthur", "Lion", "Bomb1to", "Sava", "Cavani"]
+TEAMS = ["Real Madrid", "Barcelona", "Man City", "Liverpool", "PSG", "Bayern", "Juventus", "Inter", "Napoli", "Arsenal"]
+
+
+class FakeBetsAPIConfig:
+    """Parâmetros do servidor falso (tamanho dos dias, páginas, latência e 429)."""
+
+    def __init__(
+        self,
+        games_per_day=120,
+        other_games_per_day=30,
+        per_page=50,
+        latency_ms=50.0,
+        jitter_ms=20.0,
+        rate_429=0.0,
+        retry_after=1,
+        missing_odds_ratio=0.05,
+        seed=42,
+    ):
+        self.games_per_day = games_per_day
+        self.other_games_per_day = other_games_per_day
+        self.per_page = per_page
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.missing_odds_ratio = missing_odds_ratio
+        self.seed = seed
+
+
+DURACAO_AO_VIVO = 600  # Segundos de um jogo de eSoccer no /events/inplay falso
+
+
+def _event_id(day_str, league_index, index):
+    return int(day_str) * 10**6 + league_index * 10**4 + index
+
+
+def _decodificar_event_id(event_id):
+    """Inverso de _event_id: (day_str, league_index, index)."""
+    event_id = int(event_id)
+    return str(event_id // 10**6), (event_id // 10**4) % 100, event_id % 10**4
+
+
+def _placar(event_id):
+    return f"{event_id % 5}-{(event_id // 7) % 5}"
+
+
+def _inicio_do_dia(day_str):
+    return datetime.strptime(day_str, "%Y%m%d").replace(tzinfo=timezone.utc)
+
+
+class FakeBetsAPIData:
+    """Gera os payloads sintéticos. Jogos de um dia são espalhados uniformemente nas 24h."""
+
+    def __init__(self, config):
+        self.config = config
+        self.leagues = list(ESOCCER_LEAGUES.items()) + list(OTHER_LEAGUES.items())
+
+    def _jogos_por_liga(self, league_id):
+        return self.config.other_games_per_day if league_id in OTHER_LEAGUES else self.config.games_per_day
+
+    def jogo(self, day_str, league_index, index):
+        league_id, league_name = self.leagues[league_index]
+        event_id = _event_id(day_str, league_index, index)
+        total = self._jogos_por_liga(league_id)
+        inicio = _inicio_do_dia(day_str) + timedelta(seconds=int(index * 86400 / max(total, 1)))
+        rnd = random.Random(event_id ^ self.config.seed)
+        if league_id in OTHER_LEAGUES:
+            home, away = f"Team {rnd.randint(1, 50)}", f"Team {rnd.randint(51, 99)}"
+        else:
+            home = f"{rnd.choice(TEAMS)} ({rnd.choice(PLAYERS)})"
+            away = f"{rnd.choice(TEAMS)} ({rnd.choice(PLAYERS)})"
+        return {
+            "id": str(event_id),
+            "sport_id": "1",
+            "time": str(int(inicio.timestamp())),
+            "time_status": "3",
+            "league": {"id": league_id, "name": league_name, "cc": None},
+            "home": {"id": str(100000 + rnd.randint(1, 9999)), "name": home},
+            "away": {"id": str(200000 + rnd.randint(1, 9999)), "name": away},
+            "ss": _placar(event_id),
+        }
+
+    def _jogos_do_dia(self, day_str, league_id=None):
+        jogos = []
+        for league_index, (lid, _) in enumerate(self.leagues):
+            if league_id is not None and lid != str(league_id):
+                continue
+            jogos.extend(self.jogo(day_str, league_index, i) for i in range(self._jogos_por_liga(lid)))
+        # A API lista os mais recentes primeiro
+        jogos.sort(key=lambda jogo: int(jogo["time"]), reverse=True)
+        return jogos
+
+    def ended(self, params):
+        day_str = params.get("day") or datetime.now(timezone.utc).strftime("%Y%m%d")
+        page = max(1, int(params.get("page") or 1))
+        jogos = self._jogos_do_dia(day_str, params.get("league_id"))
+        if day_str == datetime.now(timezone.utc).strftime("%Y%m%d"):
+            agora = time.time()
+            jogos = [jogo for jogo in jogos if int(jogo["time"]) < agora]  # Só o que já terminou
+        per_page = self.config.per_page
+        inicio = (page - 1) * per_page
+        return {
+            "success": 1,
+            "pager": {"page": page, "per_page": per_page, "total": len(jogos), "total_pages": -(-len(jogos) // per_page)},
+            "results": jogos[inicio : inicio + per_page],
+        }
+
+    def inplay(self, params):
+        """Jogos que começaram há menos de DURACAO_AO_VIVO, com placar parcial e relógio (0-90)."""
+        agora = time.time()
+        day_str = datetime.now(timezone.utc).strftime("%Y%m%d")
+        ao_vivo = []
+        for jogo in self._jogos_do_dia(day_str, params.get("league_id")):
+            decorrido = agora - int(jogo["time"])
+            if not 0 <= decorrido < DURACAO_AO_VIVO:
+                continue
+            fracao = decorrido / DURACAO_AO_VIVO
+            casa, fora = (int(gols) for gols in jogo["ss"].split("-"))
+            minuto = int(fracao * 90)
+            ao_vivo.append(
+                {
+                    **jogo,
+                    "time_status": "1",
+                    "ss": f"{int(casa * fracao)}-{int(fora * fracao)}",
+                    "timer": {"tm": minuto, "ts": int(decorrido) % 60, "tt": "1", "ta": 0},
+                }
+            )
+        return {"success": 1, "pager": {"page": 1, "per_page": len(ao_vivo), "total": len(ao_vivo)}, "results": ao_vivo}
+
+    def upcoming(self, params):
+        """Jogos de hoje e amanhã que ainda não começaram, sem placar, do mais próximo ao mais distante."""
+        agora = time.time()
+        hoje = datetime.now(timezone.utc)
+        jogos = []
+        for dia in (hoje, hoje + timedelta(days=1)):
+            for jogo in self._jogos_do_dia(dia.strftime("%Y%m%d"), params.get("league_id")):
+                if int(jogo["time"]) > agora:
+                    jogos.append({**jogo, "time_status": "0", "ss": None})
+        jogos.sort(key=lambda jogo: int(jogo["time"]))
+        page = max(1, int(params.get("page") or 1))
+        per_page = self.config.per_page
+        inicio = (page - 1) * per_page
+        return {
+            "success": 1,
+            "pager": {"page": page, "per_page": per_page, "total": len(jogos), "total_pages": -(-len(jogos) // per_page)},
+            "results": jogos[inicio : inicio + per_page],
+        }
+
+    def odds_summary(self, params):
+        event_id = int(params.get("event_id") or 0)
+        rnd = random.Random(event_id ^ (self.config.seed * 31))
+        if rnd.random() < self.config.missing_odds_ratio:
+            return {"success": 1, "results": {}}
+        day_str, _, _ = _decodificar_event_id(event_id)
+        add_time = str(int(_inicio_do_dia(day_str).timestamp()))
+
+        def odd():
+            return f"{rnd.uniform(1.2, 6.0):.3f}"
+
+        linha = f"{rnd.choice([2.5, 3.5, 4.5, 5.5])}"
+        return {
+            "success": 1,
+            "results": {
+                "Bet365": {
+                    "matching_dir": 1,
+                    "last_update": add_time,
+                    "odds": {
+                        "start": {
+                            "1_1": {"id": "1", "home_od": odd(), "draw_od": odd(), "away_od": odd(), "ss": None, "add_time": add_time},
+                            "1_2": {"id": "2", "home_od": odd(), "handicap": "-0.5", "away_od": odd(), "ss": None, "add_time": add_time},
+                            "1_3": {"id": "3", "over_od": odd(), "handicap": linha, "under_od": odd(), "ss": None, "add_time": add_time},
+                        }
+                    },
+                }
+            },
+        }
+
+    def event_odds(self, params):
+        """Ticks dos mercados 1_1, 1_2 e 1_3 nas horas antes do jogo, mais recentes primeiro (como a API)."""
+        event_id = int(params.get("event_id") or 0)
+        rnd = random.Random(event_id ^ (self.config.seed * 53))
+        if rnd.random() < self.config.missing_odds_ratio:
+            return {"success": 1, "results": {"stats": {}, "odds": {}}}
+        day_str, _, _ = _decodificar_event_id(event_id)
+        inicio = int(_inicio_do_dia(day_str).timestamp())
+        casa, fora, linha = rnd.uniform(1.5, 4.0), rnd.uniform(1.5, 4.0), rnd.choice([2.5, 3.5, 4.5])
+        series = {"1_1": [], "1_2": [], "1_3": []}
+        for tick in range(rnd.randint(5, 30)):
+            add_time = str(inicio + tick * 300)
+            if rnd.random() < 0.6:
+                casa = max(1.01, casa + rnd.uniform(-0.1, 0.1))
+            if rnd.random() < 0.1:
+                linha += rnd.choice([-1, 1])
+            comum = {"id": str(event_id * 100 + tick), "ss": None, "time_str": None, "add_time": add_time}
+            series["1_1"].append({**comum, "home_od": f"{casa:.3f}", "draw_od": "3.400", "away_od": f"{fora:.3f}"})
+            series["1_2"].append({**comum, "home_od": f"{casa:.3f}", "handicap": "-0.5", "away_od": f"{fora:.3f}"})
+            series["1_3"].append({**comum, "over_od": "1.900", "handicap": f"{linha}", "under_od": "1.900"})
+        for ticks in series.values():
+            ticks.reverse()
+        return {"success": 1, "results": {"stats": {"matching_dir": 1}, "odds": series}}
+
+    def event_view(self, params):
+        event_id = params.get("event_id")
+        try:
+            day_str, league_index, index = _decodificar_event_id(event_id)
+            if league_index >= len(self.leagues):
+                raise ValueError
+            jogo = self.jogo(day_str, league_index, index)
+        except (TypeError, ValueError):
+            return {"success": 0, "error": "EVENT_NOT_FOUND: event not found"}
+        return {"success": 1, "results": [jogo]}
+
+
+class FakeBetsAPIServer:
+    """Servidor em thread própria; conta as requisições por endpoint para o benchmark."""
+
+    ROTAS = {
+        "/v1/events/ended": "ended",
+        "/v1/events/inplay": "inplay",
+        "/v1/events/upcoming": "upcoming",
+        "/v2/event/odds/summary": "odds_summary",
+        "/v2/event/odds": "event_odds",
+        "/v1/event/view": "event_view",
+    }
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeBetsAPIConfig()
+        self.data = FakeBetsAPIData(self.config)
+        self.requests = Counter()
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._rnd = random.Random(self.config.seed)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, como a API real
+
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                if partes.path == "/__stats":
+                    self._responder(200, server.stats())
+                    return
+                if partes.path == "/__reset":
+                    server.reset()
+                    self._responder(200, {"ok": True})
+                    return
+                rota = server.ROTAS.get(partes.path)
+                if rota is None:
+                    self._responder(404, {"success": 0, "error": "not found"})
+                    return
+
+                params = {k: v[0] for k, v in parse_qs(partes.query).items()}
+                with server._lock:
+                    server.requests[rota] += 1
+                    limitado = server._rnd.random() < server.config.rate_429
+                    atraso = max(0.0, server._rnd.gauss(server.config.latency_ms, server.config.jitter_ms)) / 1000
+                    if limitado:
+                        server.rate_limited += 1
+                time.sleep(atraso)
+                if limitado:
+                    self._responder(429, {"success": 0, "error": "TOO_MANY_REQUESTS"}, {"Retry-After": str(server.config.retry_after)})
+                    return
+                self._responder(200, getattr(server.data, rota)(params))
+
+            def _responder(self, status, payload, headers=None):
+                corpo = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corpo)))
+                for nome, valor in (headers or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def stats(self):
+        with self._lock:
+            return {"requests": dict(self.requests), "total": sum(self.requests.values()), "rate_limited": self.rate_limited}
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.rate_limited = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-betsapi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def adicionar_argumentos(parser):
+    """Argumentos do servidor falso, compartilhados com run_benchmark.py."""
+    parser.add_argument("--games-per-day", type=int, default=120, help="Jogos por liga de eSoccer por dia.")
+    parser.add_argument("--other-games-per-day", type=int, default=30, help="Jogos de outros eSports por dia.")
+    parser.add_argument("--per-page", type=int, default=50, help="Jogos por página de /events/ended.")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média de cada resposta.")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Desvio padrão da latência.")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probabilidade de responder 429 (0 a 1).")
+    parser.add_argument("--retry-after", type=int, default=1, help="Valor do header Retry-After nos 429.")
+    parser.add_argument("--missing-odds-ratio", type=float, default=0.05, help="Fração de jogos sem odds.")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def config_dos_argumentos(args):
+    return FakeBetsAPIConfig(
+        games_per_day=args.games_per_day,
+        other_games_per_day=args.other_games_per_day,
+        per_page=args.per_page,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        missing_odds_ratio=args.missing_odds_ratio,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BetsAPI falsa para benchmarks offline.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    server = FakeBetsAPIServer(config_dos_argumentos(args), args.host, args.port)
+    print(f"BetsAPI falsa em {server.base_url} (v1: {server.base_url}/v1, v2: {server.base_url}/v2)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Requisições atendidas: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
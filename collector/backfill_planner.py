@@ -0,0 +1,138 @@
+# collector/backfill_planner.py
+import concurrent.futures
+from collections import namedtuple
+
+from db.database import get_cursor
+
+# Unidade de trabalho do backfill: uma página de uma liga em um dia.
+# 'task_size' é o tamanho estimado da tarefa (dia, liga) inteira, usado na ordenação;
+# 'prefetched' guarda a resposta da página quando ela já foi buscada na sondagem.
+WorkUnit = namedtuple("WorkUnit", ["date_str", "league_id", "page", "total_pages", "task_size", "prefetched"])
+
+DEFAULT_PER_PAGE = 50  # Tamanho de página padrão de /events/ended
+
+
+def estimar_por_historico(conn, league_ids):
+    """
+    Média de jogos por dia de cada liga, a partir do que já está no banco.
+    Usado para ordenar a sondagem e como estimativa quando o pager não informa o total.
+    """
+    query = """
+    SELECT league_id::text AS league_id, COUNT(*)::float / GREATEST(COUNT(DISTINCT event_timestamp::date), 1) AS por_dia
+    FROM events
+    WHERE league_id::text = ANY(%s)
+    GROUP BY league_id;
+    """
+    try:
+        with get_cursor(conn) as cur:
+            cur.execute(query, (list(league_ids),))
+            estimativas = {row["league_id"]: row["por_dia"] for row in cur.fetchall()}
+        conn.commit()
+        return estimativas
+    except Exception as e:
+        print(f"Aviso: Não foi possível estimar tamanho das ligas pelo histórico: {e}")
+        conn.rollback()
+        return {}
+
+
+def tamanho_pela_pagina(event_data, fallback=0):
+    """Retorna (total_de_jogos, total_de_paginas) a partir do pager da primeira página."""
+    if not event_data:
+        return fallback, 0
+    pager = event_data.get("pager") or {}
+    results = event_data.get("results") or []
+    if not results:
+        return 0, 0
+    per_page = int(pager.get("per_page") or DEFAULT_PER_PAGE)
+    total = pager.get("total")
+    total_pages = pager.get("total_pages")
+    if total is not None:
+        total = int(total)
+        total_pages = int(total_pages) if total_pages else -(-total // per_page)
+    elif total_pages:
+        total_pages = int(total_pages)
+        total = total_pages * per_page
+    else:
+        total, total_pages = max(fallback, len(results)), 1
+    return total, total_pages
+
+
+def sondar_primeiras_paginas(tasks, fetch_first_page, workers, estimativas=None):
+    """
+    Busca a página 1 de cada tarefa (dia, liga) em paralelo.
+    As tarefas com maior estimativa histórica são sondadas primeiro.
+    Retorna {tarefa: resposta_da_pagina_1}.
+    """
+    estimativas = estimativas or {}
+    ordenadas = sorted(tasks, key=lambda task: -estimativas.get(str(task[1]), 0))
+    primeiras = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_first_page, task): task for task in ordenadas}
+        for future in concurrent.futures.as_completed(futures):
+            task = futures[future]
+            try:
+                primeiras[task] = future.result()
+            except Exception as e:
+                print(f"Erro ao sondar dia {task[0]}, liga {task[1]}: {e}")
+                primeiras[task] = None
+    return primeiras
+
+
+def planejar_unidades(tasks, primeiras, estimativas=None, conhecidas=None, concluidas=frozenset()):
+    """
+    Divide cada tarefa (dia, liga) em unidades por página e ordena do maior para o menor
+    (LPT: tarefas maiores começam primeiro, e suas páginas rodam em paralelo).
+
+    - primeiras: {tarefa: resposta da página 1} vinda da sondagem.
+    - conhecidas: {tarefa: (total, total_pages)} de checkpoints anteriores (tarefa não sondada).
+    - concluidas: conjunto de (date_str, league_id, page) já gravados; são pulados.
+    Tarefas cuja sondagem falhou viram uma unidade da página 1 sem prefetch.
+    """
+    estimativas = estimativas or {}
+    conhecidas = conhecidas or {}
+    unidades = []
+    for task in tasks:
+        date_str, league_id = task
+        fallback = int(estimativas.get(str(league_id), 0))
+        if task in conhecidas:
+            total, total_pages = conhecidas[task]
+            for page in range(1, total_pages + 1):
+                unidades.append(WorkUnit(date_str, league_id, page, total_pages, total, None))
+            continue
+
+        event_data = primeiras.get(task)
+        if event_data is None:
+            unidades.append(WorkUnit(date_str, league_id, 1, None, fallback, None))
+            continue
+        total, total_pages = tamanho_pela_pagina(event_data, fallback)
+        if total_pages == 0:
+            unidades.append(WorkUnit(date_str, league_id, 1, 0, 0, event_data))  # Só registra o checkpoint
+            continue
+        unidades.append(WorkUnit(date_str, league_id, 1, total_pages, total, event_data))
+        for page in range(2, total_pages + 1):
+            unidades.append(WorkUnit(date_str, league_id, page, total_pages, total, None))
+
+    unidades = [unit for unit in unidades if (unit.date_str, str(unit.league_id), unit.page) not in concluidas]
+    unidades.sort(key=lambda unit: (-unit.task_size, unit.page))
+    return unidades
+
+
+def orcamento_de_chamadas(unidades, chamadas_por_jogo, per_page=DEFAULT_PER_PAGE):
+    """
+    Chamadas de API previstas para processar 'unidades': uma por página ainda não
+    buscada mais 'chamadas_por_jogo' por jogo (limite superior: jogos que já têm
+    odds não geram chamada). Unidades sem total_pages (sondagem ainda não feita
+    ou falha) são expandidas pela estimativa da tarefa (task_size).
+    Retorna (paginas, jogos, chamadas).
+    """
+    paginas = jogos = 0
+    for unit in unidades:
+        if unit.total_pages is None:
+            tamanho = int(unit.task_size or 0)
+            paginas += max(1, -(-tamanho // per_page))
+            jogos += tamanho
+            continue
+        if unit.prefetched is None:
+            paginas += 1
+        jogos += max(0, min(per_page, int(unit.task_size or 0) - (unit.page - 1) * per_page))
+    return paginas, jogos, paginas + jogos * chamadas_por_jogo
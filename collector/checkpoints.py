@@ -0,0 +1,113 @@
+# collector/checkpoints.py
+import threading
+import time
+
+from psycopg2.extras import execute_values
+
+from config.settings import BACKFILL_CHECKPOINT_BATCH, BACKFILL_CHECKPOINT_INTERVAL_SECONDS
+from db.database import get_cursor, create_db_connection, release_db_connection, DB_ROWS_WRITTEN
+
+
+def ensure_checkpoint_table(conn):
+    """Cria a tabela de checkpoints do backfill (tabela irmã de fetch_state) se não existir."""
+    query = """
+    CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+        day TEXT NOT NULL,
+        league_id TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        total_pages INTEGER,
+        task_total INTEGER,
+        games INTEGER NOT NULL DEFAULT 0,
+        completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (day, league_id, page)
+    );
+    """
+    with get_cursor(conn) as cur:
+        cur.execute(query)
+    conn.commit()
+
+
+def load_checkpoints(conn, day_strs, league_ids):
+    """
+    Carrega as unidades já concluídas para os dias/ligas informados.
+    Retorna (concluidas, conhecidas):
+    - concluidas: {(day, league_id, page)}
+    - conhecidas: {(day, league_id): (task_total, total_pages)} para tarefas cuja página 1 foi concluída
+    """
+    query = """
+    SELECT day, league_id, page, total_pages, task_total
+    FROM backfill_checkpoints
+    WHERE day = ANY(%s) AND league_id = ANY(%s);
+    """
+    concluidas = set()
+    conhecidas = {}
+    with get_cursor(conn) as cur:
+        cur.execute(query, (list(day_strs), [str(league_id) for league_id in league_ids]))
+        for row in cur.fetchall():
+            concluidas.add((row["day"], row["league_id"], row["page"]))
+            if row["page"] == 1 and row["total_pages"] is not None:
+                conhecidas[(row["day"], row["league_id"])] = (row["task_total"] or 0, row["total_pages"])
+    conn.commit()
+    return concluidas, conhecidas
+
+
+class CheckpointWriter:
+    """
+    Acumula unidades concluídas e grava em lote na tabela backfill_checkpoints.
+    Grava a cada BACKFILL_CHECKPOINT_BATCH unidades ou BACKFILL_CHECKPOINT_INTERVAL_SECONDS,
+    para não custar um round trip por página/jogo. Seguro para uso entre threads.
+    """
+
+    def __init__(self, batch_size=BACKFILL_CHECKPOINT_BATCH, interval=BACKFILL_CHECKPOINT_INTERVAL_SECONDS):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.saved = 0
+
+    def mark_done(self, date_str, league_id, page, total_pages, task_total, games):
+        with self._lock:
+            self._pending.append((date_str, str(league_id), page, total_pages, task_total, games))
+            due = len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Grava as unidades pendentes. Em caso de erro, elas voltam para a fila."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            if not rows:
+                return 0
+
+            query = """
+            INSERT INTO backfill_checkpoints (day, league_id, page, total_pages, task_total, games, completed_at)
+            VALUES %s
+            ON CONFLICT (day, league_id, page) DO UPDATE SET
+                total_pages = EXCLUDED.total_pages,
+                task_total = EXCLUDED.task_total,
+                games = EXCLUDED.games,
+                completed_at = EXCLUDED.completed_at;
+            """
+            conn = None
+            try:
+                # A conexão é obtida dentro do try: um timeout do pool também devolve as unidades à fila
+                conn = create_db_connection()
+                with get_cursor(conn) as cur:
+                    execute_values(cur, query, rows, template="(%s, %s, %s, %s, %s, %s, NOW())")
+                conn.commit()
+                self.saved += len(rows)
+                DB_ROWS_WRITTEN.inc(len(rows), table="backfill_checkpoints")
+                return len(rows)
+            except Exception as e:
+                print(f"Erro ao gravar {len(rows)} checkpoints do backfill: {e}")
+                if conn is not None:
+                    conn.rollback()
+                with self._lock:
+                    self._pending = rows + self._pending
+                return 0
+            finally:
+                release_db_connection(conn)
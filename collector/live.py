@@ -0,0 +1,256 @@
+# collector/live.py
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from api import codec
+from config.settings import (
+    ESOCCER_LEAGUE_IDS,
+    LIVE_INTERVAL_FAST_SECONDS,
+    LIVE_INTERVAL_SECONDS,
+    LIVE_INTERVAL_IDLE_SECONDS,
+    LIVE_GOAL_WINDOW_SECONDS,
+    LIVE_FULL_TIME_MINUTE,
+    LIVE_ODDS_INTERVAL_SECONDS,
+    TARGET_SPORT_ID,
+)
+from collector.scores import extrair_placar_detalhes, gravar_placares
+from db.aggregates import apply_event_batch
+from db.database import upsert_events_bulk
+from db.live import load_open_live_events, mark_live_ended, save_live_changes
+from db.models import Event
+from db.odds_history import insert_odds_history_bulk, parse_event_odds
+from utils import metrics
+from utils.helpers import converter_timestamp
+
+LIVE_POLLS = metrics.counter("betsapi_live_polls_total", "Pollings de /events/inplay por liga e intervalo escolhido")
+LIVE_EVENTS = metrics.counter("betsapi_live_events_total", "Eventos ao vivo vistos por polling, por resultado")
+
+MAX_TENTATIVAS_PLACAR = 5  # Pollings tentando o placar final de um jogo que saiu do inplay
+
+
+def _minuto(jogo):
+    try:
+        return int((jogo.get("timer") or {}).get("tm"))
+    except (TypeError, ValueError):
+        return None
+
+
+def estado_do_jogo(jogo):
+    """Campos acompanhados de um jogo ao vivo. O relógio fica de fora: muda a cada polling."""
+    scores = jogo.get("scores") or {}
+    return {
+        "ss": jogo.get("ss"),
+        "time_status": jogo.get("time_status"),
+        "scores": {periodo: scores[periodo] for periodo in sorted(scores)} if isinstance(scores, dict) else scores,
+    }
+
+
+def payload_hash(estado):
+    return hashlib.blake2b(codec.dumps_bytes(estado), digest_size=12).hexdigest()
+
+
+def diff_estado(anterior, novo):
+    """Campos que mudaram (null = removido); o estado completo na primeira vez."""
+    if anterior is None:
+        return dict(novo)
+    diff = {campo: valor for campo, valor in novo.items() if anterior.get(campo) != valor}
+    diff.update({campo: None for campo in anterior if campo not in novo})
+    return diff
+
+
+class LivePoller:
+    """
+    Acompanha os jogos ao vivo das ligas de eSoccer por /events/inplay.
+
+    Cada liga tem seu próprio intervalo, recalculado a cada polling:
+    LIVE_INTERVAL_FAST_SECONDS se algum jogo teve gol nos últimos
+    LIVE_GOAL_WINDOW_SECONDS ou passou de LIVE_FULL_TIME_MINUTE,
+    LIVE_INTERVAL_SECONDS com jogos em andamento e LIVE_INTERVAL_IDLE_SECONDS
+    sem nenhum. Os campos acompanhados de cada jogo passam por um hash: jogo
+    sem mudança não gera escrita; com mudança, grava o estado e só o diff.
+    Jogos que saem do inplay têm o placar final buscado em /event/view.
+    Todas as chamadas passam pelo mesmo limitador de taxa dos demais modos.
+    """
+
+    def __init__(self, client, league_ids=ESOCCER_LEAGUE_IDS, fetch_odds=False):
+        self.client = client
+        self.league_ids = list(league_ids)
+        self.fetch_odds = fetch_odds
+        self._estados = {}  # event_id -> (hash, estado) do último estado gravado
+        self._abertos = {league_id: set() for league_id in self.league_ids}  # Jogos vistos no último polling
+        self._minutos = {}  # event_id -> minuto do relógio no último polling
+        self._ultimo_gol = {}  # event_id -> time.monotonic() do último gol visto
+        self._odds_em = {}  # event_id -> time.monotonic() da última busca de odds
+        self._aguardando_placar = {}  # event_id -> (league_id, tentativas restantes)
+        self._proxima = {league_id: 0.0 for league_id in self.league_ids}
+
+    def restore(self, conn):
+        """
+        Carrega os jogos ainda abertos no banco: um reinício não regrava o que não
+        mudou, e os que terminaram enquanto o processo estava parado são encerrados.
+        """
+        for event_id, (league_id, hash_, estado) in load_open_live_events(conn).items():
+            self._estados[event_id] = (hash_, estado)
+            if str(league_id) in self._abertos:
+                self._abertos[str(league_id)].add(event_id)
+        return len(self._estados)
+
+    def intervalo(self, league_id, agora):
+        """Intervalo até o próximo polling da liga, pelo estado dos seus jogos."""
+        abertos = self._abertos.get(league_id) or ()
+        if not abertos:
+            pendentes = any(liga == league_id for liga, _ in self._aguardando_placar.values())
+            return LIVE_INTERVAL_SECONDS if pendentes else LIVE_INTERVAL_IDLE_SECONDS
+        for event_id in abertos:
+            if agora - self._ultimo_gol.get(event_id, -float("inf")) < LIVE_GOAL_WINDOW_SECONDS:
+                return LIVE_INTERVAL_FAST_SECONDS
+            if (self._minutos.get(event_id) or 0) >= LIVE_FULL_TIME_MINUTE:
+                return LIVE_INTERVAL_FAST_SECONDS
+        return LIVE_INTERVAL_SECONDS
+
+    def _jogos_ao_vivo(self, league_id):
+        """Todas as páginas de /events/inplay da liga; None se a API falhar."""
+        jogos = []
+        page = 1
+        while True:
+            data = self.client.get_inplay_events(page=page, sport_id=TARGET_SPORT_ID, league_id=league_id)
+            if data is None:
+                return None
+            jogos.extend(data.get("results") or [])
+            pager = data.get("pager") or {}
+            try:
+                total = int(pager.get("total") or 0)
+                per_page = int(pager.get("per_page") or 0)
+            except (TypeError, ValueError):
+                break
+            if not per_page or page * per_page >= total:
+                break
+            page += 1
+        return jogos
+
+    def poll_league(self, conn, league_id):
+        """
+        Um polling de uma liga: grava o que mudou num único commit.
+        Retorna o intervalo até o próximo polling.
+        """
+        jogos = self._jogos_ao_vivo(league_id)
+        if jogos is None:
+            return LIVE_INTERVAL_SECONDS  # Falha na API: mantém o estado e tenta de novo
+
+        agora = time.monotonic()
+        ts = datetime.now(timezone.utc)
+        novos_eventos = []
+        mudancas = []
+        gols = []
+        odds = []
+        vistos = set()
+        for jogo in jogos:
+            if not str(jogo.get("id", "")).isdigit():
+                continue
+            event_id = int(jogo["id"])
+            vistos.add(event_id)
+            self._minutos[event_id] = _minuto(jogo)
+            estado = estado_do_jogo(jogo)
+            hash_ = payload_hash(estado)
+            anterior = self._estados.get(event_id)
+
+            if anterior is None or anterior[0] != hash_:
+                estado_anterior = anterior[1] if anterior else None
+                if anterior is None:
+                    try:
+                        evento = Event.from_api(jogo)
+                    except (TypeError, ValueError) as e:
+                        print(f"Aviso: Jogo ao vivo {event_id} ignorado: {e}")
+                        continue
+                    evento.final_score = None  # Placar parcial não é final
+                    novos_eventos.append(evento)
+                elif estado_anterior and estado_anterior.get("ss") != estado["ss"]:
+                    gols.append(event_id)
+                mudancas.append(
+                    (
+                        event_id,
+                        int(league_id),
+                        estado["time_status"],
+                        estado["ss"],
+                        self._minutos[event_id],
+                        estado,
+                        hash_,
+                        ts,
+                        diff_estado(estado_anterior, estado),
+                    )
+                )
+                LIVE_EVENTS.inc(result="changed")
+            else:
+                LIVE_EVENTS.inc(result="unchanged")
+
+            if self.fetch_odds and (
+                anterior is None or anterior[0] != hash_ or agora - self._odds_em.get(event_id, 0) >= LIVE_ODDS_INTERVAL_SECONDS
+            ):
+                self._odds_em[event_id] = agora
+                event_odds = self.client.get_event_odds(event_id)
+                odds.extend(parse_event_odds(event_odds, event_id, converter_timestamp(jogo.get("time"))))
+
+        encerrados = self._abertos.get(league_id, set()) - vistos
+        for event_id in encerrados:
+            self._aguardando_placar[event_id] = (league_id, MAX_TENTATIVAS_PLACAR)
+        placares = self._placares_finais(league_id, vistos)
+
+        if novos_eventos or mudancas or encerrados or placares or odds:
+            if novos_eventos:
+                apply_event_batch(conn, novos_eventos)
+                upsert_events_bulk(conn, novos_eventos)
+            save_live_changes(conn, mudancas)
+            mark_live_ended(conn, encerrados)
+            insert_odds_history_bulk(conn, odds)
+            if placares:
+                gravar_placares(conn, placares)
+            conn.commit()
+
+        # Memória só muda depois do commit: se a gravação falhar, o próximo polling regrava
+        for event_id, _, _, _, _, estado, hash_, _, _ in mudancas:
+            self._estados[event_id] = (hash_, estado)
+        for event_id in gols:
+            self._ultimo_gol[event_id] = agora
+        for event_id in placares:
+            self._esquecer(event_id)
+        self._abertos[league_id] = vistos
+
+        intervalo = self.intervalo(league_id, agora)
+        LIVE_POLLS.inc(league_id=league_id, interval=intervalo)
+        if mudancas or placares:
+            print(
+                f"[Ao vivo] Liga {league_id}: {len(vistos)} jogos, {len(mudancas)} alterados, "
+                f"{len(placares)} placares finais; próximo polling em {intervalo:.0f}s."
+            )
+        return intervalo
+
+    def _placares_finais(self, league_id, vistos):
+        """Placar final (/event/view) dos jogos que saíram do inplay desta liga."""
+        placares = {}
+        for event_id, (liga, tentativas) in list(self._aguardando_placar.items()):
+            if liga != league_id or event_id in vistos:
+                continue
+            details = self.client.get_event_details(event_id)
+            results = (details or {}).get("results")
+            encerrado = isinstance(results, list) and results and str(results[0].get("time_status")) == "3"
+            score = extrair_placar_detalhes(details) if encerrado else None
+            if score:
+                placares[event_id] = score
+                continue
+            if tentativas <= 1:
+                self._esquecer(event_id)  # Fica para o job de placares pendentes
+            else:
+                self._aguardando_placar[event_id] = (liga, tentativas - 1)
+        return placares
+
+    def _esquecer(self, event_id):
+        for mapa in (self._estados, self._minutos, self._ultimo_gol, self._odds_em, self._aguardando_placar):
+            mapa.pop(event_id, None)
+
+    def next_due(self):
+        """(league_id, instante em time.monotonic()) da próxima liga a consultar."""
+        return min(self._proxima.items(), key=lambda item: item[1])
+
+    def schedule(self, league_id, intervalo):
+        self._proxima[league_id] = time.monotonic() + intervalo
@@ -0,0 +1,318 @@
+# collector/pipeline.py
+import contextvars
+import queue
+import threading
+import time
+import traceback
+
+from config.settings import (
+    PIPELINE_PAGE_WORKERS,
+    PIPELINE_ODDS_WORKERS,
+    PIPELINE_DB_WRITERS,
+    PIPELINE_BATCH_SIZE,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_FLUSH_SECONDS,
+)
+from utils import metrics
+
+_FIM = object()  # Sentinela de fim de estágio
+
+PIPELINE_QUEUE_DEPTH = metrics.gauge("betsapi_pipeline_queue_depth", "Itens aguardando em cada fila do pipeline")
+PIPELINE_STAGE_SECONDS = metrics.histogram("betsapi_pipeline_stage_seconds", "Tempo de trabalho por item em cada estágio")
+PIPELINE_BLOCKED_SECONDS = metrics.histogram(
+    "betsapi_pipeline_backpressure_seconds", "Tempo bloqueado esperando espaço na fila seguinte"
+)
+PIPELINE_GAMES = metrics.counter("betsapi_pipeline_games_total", "Jogos que saíram do pipeline, por resultado")
+
+
+def _put(fila, item, nome):
+    """put() bloqueante que mede o tempo de backpressure."""
+    inicio = time.perf_counter()
+    fila.put(item)
+    PIPELINE_BLOCKED_SECONDS.observe(time.perf_counter() - inicio, queue=nome)
+
+
+class IngestionPipeline:
+    """
+    Pipeline produtor/consumidor em três estágios ligados por filas limitadas:
+
+      1. páginas: busca /events/ended de cada unidade e seleciona os jogos
+      2. odds:    monta cada jogo (inclui a chamada de odds summary) em paralelo
+      3. banco:   agrupa os jogos prontos e grava em lote
+
+    As filas limitadas dão backpressure: se o banco ficar lento, os estágios de
+    rede esperam em vez de acumular memória. Assim a latência de rede e a do banco
+    se sobrepõem em vez de se somarem jogo a jogo.
+
+    O estágio de páginas não conhece a API nem o banco: recebe funções do chamador.
+    - fetch_page(unit, page) -> resposta de /events/ended
+    - select_games(unit, jogos) -> [(jogo, motivo, buscar_odds)] só com os jogos a gravar
+    - prepare_game(jogo, motivo, buscar_odds) -> (evento, odds, historico) ou None
+    - save_batch(eventos, odds, historico) -> conjunto de event_ids que falharam
+    - on_unit_done(unit, page, total_pages, total, gravados, falhas), opcional
+    - on_game_failed(unit, jogo) para cada jogo que não pôde ser gravado, opcional
+    - page_info(event_data, unit) -> (total, total_pages), opcional
+    - stop_after(unit, page, jogos) -> True encerra a unidade nesta página, opcional
+      (ex.: a busca incremental alcançou a marca d'água)
+    - should_run() -> False interrompe a busca de novas páginas/odds
+
+    As threads dos estágios herdam o contexto de quem chama run() (ex.: o job de
+    quota.job() a que as chamadas de API são atribuídas).
+    """
+
+    def __init__(
+        self,
+        fetch_page,
+        select_games,
+        prepare_game,
+        save_batch,
+        should_run,
+        on_unit_done=None,
+        on_game_failed=None,
+        page_info=None,
+        stop_after=None,
+        page_workers=PIPELINE_PAGE_WORKERS,
+        odds_workers=PIPELINE_ODDS_WORKERS,
+        db_writers=PIPELINE_DB_WRITERS,
+        batch_size=PIPELINE_BATCH_SIZE,
+        queue_size=PIPELINE_QUEUE_SIZE,
+        flush_seconds=PIPELINE_FLUSH_SECONDS,
+    ):
+        self.fetch_page = fetch_page
+        self.select_games = select_games
+        self.prepare_game = prepare_game
+        self.save_batch = save_batch
+        self.should_run = should_run
+        self.on_unit_done = on_unit_done
+        self.on_game_failed = on_game_failed
+        self.page_info = page_info
+        self.stop_after = stop_after
+        self.page_workers = max(1, page_workers)
+        self.odds_workers = max(1, odds_workers)
+        self.db_writers = max(1, db_writers)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+
+        self.units_queue = queue.Queue()
+        self.games_queue = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+
+        self._lock = threading.Lock()
+        self._unidades = {}  # (date_str, league_id, page) -> contadores da página
+        self.pages_fetched = 0
+        self.pages_failed = 0
+        self.games_saved = 0
+        self.games_failed = 0
+
+    # ----- contabilidade por página -----
+
+    def _registrar_pagina(self, unit, page, total_pages, total, n_jogos):
+        key = (unit.date_str, unit.league_id, page)
+        if n_jogos == 0:
+            self._concluir(unit, page, total_pages, total, 0, 0)
+            return key
+        with self._lock:
+            self._unidades[key] = {
+                "restantes": n_jogos,
+                "gravados": 0,
+                "falhas": 0,
+                "meta": (unit, page, total_pages, total),
+            }
+        return key
+
+    def _contabilizar(self, key, sucesso, jogo=None):
+        if not sucesso and self.on_game_failed is not None:
+            with self._lock:
+                unit = self._unidades[key]["meta"][0]
+            try:
+                self.on_game_failed(unit, jogo)
+            except Exception as e:
+                print(f"Erro no callback de jogo com falha ({jogo.get('id') if jogo else None}): {e}")
+        with self._lock:
+            info = self._unidades[key]
+            info["restantes"] -= 1
+            if sucesso:
+                info["gravados"] += 1
+                self.games_saved += 1
+            else:
+                info["falhas"] += 1
+                self.games_failed += 1
+            PIPELINE_GAMES.inc(status="saved" if sucesso else "failed")
+            if info["restantes"] > 0:
+                return
+            del self._unidades[key]
+        unit, page, total_pages, total = info["meta"]
+        self._concluir(unit, page, total_pages, total, info["gravados"], info["falhas"])
+
+    def _concluir(self, unit, page, total_pages, total, gravados, falhas):
+        if self.on_unit_done is None:
+            return
+        try:
+            self.on_unit_done(unit, page, total_pages, total, gravados, falhas)
+        except Exception as e:
+            print(f"Erro no callback de unidade concluída ({unit.date_str}, {unit.league_id}, {page}): {e}")
+
+    def _falha_pagina(self, unit, page):
+        """Página que não pôde ser lida conta como uma falha da unidade (sem checkpoint)."""
+        with self._lock:
+            self.pages_failed += 1
+        self._concluir(unit, page, unit.total_pages, unit.task_size, 0, 1)
+
+    # ----- estágios -----
+
+    def _estagio_paginas(self):
+        while True:
+            unit = self.units_queue.get()
+            if unit is _FIM:
+                return
+            if not self.should_run():
+                continue  # Drena a fila sem buscar nada
+            try:
+                self._processar_unidade(unit)
+            except Exception as e:
+                print(f"Erro no estágio de páginas ({unit.date_str}, liga {unit.league_id}): {e}")
+                traceback.print_exc()
+                self._falha_pagina(unit, unit.page)
+
+    def _processar_unidade(self, unit):
+        page = unit.page
+        event_data = unit.prefetched
+        while self.should_run():
+            if event_data is None:
+                with PIPELINE_STAGE_SECONDS.time(stage="pages"):
+                    event_data = self.fetch_page(unit, page)
+            if not event_data:
+                print(f"Erro crítico ao buscar dados para {unit.date_str}, liga {unit.league_id}, página {page}.")
+                self._falha_pagina(unit, page)
+                return
+            with self._lock:
+                self.pages_fetched += 1
+
+            jogos = event_data.get("results", []) or []
+            total, total_pages = self.page_info(event_data, unit) if self.page_info else (len(jogos), 1)
+            if unit.total_pages is not None:
+                total_pages = unit.total_pages
+
+            selecionados = self.select_games(unit, jogos) if jogos else []
+            key = self._registrar_pagina(unit, page, total_pages, total, len(selecionados))
+            for jogo, motivo, buscar_odds in selecionados:
+                _put(self.games_queue, (key, jogo, motivo, buscar_odds), "games")  # Bloqueia se o estágio de odds atrasar
+
+            # Unidades planejadas cobrem uma página; sem plano, segue para as próximas
+            if unit.total_pages is not None or not jogos or page >= (total_pages or 0):
+                return
+            if self.stop_after is not None and self.stop_after(unit, page, jogos):
+                return
+            page += 1
+            event_data = None
+
+    def _estagio_odds(self):
+        while True:
+            item = self.games_queue.get()
+            if item is _FIM:
+                return
+            key, jogo, motivo, buscar_odds = item
+            resultado = None
+            if self.should_run():
+                try:
+                    with PIPELINE_STAGE_SECONDS.time(stage="odds"):
+                        resultado = self.prepare_game(jogo, motivo, buscar_odds)
+                    if resultado is None:
+                        self._contabilizar(key, True)  # Jogo ignorado não é falha
+                        continue
+                except Exception as e:
+                    print(f"Erro ao preparar jogo {jogo.get('id')}: {e}")
+            if resultado is None:
+                self._contabilizar(key, False, jogo)  # Falhou ou interrompido antes de preparar
+                continue
+            _put(self.write_queue, (key, jogo, resultado), "writes")  # Bloqueia se o banco atrasar
+
+    def _estagio_banco(self):
+        lote = []
+        fim = False
+        while not fim:
+            try:
+                item = self.write_queue.get(timeout=self.flush_seconds)
+                if item is _FIM:
+                    fim = True
+                else:
+                    lote.append(item)
+            except queue.Empty:
+                pass
+            if lote and (fim or len(lote) >= self.batch_size or self.write_queue.empty()):
+                self._gravar(lote)
+                lote = []
+
+    def _gravar(self, lote):
+        eventos = [evento for _, _, (evento, _, _) in lote]
+        odds = [odd for _, _, (_, odds_jogo, _) in lote for odd in odds_jogo]
+        historico = [tick for _, _, (_, _, historico_jogo) in lote for tick in historico_jogo]
+        try:
+            with PIPELINE_STAGE_SECONDS.time(stage="db_batch"):
+                falhados = self.save_batch(eventos, odds, historico)
+        except Exception as e:
+            print(f"Erro ao gravar lote de {len(eventos)} eventos: {e}")
+            falhados = {str(evento.event_id) for evento in eventos}
+        falhados = {str(event_id) for event_id in falhados}
+        for key, jogo, (evento, _, _) in lote:
+            self._contabilizar(key, str(evento.event_id) not in falhados, jogo)
+
+    # ----- execução -----
+
+    def _iniciar(self, alvo, quantidade, nome):
+        # Uma cópia do contexto por thread (um Context não pode rodar em duas ao mesmo tempo)
+        threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(alvo,), name=f"{nome}-{i}", daemon=True)
+            for i in range(quantidade)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def queue_depths(self):
+        return {
+            "units": self.units_queue.qsize(),
+            "games": self.games_queue.qsize(),
+            "writes": self.write_queue.qsize(),
+        }
+
+    def run(self, units):
+        """Processa as unidades na ordem recebida e retorna estatísticas ao final."""
+        filas = {"units": self.units_queue, "games": self.games_queue, "writes": self.write_queue}
+        for nome, fila in filas.items():
+            PIPELINE_QUEUE_DEPTH.set_function(fila.qsize, queue=nome)
+        try:
+            return self._executar(units)
+        finally:
+            for nome in filas:
+                PIPELINE_QUEUE_DEPTH.set_function(None, queue=nome)
+                PIPELINE_QUEUE_DEPTH.set(0, queue=nome)
+
+    def _executar(self, units):
+        for unit in units:
+            self.units_queue.put(unit)
+        for _ in range(self.page_workers):
+            self.units_queue.put(_FIM)
+
+        paginas = self._iniciar(self._estagio_paginas, self.page_workers, "pagina")
+        odds = self._iniciar(self._estagio_odds, self.odds_workers, "odds")
+        banco = self._iniciar(self._estagio_banco, self.db_writers, "banco")
+
+        # Encerramento em cascata: cada estágio termina e sinaliza o próximo
+        for thread in paginas:
+            thread.join()
+        for _ in odds:
+            self.games_queue.put(_FIM)
+        for thread in odds:
+            thread.join()
+        for _ in banco:
+            self.write_queue.put(_FIM)
+        for thread in banco:
+            thread.join()
+
+        return {
+            "pages_fetched": self.pages_fetched,
+            "pages_failed": self.pages_failed,
+            "games_saved": self.games_saved,
+            "games_failed": self.games_failed,
+        }
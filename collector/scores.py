@@ -0,0 +1,163 @@
+# collector/scores.py
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytz
+
+from api.async_client import AsyncBetsAPIClient
+from config.settings import TIMEZONE, TARGET_SPORT_ID, SCORE_PENDING_AFTER_HOURS, SCORE_WRITE_BATCH_SIZE
+from db.aggregates import apply_score_updates
+from db.h2h import update_head_to_head
+from db.database import get_pending_score_events, update_event_scores_bulk
+from utils.helpers import parse_score
+
+
+def extrair_placar_detalhes(event_data):
+    """Extrai o placar de uma resposta de /event/view (aceita os formatos conhecidos)."""
+    if not event_data or event_data.get("success") != 1:
+        return None
+    results = event_data.get("results", {})
+
+    # Formato 1: results é um dicionário com chave 'ss'
+    if isinstance(results, dict) and "ss" in results:
+        return parse_score(results.get("ss", ""))
+
+    # Formato 2: results é uma lista com pelo menos um item que é dicionário com chave 'ss'
+    if isinstance(results, list) and len(results) > 0 and isinstance(results[0], dict):
+        return parse_score(results[0].get("ss", ""))
+
+    # Formato 3: results tem uma chave 'scores' que contém o placar
+    if isinstance(results, dict) and isinstance(results.get("scores"), dict):
+        scores = results["scores"]
+        # Pode estar em diferentes formatos dependendo do esporte ('ft' = full time)
+        return parse_score(scores.get("ft") or scores.get("total"))
+
+    return None
+
+
+def agrupar_por_liga_dia(pending_events):
+    """
+    Agrupa eventos pendentes por (sport_id, league_id, dia UTC).
+    Eventos sem liga ou horário vão direto para a lista de sobras (event/view).
+    """
+    grupos = defaultdict(set)
+    sobras = set()
+    for event in pending_events:
+        event_id = int(event["event_id"])
+        event_ts = event.get("event_timestamp")
+        if event.get("league_id") is None or event_ts is None:
+            sobras.add(event_id)
+            continue
+        day_str = event_ts.astimezone(pytz.utc).strftime("%Y%m%d")
+        sport_id = event.get("sport_id") or TARGET_SPORT_ID
+        grupos[(sport_id, event["league_id"], day_str)].add(event_id)
+    return grupos, sobras
+
+
+async def _placares_do_dia(client, sport_id, league_id, day_str):
+    """Lê todas as páginas de /events/ended de uma liga/dia e retorna {event_id: placar}."""
+    placares = {}
+
+    def coletar(event_data):
+        for jogo in (event_data or {}).get("results", []) or []:
+            score = parse_score(jogo.get("ss"))
+            if score and str(jogo.get("id", "")).isdigit():
+                placares[int(jogo["id"])] = score
+
+    primeira = await client.get_ended_events(page=1, sport_id=sport_id, day_str=day_str, league_id=league_id)
+    coletar(primeira)
+    pager = (primeira or {}).get("pager") or {}
+    total_pages = int(pager.get("total_pages", 1) or 1)
+
+    # Demais páginas em paralelo; o limitador global controla a vazão
+    restantes = await asyncio.gather(
+        *(
+            client.get_ended_events(page=page, sport_id=sport_id, day_str=day_str, league_id=league_id)
+            for page in range(2, total_pages + 1)
+        )
+    )
+    for event_data in restantes:
+        coletar(event_data)
+    return placares
+
+
+async def _buscar_placares(grupos, sobras):
+    """Busca placares por páginas de liga/dia e usa event/view apenas para o que sobrar."""
+    encontrados = {}
+    async with AsyncBetsAPIClient() as client:
+        chaves = list(grupos.keys())
+        por_grupo = await asyncio.gather(*(_placares_do_dia(client, *chave) for chave in chaves))
+        for chave, placares in zip(chaves, por_grupo):
+            for event_id in grupos[chave]:
+                if event_id in placares:
+                    encontrados[event_id] = placares[event_id]
+
+        pendentes = set(sobras)
+        for event_ids in grupos.values():
+            pendentes.update(event_id for event_id in event_ids if event_id not in encontrados)
+
+        if pendentes:
+            print(f"  {len(pendentes)} eventos não encontrados nas páginas; consultando event/view individualmente...")
+            ids = sorted(pendentes)
+            detalhes = await asyncio.gather(*(client.get_event_details(event_id) for event_id in ids))
+            for event_id, event_data in zip(ids, detalhes):
+                score = extrair_placar_detalhes(event_data)
+                if score:
+                    encontrados[event_id] = score
+
+    return encontrados
+
+
+def gravar_placares(conn, placares):
+    """
+    Grava placares ({event_id: placar}) junto com os agregados e confrontos afetados.
+    Não faz commit. Retorna os event_ids atualizados.
+    """
+    apply_score_updates(conn, placares)  # Mesma transação: agregados e placares juntos
+    atualizados = update_event_scores_bulk(conn, placares)
+    update_head_to_head(conn, atualizados)
+    return atualizados
+
+
+def resolve_pending_scores(conn, older_than_hours=SCORE_PENDING_AFTER_HOURS, batch_size=SCORE_WRITE_BATCH_SIZE):
+    """
+    Atualiza o placar de eventos pendentes em lote.
+
+    1. Lê os pendentes e encerra a transação de leitura.
+    2. Agrupa por (liga, dia) e busca cada dia em /events/ended uma única vez,
+       em paralelo pelo AsyncBetsAPIClient; event/view só para as sobras.
+    3. Grava os placares (e os agregados) em lotes curtos, com um commit por lote.
+
+    Retorna a quantidade de eventos atualizados.
+    """
+    threshold = datetime.now(pytz.timezone(TIMEZONE)) - timedelta(hours=older_than_hours)
+    pending_events = get_pending_score_events(conn, threshold)
+    if not pending_events:
+        print("Nenhum evento pendente de atualização de placar encontrado.")
+        return 0
+
+    grupos, sobras = agrupar_por_liga_dia(pending_events)
+    print(
+        f"Encontrados {len(pending_events)} eventos para atualizar o placar "
+        f"({len(grupos)} grupos liga/dia, {len(sobras)} sem liga/horário)."
+    )
+
+    start_time = time.time()
+    placares = asyncio.run(_buscar_placares(grupos, sobras))
+    print(f"  {len(placares)} placares encontrados na API em {time.time() - start_time:.1f}s.")
+
+    updated_count = 0
+    itens = list(placares.items())
+    for i in range(0, len(itens), batch_size):
+        lote = dict(itens[i : i + batch_size])
+        try:
+            updated_count += len(gravar_placares(conn, lote))
+            conn.commit()
+        except Exception as e:
+            print(f"Erro ao gravar lote de placares ({len(lote)} eventos): {e}")
+            conn.rollback()
+
+    print(f"Atualização completa. {updated_count} eventos tiveram seu placar atualizado.")
+    return updated_count
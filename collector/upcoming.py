@@ -0,0 +1,208 @@
+# collector/upcoming.py
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+
+from config.settings import (
+    ESOCCER_LEAGUE_IDS,
+    UPCOMING_HORIZON_HOURS,
+    UPCOMING_ODDS_LEAD_SECONDS,
+    UPCOMING_ODDS_SPACING_SECONDS,
+    UPCOMING_ODDS_RETRY_SECONDS,
+    UPCOMING_STALE_HOURS,
+    TARGET_SPORT_ID,
+)
+from db.aggregates import apply_event_batch
+from db.database import delete_stale_fixtures, get_events_with_odds, insert_odds_bulk, upsert_events_bulk
+from db.models import Event, parse_odds_summary
+from utils import metrics
+from utils.helpers import converter_timestamp
+
+UPCOMING_FIXTURES = metrics.counter("betsapi_upcoming_fixtures_total", "Jogos agendados vistos por releitura, por resultado")
+UPCOMING_SNAPSHOTS = metrics.counter("betsapi_upcoming_snapshots_total", "Snapshots de odds antes do início, por resultado")
+UPCOMING_QUEUE = metrics.gauge("betsapi_upcoming_queue", "Snapshots de odds agendados")
+
+
+def _dados_do_jogo(evento):
+    """Colunas do jogo agendado, sem has_odds/last_odds_update (mudam com o snapshot, não com a agenda)."""
+    return evento.row()[:-2] if evento is not None else None
+
+
+class UpcomingScheduler:
+    """
+    Insere os jogos agendados das ligas de eSoccer antes do início e captura as
+    odds pré-jogo de cada um UPCOMING_ODDS_LEAD_SECONDS antes do apito.
+
+    Os snapshots ficam numa fila de prioridade (heapq) ordenada pelo instante
+    agendado e saem um por vez, com pelo menos UPCOMING_ODDS_SPACING_SECONDS
+    entre chamadas: jogos que começam juntos não geram rajada na API. Jogo que
+    muda de horário é reagendado; a entrada antiga fica na fila e é descartada
+    ao chegar no topo. Com has_odds gravado aqui, o caminho de jogos encerrados
+    (ids_com_odds em main.py) pula a chamada de odds e só preenche o placar.
+
+    Os jogos são gravados com upcoming=TRUE: ficam fora dos agregados e da fila
+    de placares até o coletor de encerrados, o ao vivo ou o update-scores os
+    verem começar. Agendados que não começam em UPCOMING_STALE_HOURS são apagados
+    na releitura. Mudança de horário atualiza a mesma linha de events (em schema
+    particionado, upsert_events_bulk move a linha para a partição do novo horário).
+    """
+
+    def __init__(self, client, league_ids=ESOCCER_LEAGUE_IDS):
+        self.client = client
+        self.league_ids = list(league_ids)
+        self._fila = []  # heap de (instante do snapshot em time.time(), event_id)
+        self._agendados = {}  # event_id -> (instante do snapshot, Event)
+        self._gravados = {}  # event_id -> Event já gravado (evita regravar o que não mudou)
+        self._ultima_chamada = 0.0
+        UPCOMING_QUEUE.set_function(lambda: len(self._agendados))
+
+    def _jogos_agendados(self, league_id, limite):
+        """Páginas de /events/upcoming da liga até 'limite' (datetime); None se a API falhar."""
+        jogos = []
+        page = 1
+        while True:
+            data = self.client.get_upcoming_events(page=page, sport_id=TARGET_SPORT_ID, league_id=league_id)
+            if data is None:
+                return None
+            resultados = data.get("results") or []
+            for jogo in resultados:
+                inicio = converter_timestamp(jogo.get("time"))
+                if inicio is not None and inicio <= limite:
+                    jogos.append(jogo)
+            ultimo = converter_timestamp(resultados[-1].get("time")) if resultados else None
+            pager = data.get("pager") or {}
+            try:
+                total_pages = int(pager.get("total_pages") or 1)
+            except (TypeError, ValueError):
+                break
+            # Lista vem do mais próximo ao mais distante: passou do horizonte, o resto também passou
+            if not resultados or page >= total_pages or (ultimo is not None and ultimo > limite):
+                break
+            page += 1
+        return jogos
+
+    def refresh(self, conn):
+        """
+        Busca os jogos agendados dentro de UPCOMING_HORIZON_HOURS, grava os novos ou
+        alterados num único commit e (re)agenda o snapshot de odds de quem ainda não tem.
+        Retorna a quantidade de jogos gravados.
+        """
+        limite = datetime.now(timezone.utc) + timedelta(hours=UPCOMING_HORIZON_HOURS)
+        eventos = []
+        for league_id in self.league_ids:
+            jogos = self._jogos_agendados(league_id, limite)
+            if jogos is None:
+                print(f"Erro ao buscar jogos agendados da liga {league_id}. Mantendo a fila atual.")
+                continue
+            for jogo in jogos:
+                try:
+                    evento = Event.from_api(jogo)
+                except (TypeError, ValueError, KeyError) as e:
+                    print(f"Aviso: Jogo agendado {jogo.get('id')} ignorado: {e}")
+                    continue
+                if evento.event_timestamp is None:
+                    continue
+                evento.final_score = None  # Ainda não começou
+                evento.upcoming = True
+                eventos.append(evento)
+
+        apagados = delete_stale_fixtures(conn, datetime.now(timezone.utc) - timedelta(hours=UPCOMING_STALE_HOURS))
+        if apagados:
+            UPCOMING_FIXTURES.inc(apagados, result="stale")
+            print(f"[Agendados] {apagados} jogos que não começaram em {UPCOMING_STALE_HOURS:g}h foram apagados.")
+        if not eventos:
+            conn.commit()
+            return 0
+
+        com_odds = get_events_with_odds(conn, [evento.event_id for evento in eventos])
+        alterados = [
+            evento for evento in eventos if _dados_do_jogo(self._gravados.get(evento.event_id)) != _dados_do_jogo(evento)
+        ]
+        if alterados:
+            apply_event_batch(conn, alterados)  # Agendado não conta; jogo que já começou continua contando
+            upsert_events_bulk(conn, alterados)
+        conn.commit()
+        UPCOMING_FIXTURES.inc(len(alterados), result="written")
+        UPCOMING_FIXTURES.inc(len(eventos) - len(alterados), result="unchanged")
+
+        # Memória só muda depois do commit
+        for evento in alterados:
+            self._gravados[evento.event_id] = evento
+        for evento in eventos:
+            if evento.event_id in com_odds:
+                self._agendados.pop(evento.event_id, None)  # Odds já gravadas: entrada na fila vira obsoleta
+            else:
+                atual = self._agendados.get(evento.event_id)
+                if atual is None or atual[1].event_timestamp != evento.event_timestamp:  # Novo ou mudou de horário
+                    self._agendar(evento, evento.event_timestamp.timestamp() - UPCOMING_ODDS_LEAD_SECONDS)
+        self._esquecer_iniciados()
+        print(
+            f"[Agendados] {len(eventos)} jogos nas próximas {UPCOMING_HORIZON_HOURS:g}h, "
+            f"{len(alterados)} gravados, {len(self._agendados)} snapshots na fila."
+        )
+        return len(alterados)
+
+    def _agendar(self, evento, quando):
+        self._agendados[evento.event_id] = (quando, evento)
+        heapq.heappush(self._fila, (quando, evento.event_id))
+
+    def _esquecer_iniciados(self):
+        agora = datetime.now(timezone.utc)
+        for event_id, evento in list(self._gravados.items()):
+            if evento.event_timestamp < agora:
+                del self._gravados[event_id]
+
+    def _descartar_obsoletos(self):
+        """Remove do topo da fila as entradas reagendadas ou já resolvidas."""
+        while self._fila:
+            quando, event_id = self._fila[0]
+            atual = self._agendados.get(event_id)
+            if atual is not None and atual[0] == quando:
+                return
+            heapq.heappop(self._fila)
+
+    def next_due(self):
+        """Instante (time.time()) do próximo snapshot, já com o espaçamento mínimo; None se a fila estiver vazia."""
+        self._descartar_obsoletos()
+        if not self._fila:
+            return None
+        return max(self._fila[0][0], self._ultima_chamada + UPCOMING_ODDS_SPACING_SECONDS)
+
+    def run_due(self, conn):
+        """
+        Captura as odds do snapshot vencido no topo da fila (no máximo um por chamada).
+        Resumo vazio é tentado de novo a cada UPCOMING_ODDS_RETRY_SECONDS até o início;
+        depois disso o jogo fica para o caminho de jogos encerrados.
+        Retorna True se gravou odds.
+        """
+        agora = time.time()
+        quando = self.next_due()
+        if quando is None or quando > agora:
+            return False
+        _, event_id = heapq.heappop(self._fila)
+        _, evento = self._agendados.pop(event_id)
+        inicio = evento.event_timestamp.timestamp()
+        if agora >= inicio:
+            UPCOMING_SNAPSHOTS.inc(result="late")  # Fila atrasou além do início: fica para o caminho de encerrados
+            return False
+
+        self._ultima_chamada = agora
+        odds_summary = self.client.get_event_odds_summary(event_id)
+        odds_list, last_update_time = parse_odds_summary(odds_summary, event_id, evento.event_timestamp)
+        if not odds_list:
+            if agora + UPCOMING_ODDS_RETRY_SECONDS < inicio:
+                self._agendar(evento, agora + UPCOMING_ODDS_RETRY_SECONDS)
+                UPCOMING_SNAPSHOTS.inc(result="retry")
+            else:
+                UPCOMING_SNAPSHOTS.inc(result="missing")
+            return False
+
+        evento.has_odds = True
+        evento.last_odds_update = last_update_time if last_update_time else datetime.now(timezone.utc)
+        apply_event_batch(conn, [evento])
+        upsert_events_bulk(conn, [evento])
+        insert_odds_bulk(conn, odds_list)
+        conn.commit()
+        self._gravados[event_id] = evento
+        UPCOMING_SNAPSHOTS.inc(result="captured")
+        return True
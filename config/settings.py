@@ -10,11 +10,31 @@ if os.path.exists(dotenv_path):
 # Configurações da API
 BETSAPI_TOKEN = os.getenv("BETSAPI_TOKEN")
 BASE_URL_V1 = os.getenv("API_BASE_URL", "https://api.b365api.com/v1")
-BASE_URL_V2 = "https://api.b365api.com/v2"
+BASE_URL_V2 = os.getenv("API_BASE_URL_V2", "https://api.b365api.com/v2")
+
+# Cache em disco de respostas imutáveis (páginas de dias encerrados, odds de jogos finalizados)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", "cache", "responses.sqlite3")
+)
+RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", 256))  # Acima disso, remove os menos usados (LRU)
+CACHE_IMMUTABLE_AFTER_DAYS = int(os.getenv("CACHE_IMMUTABLE_AFTER_DAYS", 2))  # Dias mais antigos nunca expiram
+CACHE_RECENT_TTL_SECONDS = int(os.getenv("CACHE_RECENT_TTL_SECONDS", 120))  # TTL para hoje/ontem
+
+# Requisições idênticas em voo ao mesmo tempo compartilham uma única chamada (api/coalescing.py)
+REQUEST_COALESCING_ENABLED = os.getenv("REQUEST_COALESCING_ENABLED", "1") == "1"
+NOT_FOUND_TTL_SECONDS = int(os.getenv("NOT_FOUND_TTL_SECONDS", 60))  # Cache negativo de "event not found" (0 desliga)
 
 # Configurações do Banco de Dados
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Pool de conexões (compartilhado por workers do backfill e thread de placares)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 5))  # Não ultrapassar o limite de conexões do plano do Postgres
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 60))  # Espera máxima por uma conexão livre
+DB_CONN_MAX_LIFETIME_SECONDS = int(os.getenv("DB_CONN_MAX_LIFETIME_SECONDS", 1800))  # Recicla conexões antigas
+DB_CONN_IDLE_CHECK_SECONDS = int(os.getenv("DB_CONN_IDLE_CHECK_SECONDS", 30))  # Testa conexões ociosas há mais tempo
+
 # Configurações Gerais
 TARGET_SPORT_ID = int(os.getenv("SPORT_ID", 3))  # Buscar sport_id do ambiente ou usar 3 (esports)
 TIMEZONE = "America/Sao_Paulo"
@@ -22,6 +42,89 @@ REQUEST_DELAY_SECONDS = 1.1  # Tempo de espera entre requisições API (evitar r
 MAX_RETRIES = 3  # Máximo de tentativas para requisições falhas
 RETRY_DELAY_SECONDS = 5  # Tempo de espera antes de tentar novamente
 
+# Limite de requisições compartilhado por todo o processo (token bucket)
+# Padrão equivale ao antigo delay fixo entre requisições; ajustar para a cota real do plano
+API_REQUESTS_PER_SECOND = float(os.getenv("API_REQUESTS_PER_SECOND", 1 / REQUEST_DELAY_SECONDS))
+API_RATE_BURST = int(os.getenv("API_RATE_BURST", 1))  # Quantas requisições podem sair de uma vez
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", 200))  # Conexões simultâneas do cliente async
+
+# Cota horária do token (api/quota.py): contagem por endpoint e modo gravada em api_usage
+QUOTA_HOURLY_LIMIT = int(os.getenv("QUOTA_HOURLY_LIMIT", 3600))  # Chamadas por hora do plano (headers X-RateLimit-* têm prioridade)
+QUOTA_RESERVE_CALLS = int(os.getenv("QUOTA_RESERVE_CALLS", 300))  # Reservadas para jobs prioritários (novos jogos, placares)
+QUOTA_FLUSH_SECONDS = int(os.getenv("QUOTA_FLUSH_SECONDS", 60))  # Intervalo de gravação das contagens no banco
+
+# Modo incremental (fetch-new-games): marca d'água por liga em fetch_state
+INCREMENTAL_MAX_PAGES = int(os.getenv("INCREMENTAL_MAX_PAGES", 5))  # Limite de páginas por liga por execução
+INCREMENTAL_OVERLAP_SECONDS = int(os.getenv("INCREMENTAL_OVERLAP_SECONDS", 600))  # Revisita jogos próximos da marca
+INCREMENTAL_RETRY_HOURS = int(os.getenv("INCREMENTAL_RETRY_HOURS", 6))  # Por quanto tempo um jogo com falha segura a marca
+
+# Modo daemon: intervalos dos jobs internos (substituem o cron)
+DAEMON_FETCH_INTERVAL_SECONDS = int(os.getenv("DAEMON_FETCH_INTERVAL_SECONDS", 120))  # Novos jogos
+DAEMON_SCORES_INTERVAL_SECONDS = int(os.getenv("DAEMON_SCORES_INTERVAL_SECONDS", 900))  # Placares pendentes
+DAEMON_RETENTION_INTERVAL_SECONDS = int(os.getenv("DAEMON_RETENTION_INTERVAL_SECONDS", 86400))  # Limpeza
+DAYS_TO_KEEP = int(os.getenv("DAYS_TO_KEEP", 60))  # Janela deslizante de dados
+
+# Resolução de placares pendentes
+SCORE_PENDING_AFTER_HOURS = int(os.getenv("SCORE_PENDING_AFTER_HOURS", 3))  # Eventos iniciados há mais tempo
+SCORE_WRITE_BATCH_SIZE = int(os.getenv("SCORE_WRITE_BATCH_SIZE", 500))  # Placares por transação
+
+# Checkpoints do backfill (tabela backfill_checkpoints)
+BACKFILL_CHECKPOINT_BATCH = int(os.getenv("BACKFILL_CHECKPOINT_BATCH", 25))  # Unidades por gravação
+BACKFILL_CHECKPOINT_INTERVAL_SECONDS = int(os.getenv("BACKFILL_CHECKPOINT_INTERVAL_SECONDS", 30))
+
+# Pipeline de ingestão (páginas -> odds -> gravação em lote)
+PIPELINE_PAGE_WORKERS = int(os.getenv("PIPELINE_PAGE_WORKERS", 2))  # Threads buscando /events/ended
+PIPELINE_ODDS_WORKERS = int(os.getenv("PIPELINE_ODDS_WORKERS", 8))  # Threads buscando /odds/summary
+PIPELINE_DB_WRITERS = int(os.getenv("PIPELINE_DB_WRITERS", 1))  # Threads gravando no banco
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", 200))  # Eventos por transação
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 500))  # Capacidade de cada fila (backpressure)
+PIPELINE_FLUSH_SECONDS = float(os.getenv("PIPELINE_FLUSH_SECONDS", 2))  # Grava lote incompleto após esse tempo
+
+# Métricas (endpoint Prometheus no modo daemon; 0 desliga)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+
+# Profiling (--profile)
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.01))  # Segundos entre amostras de pilha
+
+# Particionamento de events/odds (db/partitions.py)
+PARTITION_INTERVAL = os.getenv("PARTITION_INTERVAL", "week")  # "week" ou "day"
+PARTITIONS_AHEAD = int(os.getenv("PARTITIONS_AHEAD", 4))  # Partições futuras criadas com antecedência
+
+# Backend de JSON (api/codec.py): "auto" usa orjson ou msgspec se instalados, senão json
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+
+# Histórico completo de odds (/v2/event/odds, db/odds_history.py)
+ODDS_HISTORY_ENABLED = os.getenv("ODDS_HISTORY_ENABLED", "0") == "1"  # Busca o histórico junto com cada jogo
+# Mercados guardados, separados por vírgula (vazio = todos os que a API devolver)
+ODDS_HISTORY_MARKETS = frozenset(m.strip() for m in os.getenv("ODDS_HISTORY_MARKETS", "1_1,1_2,1_3").split(",") if m.strip())
+
+# Agregados por jogador/time/liga mantidos na gravação (db/aggregates.py)
+AGGREGATES_ENABLED = os.getenv("AGGREGATES_ENABLED", "1") == "1"
+H2H_RECENT_GAMES = int(os.getenv("H2H_RECENT_GAMES", 20))  # Confrontos guardados por par de jogadores (db/h2h.py)
+
+# Servidor de leitura (api_server.py) com índice em memória dos jogos recentes
+READ_SERVER_PORT = int(os.getenv("READ_SERVER_PORT", 8080))
+READ_SERVER_HOST = os.getenv("READ_SERVER_HOST", "0.0.0.0")
+READ_SERVER_WINDOW_HOURS = int(os.getenv("READ_SERVER_WINDOW_HOURS", 72))  # Janela mantida em memória
+READ_SERVER_REFRESH_SECONDS = int(os.getenv("READ_SERVER_REFRESH_SECONDS", 10))  # Intervalo de leitura das mudanças
+
+# Acompanhamento ao vivo (--mode live, collector/live.py): intervalo de polling por liga
+LIVE_INTERVAL_FAST_SECONDS = float(os.getenv("LIVE_INTERVAL_FAST_SECONDS", 3))  # Gol recente ou fim de jogo próximo
+LIVE_INTERVAL_SECONDS = float(os.getenv("LIVE_INTERVAL_SECONDS", 10))  # Jogos em andamento sem novidade
+LIVE_INTERVAL_IDLE_SECONDS = float(os.getenv("LIVE_INTERVAL_IDLE_SECONDS", 60))  # Liga sem jogo ao vivo
+LIVE_GOAL_WINDOW_SECONDS = int(os.getenv("LIVE_GOAL_WINDOW_SECONDS", 60))  # Após um gol, polling rápido por este tempo
+LIVE_FULL_TIME_MINUTE = int(os.getenv("LIVE_FULL_TIME_MINUTE", 80))  # Minuto do relógio a partir do qual o fim está próximo
+LIVE_ODDS_INTERVAL_SECONDS = int(os.getenv("LIVE_ODDS_INTERVAL_SECONDS", 30))  # Odds ao vivo (com --odds-history)
+
+# Jogos agendados (--mode upcoming, collector/upcoming.py): inserção antecipada e odds antes do início
+UPCOMING_REFRESH_SECONDS = int(os.getenv("UPCOMING_REFRESH_SECONDS", 300))  # Releitura de /events/upcoming
+UPCOMING_HORIZON_HOURS = float(os.getenv("UPCOMING_HORIZON_HOURS", 6))  # Só jogos que começam dentro deste horizonte
+UPCOMING_ODDS_LEAD_SECONDS = int(os.getenv("UPCOMING_ODDS_LEAD_SECONDS", 120))  # Snapshot de odds N segundos antes do início
+UPCOMING_ODDS_SPACING_SECONDS = float(os.getenv("UPCOMING_ODDS_SPACING_SECONDS", 2))  # Intervalo mínimo entre snapshots
+UPCOMING_ODDS_RETRY_SECONDS = int(os.getenv("UPCOMING_ODDS_RETRY_SECONDS", 30))  # Nova tentativa se o resumo vier vazio
+UPCOMING_STALE_HOURS = float(os.getenv("UPCOMING_STALE_HOURS", 12))  # Agendado que não começou N horas após o horário é apagado
+
 # IDs das ligas de eSoccer
 # Lista extraída da análise do arquivo futebol_data_skip_esports_0.json
 ESOCCER_LEAGUE_IDS = [
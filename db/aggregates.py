@@ -0,0 +1,374 @@
+# db/aggregates.py
+"""
+Agregados por jogador, time e liga/dia mantidos de forma incremental.
+
+As consultas de acompanhamento (jogos por liga e por dia, completude de placares,
+vitórias/derrotas/gols por jogador) deixam de varrer a janela inteira de events:
+leem player_stats, team_stats e league_daily_stats, com uma linha por
+jogador/time (por liga) e por liga/dia.
+
+Cada gravação aplica só a diferença entre o estado anterior e o novo de cada
+evento, na mesma transação que grava events:
+- apply_event_batch: antes do upsert em lote (gravar_lote);
+- apply_score_updates: antes do UPDATE de placares (collector.scores);
+- remove_events: antes da retenção apagar/descartar eventos antigos.
+Os eventos afetados são lidos com FOR UPDATE depois de um pg_advisory_xact_lock
+por event_id (que também cobre eventos novos, ainda sem linha para travar), então
+dois gravadores não aplicam a mesma transição duas vezes. Jogos agendados
+(events.upcoming) só passam a contar quando começam ou ganham placar. rebuild_aggregates recalcula tudo a partir de
+events (use após backfills feitos com AGGREGATES_ENABLED=0 ou para conferir).
+"""
+import re
+from collections import defaultdict
+from datetime import datetime
+
+import pytz
+from psycopg2.extras import execute_values
+
+from config.settings import AGGREGATES_ENABLED, TIMEZONE
+from db.database import get_cursor, DB_ROWS_WRITTEN
+from utils.profiling import section
+
+AGGREGATE_TABLES = ("player_stats", "team_stats", "league_daily_stats")
+
+AGGREGATES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS player_stats (
+    player_name TEXT NOT NULL,
+    league_id BIGINT NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    scored_games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    goals_for INTEGER NOT NULL DEFAULT 0,
+    goals_against INTEGER NOT NULL DEFAULT 0,
+    last_game_at TIMESTAMPTZ,
+    PRIMARY KEY (player_name, league_id)
+);
+
+CREATE TABLE IF NOT EXISTS team_stats (
+    team_name TEXT NOT NULL,
+    league_id BIGINT NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    scored_games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    goals_for INTEGER NOT NULL DEFAULT 0,
+    goals_against INTEGER NOT NULL DEFAULT 0,
+    last_game_at TIMESTAMPTZ,
+    PRIMARY KEY (team_name, league_id)
+);
+
+CREATE TABLE IF NOT EXISTS league_daily_stats (
+    league_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    league_name TEXT,
+    games INTEGER NOT NULL DEFAULT 0,
+    scored_games INTEGER NOT NULL DEFAULT 0,
+    with_odds INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (league_id, day)
+);
+"""
+
+# Colunas de events necessárias para calcular a contribuição de um evento
+_COLUNAS_ESTADO = (
+    "event_id",
+    "league_id",
+    "league_name",
+    "event_timestamp",
+    "home_team_name",
+    "home_player_name",
+    "away_team_name",
+    "away_player_name",
+    "final_score",
+    "has_odds",
+    "upcoming",
+)
+
+_PLACAR_RE = re.compile(r"^(\d+)-(\d+)$")
+
+_COLUNAS_COMPETIDOR = "games, scored_games, wins, draws, losses, goals_for, goals_against, last_game_at"
+
+_CONFLITO_COMPETIDOR = """
+ON CONFLICT ({chave}, league_id) DO UPDATE SET
+    games = {tabela}.games + EXCLUDED.games,
+    scored_games = {tabela}.scored_games + EXCLUDED.scored_games,
+    wins = {tabela}.wins + EXCLUDED.wins,
+    draws = {tabela}.draws + EXCLUDED.draws,
+    losses = {tabela}.losses + EXCLUDED.losses,
+    goals_for = {tabela}.goals_for + EXCLUDED.goals_for,
+    goals_against = {tabela}.goals_against + EXCLUDED.goals_against,
+    last_game_at = GREATEST({tabela}.last_game_at, EXCLUDED.last_game_at)
+"""
+
+_CONFLITO_LIGA = """
+ON CONFLICT (league_id, day) DO UPDATE SET
+    league_name = COALESCE(EXCLUDED.league_name, league_daily_stats.league_name),
+    games = league_daily_stats.games + EXCLUDED.games,
+    scored_games = league_daily_stats.scored_games + EXCLUDED.scored_games,
+    with_odds = league_daily_stats.with_odds + EXCLUDED.with_odds
+"""
+
+_COMPETIDORES = (
+    # (tabela, coluna da chave, coluna do mandante, coluna do visitante)
+    ("player_stats", "player_name", "home_player_name", "away_player_name"),
+    ("team_stats", "team_name", "home_team_name", "away_team_name"),
+)
+
+_local_tz = pytz.timezone(TIMEZONE)
+
+
+def ensure_aggregate_tables(conn):
+    """Cria as tabelas de agregados se não existirem."""
+    with get_cursor(conn) as cur:
+        cur.execute(AGGREGATES_SCHEMA)
+    conn.commit()
+
+
+# ----- Contribuição de um evento (incremental, em Python) -----
+
+
+def _placar(final_score):
+    match = _PLACAR_RE.match(final_score or "")
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _dia_local(event_timestamp):
+    return event_timestamp.astimezone(_local_tz).date() if event_timestamp else None
+
+
+def _contribuir(acumulado, estado, sinal):
+    """Soma (sinal=1) ou subtrai (sinal=-1) a contribuição de 'estado' em 'acumulado'."""
+    if estado["upcoming"]:
+        return  # Agendado ainda não iniciado: não conta
+    league_id = estado["league_id"] or 0
+    event_timestamp = estado["event_timestamp"]
+    placar = _placar(estado["final_score"])
+
+    dia = _dia_local(event_timestamp)
+    if dia is not None:
+        liga = acumulado[("league_daily_stats", (league_id, dia))]
+        liga[0] += sinal
+        liga[1] += sinal if placar else 0
+        liga[2] += sinal if estado["has_odds"] else 0
+        if sinal > 0 and estado["league_name"]:
+            liga[3] = estado["league_name"]
+
+    for tabela, _, mandante, visitante in _COMPETIDORES:
+        for lado, nome in ((0, estado[mandante]), (1, estado[visitante])):
+            if not nome:
+                continue
+            stats = acumulado[(tabela, (nome, league_id))]
+            stats[0] += sinal
+            if placar:
+                gols_pro, gols_contra = placar if lado == 0 else placar[::-1]
+                stats[1] += sinal
+                stats[2] += sinal if gols_pro > gols_contra else 0
+                stats[3] += sinal if gols_pro == gols_contra else 0
+                stats[4] += sinal if gols_pro < gols_contra else 0
+                stats[5] += sinal * gols_pro
+                stats[6] += sinal * gols_contra
+            if sinal > 0 and event_timestamp and (stats[7] is None or event_timestamp > stats[7]):
+                stats[7] = event_timestamp
+
+
+def _novo_acumulado():
+    def vetor():
+        # Competidor: games..goals_against + last_game_at; liga: games, scored, with_odds, league_name
+        return [0, 0, 0, 0, 0, 0, 0, None]
+
+    return defaultdict(vetor)
+
+
+def _gravar_deltas(conn, acumulado):
+    """Aplica os deltas acumulados com um INSERT ... ON CONFLICT por tabela."""
+    por_tabela = defaultdict(list)
+    for (tabela, chave), vetor in acumulado.items():
+        if tabela == "league_daily_stats":
+            if any(vetor[:3]):
+                por_tabela[tabela].append(chave + (vetor[3], vetor[0], vetor[1], vetor[2]))
+        elif any(vetor[:7]):  # Reprocessar um evento sem mudança não gera escrita
+            por_tabela[tabela].append(chave + tuple(vetor))
+
+    # Mesma ordem de chaves em todos os gravadores: evita deadlock entre lotes concorrentes
+    for linhas in por_tabela.values():
+        linhas.sort(key=lambda linha: linha[:2])
+
+    gravadas = 0
+    with get_cursor(conn) as cur:
+        for tabela, chave, _, _ in _COMPETIDORES:
+            if por_tabela[tabela]:
+                query = f"INSERT INTO {tabela} ({chave}, league_id, {_COLUNAS_COMPETIDOR}) VALUES %s" + _CONFLITO_COMPETIDOR.format(
+                    chave=chave, tabela=tabela
+                )
+                execute_values(cur, query, por_tabela[tabela])
+                gravadas += len(por_tabela[tabela])
+        if por_tabela["league_daily_stats"]:
+            query = (
+                "INSERT INTO league_daily_stats (league_id, day, league_name, games, scored_games, with_odds) VALUES %s"
+                + _CONFLITO_LIGA
+            )
+            execute_values(cur, query, por_tabela["league_daily_stats"])
+            gravadas += len(por_tabela["league_daily_stats"])
+    DB_ROWS_WRITTEN.inc(gravadas, table="aggregates")
+    return gravadas
+
+
+def _estados_atuais(conn, event_ids):
+    """
+    Estado atual dos eventos no banco, travando-os até o fim da transação.
+    Um evento novo não tem linha para o FOR UPDATE travar, então antes se pega um
+    pg_advisory_xact_lock por event_id: dois lotes com o mesmo evento novo se
+    serializam e o segundo já lê a linha gravada pelo primeiro.
+    As travas são pegas em ordem de event_id: coletor, live e upcoming gravam
+    eventos em comum ao mesmo tempo e, em ordens diferentes, se travariam.
+    """
+    if not event_ids:
+        return {}
+    ids = sorted({int(event_id) for event_id in event_ids})
+    query = f"""
+    SELECT {", ".join(_COLUNAS_ESTADO)}
+    FROM events
+    WHERE event_id = ANY(%s)
+    ORDER BY event_id
+    FOR UPDATE;
+    """
+    with get_cursor(conn) as cur:
+        # unnest devolve o array na ordem em que foi montado (já ordenado)
+        cur.execute("SELECT pg_advisory_xact_lock(id) FROM unnest(%s::bigint[]) AS ids(id);", (ids,))
+        cur.execute(query, (ids,))
+        return {row["event_id"]: dict(row) for row in cur.fetchall()}
+
+
+def apply_event_batch(conn, eventos):
+    """
+    Atualiza os agregados para um lote de db.models.Event prestes a ser gravado
+    por upsert_events_bulk (mesmas regras: final_score/has_odds None mantêm o valor atual).
+    Chamar antes do upsert, na mesma transação. Não faz commit.
+    """
+    if not AGGREGATES_ENABLED or not eventos:
+        return 0
+    unicos = {evento.event_id: evento for evento in eventos}
+    with section("aggregates"):
+        antigos = _estados_atuais(conn, unicos.keys())
+        acumulado = _novo_acumulado()
+        for event_id, evento in unicos.items():
+            antigo = antigos.get(event_id)
+            novo = {coluna: getattr(evento, coluna) for coluna in _COLUNAS_ESTADO}
+            if antigo is not None:
+                novo["final_score"] = novo["final_score"] if novo["final_score"] is not None else antigo["final_score"]
+                novo["has_odds"] = novo["has_odds"] if novo["has_odds"] is not None else antigo["has_odds"]
+                novo["upcoming"] = antigo["upcoming"] and novo["upcoming"]  # Mesma regra do upsert
+                _contribuir(acumulado, antigo, -1)
+            _contribuir(acumulado, novo, 1)
+        return _gravar_deltas(conn, acumulado)
+
+
+def apply_score_updates(conn, scores):
+    """
+    Atualiza os agregados para placares ({event_id: placar}) prestes a ser gravados
+    por update_event_scores_bulk. Chamar antes do UPDATE, na mesma transação.
+    """
+    if not AGGREGATES_ENABLED or not scores:
+        return 0
+    with section("aggregates"):
+        antigos = _estados_atuais(conn, [int(event_id) for event_id in scores])
+        acumulado = _novo_acumulado()
+        for event_id, antigo in antigos.items():
+            novo = dict(antigo, final_score=scores.get(event_id, scores.get(str(event_id))), upcoming=False)
+            _contribuir(acumulado, antigo, -1)
+            _contribuir(acumulado, novo, 1)
+        return _gravar_deltas(conn, acumulado)
+
+
+# ----- Contribuição de um conjunto de eventos (em SQL: rebuild e retenção) -----
+
+
+def _aplicar_sql(cur, fonte, filtro, params, sinal):
+    """Soma/subtrai nos agregados a contribuição dos eventos de 'fonte' que passam em 'filtro'."""
+    filtro = f"NOT upcoming AND ({filtro})"  # Agendados ainda não iniciados não contam
+    placar = """
+        CASE WHEN final_score ~ '^[0-9]+-[0-9]+$' THEN split_part(final_score, '-', {lado})::int END
+    """
+    for tabela, chave, mandante, visitante in _COMPETIDORES:
+        cur.execute(
+            f"""
+            INSERT INTO {tabela} ({chave}, league_id, {_COLUNAS_COMPETIDOR})
+            SELECT nome, league_id,
+                   {sinal} * COUNT(*),
+                   {sinal} * COUNT(pro),
+                   {sinal} * COUNT(*) FILTER (WHERE pro > contra),
+                   {sinal} * COUNT(*) FILTER (WHERE pro = contra),
+                   {sinal} * COUNT(*) FILTER (WHERE pro < contra),
+                   {sinal} * COALESCE(SUM(pro), 0),
+                   {sinal} * COALESCE(SUM(contra), 0),
+                   MAX(event_timestamp)
+            FROM (
+                SELECT {mandante} AS nome, COALESCE(league_id, 0) AS league_id, event_timestamp,
+                       {placar.format(lado=1)} AS pro, {placar.format(lado=2)} AS contra
+                FROM {fonte} WHERE {filtro}
+                UNION ALL
+                SELECT {visitante}, COALESCE(league_id, 0), event_timestamp,
+                       {placar.format(lado=2)}, {placar.format(lado=1)}
+                FROM {fonte} WHERE {filtro}
+            ) lados
+            WHERE nome IS NOT NULL AND nome <> ''
+            GROUP BY nome, league_id
+            """
+            + _CONFLITO_COMPETIDOR.format(chave=chave, tabela=tabela),
+            params + params,
+        )
+    cur.execute(
+        f"""
+        INSERT INTO league_daily_stats (league_id, day, league_name, games, scored_games, with_odds)
+        SELECT COALESCE(league_id, 0), (event_timestamp AT TIME ZONE %s)::date,
+               {"MAX(league_name)" if sinal > 0 else "NULL"},
+               {sinal} * COUNT(*),
+               {sinal} * COUNT(*) FILTER (WHERE final_score ~ '^[0-9]+-[0-9]+$'),
+               {sinal} * COUNT(*) FILTER (WHERE has_odds)
+        FROM {fonte}
+        WHERE event_timestamp IS NOT NULL AND {filtro}
+        GROUP BY 1, 2
+        """
+        + _CONFLITO_LIGA,
+        [TIMEZONE] + params,
+    )
+
+
+def remove_events(conn, fonte="events", antes=None):
+    """
+    Subtrai dos agregados os eventos de 'fonte' (events ou uma partição dela)
+    com event_timestamp anterior a 'antes' (todos, se None). Chamar antes de
+    apagá-los, na mesma transação. Linhas zeradas são removidas. Não faz commit.
+    """
+    if not AGGREGATES_ENABLED:
+        return
+    filtro, params = ("event_timestamp < %s", [antes]) if antes is not None else ("TRUE", [])
+    with get_cursor(conn) as cur, section("aggregates"):
+        _aplicar_sql(cur, fonte, filtro, params, -1)
+        for tabela in AGGREGATE_TABLES:
+            cur.execute(f"DELETE FROM {tabela} WHERE games <= 0;")
+
+
+def rebuild_aggregates(conn):
+    """
+    Recalcula todos os agregados a partir de events. Bloqueia escritas em events
+    durante o recálculo para que nenhum lote concorrente fique de fora. Não faz commit.
+    """
+    inicio = datetime.now()
+    with get_cursor(conn) as cur:
+        cur.execute(AGGREGATES_SCHEMA)
+        cur.execute("LOCK TABLE events IN SHARE MODE;")
+        cur.execute(f"TRUNCATE {', '.join(AGGREGATE_TABLES)};")
+        _aplicar_sql(cur, "events", "TRUE", [], 1)
+        contagens = {}
+        for tabela in AGGREGATE_TABLES:
+            cur.execute(f"SELECT COUNT(*) AS total FROM {tabela};")
+            contagens[tabela] = cur.fetchone()["total"]
+    duracao = (datetime.now() - inicio).total_seconds()
+    print(
+        f"Agregados recalculados em {duracao:.1f}s: {contagens['player_stats']} jogadores, "
+        f"{contagens['team_stats']} times, {contagens['league_daily_stats']} ligas/dia."
+    )
+    return contagens
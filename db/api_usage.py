@@ -0,0 +1,132 @@
+# db/api_usage.py
+"""
+Uso da cota da BetsAPI por hora, modo e endpoint (api/quota.py).
+
+As contagens ficam em memória e são somadas em api_usage a cada
+QUOTA_FLUSH_SECONDS e no encerramento; como a gravação soma (calls + EXCLUDED.calls),
+processos diferentes (daemon, backfill) dividem a mesma linha da hora e o total
+lido de volta é o uso real do token.
+"""
+import threading
+
+from psycopg2.extras import execute_values
+
+from api.quota import quota, inicio_da_hora
+from config.settings import QUOTA_FLUSH_SECONDS
+from db.database import get_cursor, create_db_connection, release_db_connection, DB_ROWS_WRITTEN
+
+API_USAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS api_usage (
+    hour_start TIMESTAMPTZ NOT NULL,
+    mode TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    rate_limited INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (hour_start, mode, endpoint)
+);
+"""
+
+
+def ensure_api_usage_table(conn):
+    """Cria a tabela api_usage se não existir."""
+    with get_cursor(conn) as cur:
+        cur.execute(API_USAGE_SCHEMA)
+    conn.commit()
+
+
+def save_api_usage(conn, pendentes, hora):
+    """
+    Soma as contagens {(hora, modo, endpoint): (chamadas, 429s)} em api_usage, em ordem
+    de chave (dois processos gravando a mesma hora não se travam). Não faz commit.
+    Retorna o total de chamadas de 'hora' somando todos os processos.
+    """
+    with get_cursor(conn) as cur:
+        if pendentes:
+            execute_values(
+                cur,
+                """
+                INSERT INTO api_usage (hour_start, mode, endpoint, calls, rate_limited)
+                VALUES %s
+                ON CONFLICT (hour_start, mode, endpoint) DO UPDATE SET
+                    calls = api_usage.calls + EXCLUDED.calls,
+                    rate_limited = api_usage.rate_limited + EXCLUDED.rate_limited,
+                    updated_at = NOW();
+                """,
+                sorted((*chave, chamadas, limitadas) for chave, (chamadas, limitadas) in pendentes.items()),
+            )
+            DB_ROWS_WRITTEN.inc(len(pendentes), table="api_usage")
+        cur.execute("SELECT COALESCE(SUM(calls), 0) AS total FROM api_usage WHERE hour_start = %s;", (hora,))
+        return int(cur.fetchone()["total"])
+
+
+def get_api_usage(conn, hours=24):
+    """Chamadas por modo e endpoint nas últimas 'hours' horas, da mais usada para a menos."""
+    with get_cursor(conn) as cur:
+        cur.execute(
+            """
+            SELECT mode, endpoint, SUM(calls) AS calls, SUM(rate_limited) AS rate_limited,
+                   COUNT(*) AS hours_active
+            FROM api_usage
+            WHERE hour_start >= date_trunc('hour', NOW()) - make_interval(hours => %s)
+            GROUP BY mode, endpoint
+            ORDER BY calls DESC;
+            """,
+            (int(hours),),
+        )
+        return cur.fetchall()
+
+
+def flush_api_usage():
+    """Grava as contagens pendentes do processo. Em caso de erro elas voltam para a fila."""
+    pendentes = quota.take_pending()
+    hora = inicio_da_hora()
+    conn = None
+    try:
+        # Conexão obtida dentro do try: um timeout do pool também devolve as contagens
+        conn = create_db_connection()
+        total = save_api_usage(conn, pendentes, hora)
+        conn.commit()
+        quota.set_hour_usage(hora, total)
+        return len(pendentes)
+    except Exception as e:
+        print(f"Erro ao gravar o uso da cota ({len(pendentes)} contagens): {e}")
+        if conn is not None:
+            conn.rollback()
+        quota.restore_pending(pendentes)
+        return 0
+    finally:
+        release_db_connection(conn)
+
+
+class ApiUsageWriter:
+    """Thread que grava o uso da cota a cada QUOTA_FLUSH_SECONDS; stop() faz a gravação final."""
+
+    def __init__(self, interval=QUOTA_FLUSH_SECONDS):
+        self.interval = interval
+        self._parar = threading.Event()
+        self._thread = None
+
+    def start(self):
+        conn = create_db_connection()
+        try:
+            ensure_api_usage_table(conn)
+        finally:
+            release_db_connection(conn)
+        flush_api_usage()  # Já começa com o uso da hora de outros processos
+        self._thread = threading.Thread(target=self._loop, name="api-usage", daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._parar.wait(self.interval):
+            try:
+                flush_api_usage()
+            except Exception as e:  # Uma gravação com erro não pode encerrar a thread
+                print(f"Erro inesperado na gravação do uso da cota: {e}")
+
+    def stop(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        flush_api_usage()
@@ -1,54 +1,251 @@
 # db/database.py
 import psycopg2
+import re
+import threading
 import time
-from psycopg2.extras import DictCursor
+from psycopg2 import pool as pg_pool
+from psycopg2.extensions import connection as pg_connection
+from psycopg2.extras import DictCursor, execute_values
 from contextlib import contextmanager
-from config.settings import DATABASE_URL, RETRY_DELAY_SECONDS, TIMEZONE
+from config.settings import (
+    DATABASE_URL,
+    RETRY_DELAY_SECONDS,
+    TIMEZONE,
+    DB_POOL_MIN,
+    DB_POOL_MAX,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_CONN_MAX_LIFETIME_SECONDS,
+    DB_CONN_IDLE_CHECK_SECONDS,
+    UPCOMING_STALE_HOURS,
+)
 from datetime import datetime, timedelta
 import pytz
+from utils import metrics
+from utils.profiling import section
+
+DB_STATEMENT_SECONDS = metrics.histogram("betsapi_db_statement_seconds", "Latência de cada comando SQL por tipo e tabela")
+DB_COMMIT_SECONDS = metrics.histogram("betsapi_db_commit_seconds", "Duração dos commits")
+DB_ROWS_WRITTEN = metrics.counter("betsapi_db_rows_written_total", "Linhas gravadas (upsert/insert/update) por tabela")
+DB_POOL = metrics.gauge("betsapi_db_pool", "Estatísticas do pool de conexões")
+
+_TABELA_RE = re.compile(r"\b(?:INTO|UPDATE|FROM)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+
+def rotulo_sql(query):
+    """Rótulo curto de um comando SQL para métricas (ex: 'insert events')."""
+    if isinstance(query, bytes):
+        query = query[:300].decode("utf-8", "replace")
+    inicio = str(query)[:300]
+    partes = inicio.split(None, 1)
+    if not partes:
+        return "vazio"
+    comando = partes[0].lower()
+    tabela = _TABELA_RE.search(inicio)
+    return f"{comando} {tabela.group(1).lower()}" if tabela else comando
+
+
+class TimedCursor(DictCursor):
+    """DictCursor que registra a latência de cada execute() (inclusive as páginas do execute_values)."""
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            DB_STATEMENT_SECONDS.observe(time.perf_counter() - inicio, statement=rotulo_sql(query))
+
+
+class TimedConnection(pg_connection):
+    """Conexão que registra a duração de cada commit."""
+
+    def commit(self):
+        inicio = time.perf_counter()
+        try:
+            with section("db_commit"):
+                return super().commit()
+        finally:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - inicio)
+
+
+class PooledConnectionProvider:
+    """
+    Pool limitado de conexões (ThreadedConnectionPool) compartilhado pelo processo.
+
+    - Um semáforo faz as threads esperarem por uma conexão livre em vez de falhar
+      com PoolError quando o pool está cheio; o tempo de espera é medido.
+    - Conexões ociosas há mais de DB_CONN_IDLE_CHECK_SECONDS são testadas com SELECT 1.
+    - Conexões com mais de DB_CONN_MAX_LIFETIME_SECONDS são fechadas e recriadas.
+    """
+
+    def __init__(self, dsn, minconn, maxconn, max_lifetime, idle_check, checkout_timeout):
+        self.maxconn = maxconn
+        self.max_lifetime = max_lifetime
+        self.idle_check = idle_check
+        self.checkout_timeout = checkout_timeout
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, dsn, connection_factory=TimedConnection)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._created_at = {}  # id(conn) -> instante de criação
+        self._last_used = {}  # id(conn) -> instante da última devolução
+        # Métricas de checkout
+        self.checkouts = 0
+        self.recycled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def getconn(self):
+        """Empresta uma conexão saudável, esperando se o pool estiver esgotado."""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise pg_pool.PoolError(f"Nenhuma conexão livre no pool após {self.checkout_timeout}s de espera.")
+        wait = time.monotonic() - start
+
+        try:
+            conn = self._checkout_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return conn
+
+    def _checkout_healthy(self):
+        for _ in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            now = time.monotonic()
+            key = id(conn)
+            with self._lock:
+                created = self._created_at.setdefault(key, now)
+                last_used = self._last_used.get(key, now)
+
+            expired = now - created > self.max_lifetime
+            healthy = not conn.closed and not expired
+            if healthy and now - last_used > self.idle_check:
+                healthy = self._ping(conn)
+
+            if healthy:
+                conn.autocommit = False  # Exige commit explícito
+                return conn
+
+            self._discard(conn)
+            with self._lock:
+                self.recycled += 1
+        raise psycopg2.OperationalError("Não foi possível obter uma conexão saudável do pool.")
+
+    @staticmethod
+    def _ping(conn):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+            self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    def putconn(self, conn):
+        """Devolve a conexão ao pool, descartando-a se estiver quebrada."""
+        try:
+            if conn.closed:
+                self._discard(conn)
+                return
+            try:
+                conn.rollback()  # Nunca devolve uma transação aberta ao pool
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+            with self._lock:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def stats(self):
+        """Retorna métricas do pool (checkouts, esperas, conexões recicladas)."""
+        with self._lock:
+            return {
+                "max_connections": self.maxconn,
+                "checkouts": self.checkouts,
+                "recycled": self.recycled,
+                "avg_wait_seconds": self.total_wait / self.checkouts if self.checkouts else 0.0,
+                "max_wait_seconds": self.max_wait,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Retorna o pool do processo, criando-o na primeira chamada."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PooledConnectionProvider(
+                DATABASE_URL,
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                DB_CONN_MAX_LIFETIME_SECONDS,
+                DB_CONN_IDLE_CHECK_SECONDS,
+                DB_POOL_TIMEOUT_SECONDS,
+            )
+            for stat in ("checkouts", "recycled", "avg_wait_seconds", "max_wait_seconds"):
+                DB_POOL.set_function(lambda pool=_pool, stat=stat: pool.stats()[stat], stat=stat)
+        return _pool
+
+
+def close_db_pool():
+    """Fecha todas as conexões do pool (chamar ao encerrar o processo)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            stats = _pool.stats()
+            print(
+                f"Pool de conexões: {stats['checkouts']} checkouts, espera média {stats['avg_wait_seconds']:.3f}s, "
+                f"máxima {stats['max_wait_seconds']:.3f}s, {stats['recycled']} conexões recicladas."
+            )
+            _pool.closeall()
+            _pool = None
 
 
 @contextmanager
 def get_db_connection():
-    """Fornece uma conexão gerenciada com o banco de dados."""
-    conn = None
-    retries = 3
-    delay = RETRY_DELAY_SECONDS
-    while retries > 0:
+    """Fornece uma conexão gerenciada emprestada do pool."""
+    conn = create_db_connection()
+    try:
+        yield conn
+        conn.commit()  # Commit final se tudo correu bem no bloco 'with'
+    except Exception as e:
+        print(f"Erro inesperado de banco de dados: {e}")
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            yield conn
-            conn.commit()  # Commit final se tudo correu bem no bloco 'with'
-            break  # Sai do loop se conectou
-        except psycopg2.OperationalError as e:
-            print(f"Erro ao conectar ao banco de dados: {e}. Tentando novamente em {delay}s...")
-            retries -= 1
-            if retries == 0:
-                print("Erro: Não foi possível conectar ao banco de dados após várias tentativas.")
-                raise  # Re-levanta a exceção original se esgotarem as tentativas
-            time.sleep(delay)
-            delay *= 2  # Backoff exponencial simples
-        except Exception as e:
-            print(f"Erro inesperado de banco de dados: {e}")
-            if conn:
-                conn.rollback()  # Rollback em caso de outros erros no bloco 'with'
-            raise  # Re-levanta a exceção
-        finally:
-            if conn:
-                conn.close()
+            conn.rollback()  # Rollback em caso de outros erros no bloco 'with'
+        except psycopg2.Error:
+            pass
+        raise  # Re-levanta a exceção
+    finally:
+        release_db_connection(conn)
 
 
 def create_db_connection():
-    """Cria e retorna uma conexão direta ao banco de dados (sem context manager).
+    """Empresta uma conexão do pool (sem context manager).
     Esta função deve ser usada para operações paralelas onde o controle da conexão
-    precisa ser gerenciado manualmente."""
+    precisa ser gerenciado manualmente. Devolver com release_db_connection()."""
     retries = 3
     delay = RETRY_DELAY_SECONDS
     while retries > 0:
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            conn.autocommit = False  # Exige commit explícito
-            return conn
+            return get_pool().getconn()
         except psycopg2.OperationalError as e:
             print(f"Erro ao conectar ao banco de dados: {e}. Tentando novamente em {delay}s...")
             retries -= 1
@@ -60,12 +257,171 @@ def create_db_connection():
     return None  # Não deveria chegar aqui devido ao raise, mas para clareza
 
 
+def release_db_connection(conn):
+    """Devolve ao pool uma conexão obtida com create_db_connection()."""
+    if conn is not None:
+        get_pool().putconn(conn)
+
+
+_particionadas = {}  # tabela -> bool, detectado uma vez por processo
+_particionadas_lock = threading.Lock()
+
+
+def is_partitioned(conn, table):
+    """
+    Indica se a tabela usa particionamento declarativo (ver db/partitions.py).
+    O resultado fica em cache; chame reset_partition_cache() após migrar o schema.
+    """
+    with _particionadas_lock:
+        if table in _particionadas:
+            return _particionadas[table]
+    query = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = %s AND pg_table_is_visible(c.oid)
+    ) AS particionada;
+    """
+    with get_cursor(conn) as cur:
+        cur.execute(query, (table,))
+        particionada = bool(cur.fetchone()["particionada"])
+    with _particionadas_lock:
+        _particionadas[table] = particionada
+    return particionada
+
+
+def reset_partition_cache():
+    with _particionadas_lock:
+        _particionadas.clear()
+
+
+def _conflito_events(conn):
+    """Alvo do ON CONFLICT de events: a chave primária inclui event_timestamp quando particionada."""
+    return "(event_id, event_timestamp)" if is_partitioned(conn, "events") else "(event_id)"
+
+
+# Jogo agendado ainda não iniciado (collector/upcoming.py): fora dos agregados e da fila de placares
+EVENTS_UPCOMING_COLUMN = "ALTER TABLE events ADD COLUMN IF NOT EXISTS upcoming BOOLEAN NOT NULL DEFAULT FALSE;"
+
+
+def ensure_event_columns(conn):
+    """Adiciona a events as colunas criadas depois do schema original (bancos já existentes)."""
+    with get_cursor(conn) as cur:
+        cur.execute(
+            """
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'events' AND column_name = 'upcoming' AND table_schema = current_schema()
+            ) AS existe;
+            """
+        )
+        if not cur.fetchone()["existe"]:  # Só pede o lock exclusivo do ALTER quando a coluna falta
+            cur.execute(EVENTS_UPCOMING_COLUMN)
+    conn.commit()
+
+
+def _mover_reagendados(conn, events):
+    """
+    Tabelas particionadas: a chave é (event_id, event_timestamp), então o ON CONFLICT
+    não acha a linha de um jogo que mudou de horário e gravaria uma segunda. Antes
+    do upsert, copia a linha existente (e as odds/histórico do jogo) para o novo
+    horário e apaga as do horário antigo, mantendo um event_id por linha. Se já
+    houver uma linha no novo horário ela fica (ON CONFLICT DO NOTHING).
+    Não faz commit. Retorna a quantidade de eventos movidos.
+    """
+    horarios = sorted({event.event_id: event.event_timestamp for event in events if event.event_timestamp}.items())
+    if not horarios:
+        return 0
+    template = "(%s::bigint, %s::timestamptz)"
+    with get_cursor(conn) as cur:
+        rows = execute_values(
+            cur,
+            """
+            SELECT DISTINCT e.event_id, v.novo
+            FROM events e JOIN (VALUES %s) AS v(event_id, novo) ON e.event_id = v.event_id
+            WHERE e.event_timestamp <> v.novo;
+            """,
+            horarios,
+            template=template,
+            page_size=1000,
+            fetch=True,
+        )
+        if not rows:
+            return 0
+        movidos = sorted((row[0], row[1]) for row in rows)
+
+        copias = [
+            (
+                "events",
+                """
+                INSERT INTO events (
+                    event_id, sport_id, league_id, league_name, event_timestamp,
+                    home_team_id, home_team_name, home_player_name,
+                    away_team_id, away_team_name, away_player_name,
+                    final_score, has_odds, last_odds_update, inserted_at, updated_at, upcoming
+                )
+                SELECT DISTINCT ON (e.event_id)
+                       e.event_id, e.sport_id, e.league_id, e.league_name, v.novo,
+                       e.home_team_id, e.home_team_name, e.home_player_name,
+                       e.away_team_id, e.away_team_name, e.away_player_name,
+                       e.final_score, e.has_odds, e.last_odds_update, e.inserted_at, NOW(), e.upcoming
+                FROM events e JOIN (VALUES %s) AS v(event_id, novo) ON e.event_id = v.event_id
+                WHERE e.event_timestamp <> v.novo
+                ORDER BY e.event_id, COALESCE(e.updated_at, e.inserted_at) DESC  -- Cópias duplicadas: vale a mais recente
+                ON CONFLICT DO NOTHING;
+                """,
+            )
+        ]
+        if is_partitioned(conn, "odds"):
+            copias.append(
+                (
+                    "odds",
+                    """
+                    INSERT INTO odds (
+                        event_id, bookmaker, odds_market, odds_timestamp, odds_data, collection_timestamp, event_timestamp
+                    )
+                    SELECT o.event_id, o.bookmaker, o.odds_market, o.odds_timestamp, o.odds_data, o.collection_timestamp, v.novo
+                    FROM odds o JOIN (VALUES %s) AS v(event_id, novo) ON o.event_id = v.event_id
+                    WHERE o.event_timestamp <> v.novo
+                    ON CONFLICT DO NOTHING;
+                    """,
+                )
+            )
+        if is_partitioned(conn, "odds_history"):
+            copias.append(
+                (
+                    "odds_history",
+                    """
+                    INSERT INTO odds_history (event_id, odds_market, ts, delta, event_timestamp)
+                    SELECT h.event_id, h.odds_market, h.ts, h.delta, v.novo
+                    FROM odds_history h JOIN (VALUES %s) AS v(event_id, novo) ON h.event_id = v.event_id
+                    WHERE h.event_timestamp <> v.novo
+                    ON CONFLICT DO NOTHING;
+                    """,
+                )
+            )
+        for tabela, query in copias:
+            execute_values(cur, query, movidos, template=template, page_size=1000)
+            execute_values(
+                cur,
+                f"""
+                DELETE FROM {tabela} t USING (VALUES %s) AS v(event_id, novo)
+                WHERE t.event_id = v.event_id AND t.event_timestamp <> v.novo;
+                """,
+                movidos,
+                template=template,
+                page_size=1000,
+            )
+    DB_ROWS_WRITTEN.inc(len(movidos), table="events_rescheduled")
+    return len(movidos)
+
+
 @contextmanager
 def get_cursor(conn):
     """Fornece um cursor gerenciado."""
     cursor = None
     try:
-        cursor = conn.cursor(cursor_factory=DictCursor)  # Retorna dicts em vez de tuplas
+        cursor = conn.cursor(cursor_factory=TimedCursor)  # Retorna dicts em vez de tuplas
         yield cursor
     finally:
         if cursor:
@@ -143,20 +499,15 @@ def update_fetch_state(conn, fetch_type, page=None, timestamp=None, status=None)
 
 
 def upsert_event(conn, event):
-    """Insere ou atualiza um evento na tabela 'events'."""
+    """Insere ou atualiza um evento (db.models.Event) na tabela 'events'."""
     query = """
     INSERT INTO events (
         event_id, sport_id, league_id, league_name, event_timestamp,
         home_team_id, home_team_name, home_player_name,
         away_team_id, away_team_name, away_player_name,
-        final_score, has_odds, last_odds_update, inserted_at
-    ) VALUES (
-        %(event_id)s, %(sport_id)s, %(league_id)s, %(league_name)s, %(event_timestamp)s,
-        %(home_team_id)s, %(home_team_name)s, %(home_player_name)s,
-        %(away_team_id)s, %(away_team_name)s, %(away_player_name)s,
-        %(final_score)s, %(has_odds)s, %(last_odds_update)s, NOW()
-    )
-    ON CONFLICT (event_id) DO UPDATE SET
+        final_score, has_odds, last_odds_update, upcoming, inserted_at
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+    ON CONFLICT {conflito} DO UPDATE SET
         sport_id = EXCLUDED.sport_id,
         league_id = EXCLUDED.league_id,
         league_name = EXCLUDED.league_name,
@@ -169,63 +520,54 @@ def upsert_event(conn, event):
         away_player_name = EXCLUDED.away_player_name,
         final_score = COALESCE(EXCLUDED.final_score, events.final_score),
         has_odds = COALESCE(EXCLUDED.has_odds, events.has_odds),
-        last_odds_update = COALESCE(EXCLUDED.last_odds_update, events.last_odds_update)
+        last_odds_update = COALESCE(EXCLUDED.last_odds_update, events.last_odds_update),
+        upcoming = events.upcoming AND EXCLUDED.upcoming,  -- Jogo que começou não volta a ser agendado
+        updated_at = NOW()
     RETURNING event_id;
     """
     try:
+        if is_partitioned(conn, "events"):
+            _mover_reagendados(conn, [event])  # Jogo que mudou de horário não vira uma segunda linha
         with get_cursor(conn) as cur:
-            # Garantir que valores numéricos sejam realmente numéricos ou None
-            event["event_id"] = int(event["event_id"])
-            event["sport_id"] = int(event["sport_id"]) if event.get("sport_id") is not None else None
-            event["league_id"] = int(event["league_id"]) if event.get("league_id") is not None else None
-            event["home_team_id"] = int(event["home_team_id"]) if event.get("home_team_id") is not None else None
-            event["away_team_id"] = int(event["away_team_id"]) if event.get("away_team_id") is not None else None
-
-            cur.execute(query, event)
+            # Tipos já resolvidos em Event.from_api
+            cur.execute(query.format(conflito=_conflito_events(conn)), event.row() + (event.upcoming,))
             result = cur.fetchone()
             return result["event_id"] if result else None
-    except ValueError as ve:
-        print(f"Erro de conversão de tipo ao preparar evento {event.get('event_id', 'N/A')}: {ve}")
-        print(f"Dados do evento: {event}")
-        raise
     except Exception as e:
-        print(f"Erro ao inserir/atualizar evento {event.get('event_id', 'N/A')}: {e}")
+        print(f"Erro ao inserir/atualizar evento {event.event_id}: {e}")
         # print(f"Dados do evento: {event}") # Descomentar para depuração
         # conn.rollback() # Rollback gerenciado pelo context manager
         raise
 
 
 def insert_odds(conn, odds_list):
-    """Insere uma lista de registros de odds na tabela 'odds'."""
+    """Insere uma lista de OddsSnapshot (db.models) na tabela 'odds'."""
     if not odds_list:
         return 0
 
     # Query para inserir UMA linha, usada dentro do loop para tratamento individual
+    # Tabela particionada por event_timestamp: a coluna decide a partição
+    particionada = is_partitioned(conn, "odds")
     query_single = """
     INSERT INTO odds (
-        event_id, bookmaker, odds_market, odds_timestamp, odds_data, collection_timestamp
+        event_id, bookmaker, odds_market, odds_timestamp, odds_data, collection_timestamp{coluna_particao}
     ) VALUES (
-        %(event_id)s, %(bookmaker)s, %(odds_market)s, %(odds_timestamp)s, %(odds_data)s, NOW()
+        %s, %s, %s, %s, %s, NOW(){valor_particao}
     )
     ON CONFLICT DO NOTHING; -- Evita duplicatas exatas
-    """
+    """.format(
+        coluna_particao=", event_timestamp" if particionada else "",
+        valor_particao=", %s" if particionada else "",
+    )
     inserted_count = 0
     with get_cursor(conn) as cur:
         for odds_item in odds_list:
             try:
-                # Garantir tipos corretos
-                odds_item["event_id"] = int(odds_item["event_id"])
-                # odds_data já deve ser string JSON
-
-                cur.execute(query_single, odds_item)
+                cur.execute(query_single, odds_item.row(particionada))
                 if cur.rowcount > 0:
                     inserted_count += 1
-            except ValueError as ve:
-                print(f"Erro de tipo ao preparar odds para evento {odds_item.get('event_id', 'N/A')}: {ve}")
-                print(f"Dados da odd: {odds_item}")
-                # Pula esta odd específica, mas continua as outras
             except Exception as e:
-                print(f"Erro ao inserir odd para evento {odds_item.get('event_id', 'N/A')}: {e}")
+                print(f"Erro ao inserir odd para evento {odds_item.event_id}: {e}")
                 print(f"Dados da odd: {odds_item}")
                 # Considerar se deve parar tudo ou apenas pular esta odd
                 # Por enquanto, vamos pular esta e continuar
@@ -234,6 +576,106 @@ def insert_odds(conn, odds_list):
     return inserted_count
 
 
+def upsert_events_bulk(conn, events, page_size=500):
+    """
+    Insere ou atualiza vários eventos (db.models.Event) com um único INSERT ... ON CONFLICT por lote.
+    'has_odds' e 'last_odds_update' vão no mesmo statement, dispensando o UPDATE
+    separado de update_event_odds_status. Não faz commit (responsabilidade do chamador).
+    Retorna a quantidade de eventos gravados.
+    """
+    if not events:
+        return 0
+
+    # O mesmo event_id não pode aparecer duas vezes num ON CONFLICT DO UPDATE; mantém o último
+    unicos = {}
+    for event in events:
+        unicos[event.event_id] = event
+    # Em ordem de event_id: gravadores concorrentes travam as linhas na mesma ordem
+    values = [unicos[event_id].row() + (unicos[event_id].upcoming,) for event_id in sorted(unicos)]
+
+    query = """
+    INSERT INTO events (
+        event_id, sport_id, league_id, league_name, event_timestamp,
+        home_team_id, home_team_name, home_player_name,
+        away_team_id, away_team_name, away_player_name,
+        final_score, has_odds, last_odds_update, upcoming, inserted_at
+    ) VALUES %s
+    ON CONFLICT {conflito} DO UPDATE SET
+        sport_id = EXCLUDED.sport_id,
+        league_id = EXCLUDED.league_id,
+        league_name = EXCLUDED.league_name,
+        event_timestamp = EXCLUDED.event_timestamp,
+        home_team_id = EXCLUDED.home_team_id,
+        home_team_name = EXCLUDED.home_team_name,
+        home_player_name = EXCLUDED.home_player_name,
+        away_team_id = EXCLUDED.away_team_id,
+        away_team_name = EXCLUDED.away_team_name,
+        away_player_name = EXCLUDED.away_player_name,
+        final_score = COALESCE(EXCLUDED.final_score, events.final_score),
+        has_odds = COALESCE(EXCLUDED.has_odds, events.has_odds),
+        last_odds_update = COALESCE(EXCLUDED.last_odds_update, events.last_odds_update),
+        upcoming = events.upcoming AND EXCLUDED.upcoming,  -- Jogo que começou não volta a ser agendado
+        updated_at = NOW()
+    RETURNING event_id;
+    """.format(conflito=_conflito_events(conn))
+    template = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())"
+    try:
+        if is_partitioned(conn, "events"):
+            _mover_reagendados(conn, unicos.values())  # Jogo que mudou de horário não vira uma segunda linha
+        with get_cursor(conn) as cur, section("upsert_event"):
+            rows = execute_values(cur, query, values, template=template, page_size=page_size, fetch=True)
+            DB_ROWS_WRITTEN.inc(len(rows), table="events")
+            return len(rows)
+    except Exception as e:
+        print(f"Erro ao gravar lote de {len(values)} eventos: {e}")
+        raise
+
+
+def insert_odds_bulk(conn, odds_list, page_size=1000):
+    """
+    Insere vários OddsSnapshot (db.models) com um único INSERT multi-linha por lote.
+    Não faz commit. Retorna a quantidade de linhas efetivamente inseridas.
+    """
+    if not odds_list:
+        return 0
+
+    # Particionada por event_timestamp (do evento): a coluna decide a partição
+    particionada = is_partitioned(conn, "odds")
+    values = [odds_item.row(particionada) for odds_item in odds_list]
+    coluna_particao = ", event_timestamp" if particionada else ""
+    template = "(%s, %s, %s, %s, %s, NOW(), %s)" if particionada else "(%s, %s, %s, %s, %s, NOW())"
+
+    query = f"""
+    INSERT INTO odds (
+        event_id, bookmaker, odds_market, odds_timestamp, odds_data, collection_timestamp{coluna_particao}
+    ) VALUES %s
+    ON CONFLICT DO NOTHING -- Evita duplicatas exatas
+    RETURNING event_id;
+    """
+    try:
+        with get_cursor(conn) as cur, section("insert_odds"):
+            rows = execute_values(cur, query, values, template=template, page_size=page_size, fetch=True)
+            DB_ROWS_WRITTEN.inc(len(rows), table="odds")
+            return len(rows)
+    except Exception as e:
+        print(f"Erro ao gravar lote de {len(values)} odds: {e}")
+        raise
+
+
+def get_events_with_odds(conn, event_ids):
+    """Retorna o conjunto de event_ids (entre os informados) que já têm odds gravadas."""
+    if not event_ids:
+        return set()
+    query = "SELECT event_id FROM events WHERE event_id = ANY(%s) AND has_odds IS TRUE;"
+    try:
+        with get_cursor(conn) as cur:
+            cur.execute(query, ([int(event_id) for event_id in event_ids],))
+            return {row["event_id"] for row in cur.fetchall()}
+    except Exception as e:
+        print(f"Erro ao consultar eventos com odds: {e}")
+        raise
+
+
 def update_event_odds_status(conn, event_id, has_odds, last_update_time):
     """Atualiza o status das odds para um evento específico."""
     query = """
@@ -250,17 +692,26 @@ def update_event_odds_status(conn, event_id, has_odds, last_update_time):
         raise
 
 
-def delete_old_events(conn, days_to_keep=60):
-    """Deleta eventos mais antigos que um número específico de dias."""
-    if days_to_keep <= 0:
-        print("Erro: Número de dias para manter deve ser positivo.")
-        return 0
-
+def retention_cutoff(days_to_keep):
+    """Data de corte da retenção (agora no timezone local menos 'days_to_keep' dias), em UTC."""
     # Calcula a data de corte no timezone local configurado
     local_tz = pytz.timezone(TIMEZONE)
     cutoff_date_local = datetime.now(local_tz) - timedelta(days=days_to_keep)
     # Converte para UTC para comparar com TIMESTAMPTZ no banco
-    cutoff_date_utc = cutoff_date_local.astimezone(pytz.utc)
+    return cutoff_date_local.astimezone(pytz.utc)
+
+
+def delete_old_events(conn, days_to_keep=60, cutoff_date_utc=None):
+    """
+    Deleta eventos mais antigos que um número específico de dias
+    (ou que 'cutoff_date_utc', se o chamador já calculou o corte).
+    """
+    if days_to_keep <= 0:
+        print("Erro: Número de dias para manter deve ser positivo.")
+        return 0
+
+    if cutoff_date_utc is None:
+        cutoff_date_utc = retention_cutoff(days_to_keep)
 
     # Deleta baseado no timestamp do evento
     query = "DELETE FROM events WHERE event_timestamp < %s;"
@@ -280,129 +731,84 @@ def delete_old_events(conn, days_to_keep=60):
         raise  # Re-levanta a exceção para ser tratada no main
 
 
-def update_pending_event_scores(conn):
+def delete_stale_fixtures(conn, older_than):
     """
-    Busca eventos sem placar que já deveriam ter acontecido (data passada) e
-    atualiza o status/placar deles fazendo uma nova consulta à API.
+    Apaga os jogos agendados (upcoming) que não começaram até 'older_than' (cancelados
+    ou adiados sem nova data), com as odds do snapshot. Eles nunca entraram nos
+    agregados, então não há o que subtrair. Não faz commit. Retorna a quantidade apagada.
+    """
+    with get_cursor(conn) as cur:
+        cur.execute("DELETE FROM events WHERE upcoming AND event_timestamp < %s RETURNING event_id;", (older_than,))
+        ids = [row["event_id"] for row in cur.fetchall()]
+        # Tabelas particionadas não têm a FK com ON DELETE CASCADE
+        for tabela in ("odds", "odds_history"):
+            if ids and is_partitioned(conn, tabela):
+                cur.execute(f"DELETE FROM {tabela} WHERE event_id = ANY(%s);", (ids,))
+    return len(ids)
 
-    Retorna a quantidade de eventos atualizados.
+
+def get_pending_score_events(conn, older_than):
+    """
+    Lista eventos sem placar com início anterior a 'older_than'. Jogos agendados
+    (upcoming) que não começaram até UPCOMING_STALE_HOURS depois do horário saem
+    da lista: provavelmente foram cancelados e só gastariam cota.
+    Faz commit ao final para não manter a transação de leitura aberta
+    enquanto os placares são buscados na API.
     """
-    now = datetime.now(pytz.timezone(TIMEZONE))
-    threshold = now - timedelta(hours=3)  # Eventos concluídos há pelo menos 3 horas
-
-    # Busca eventos sem placar que já deveriam ter terminado
-    query_get_pending = """
-    SELECT event_id, event_timestamp, league_id 
-    FROM events 
-    WHERE (final_score IS NULL OR final_score = '') 
-    AND event_timestamp < %s 
-    -- Removido filtro de sport_id para atualizar todos os eventos pendentes
+    query = """
+    SELECT event_id, event_timestamp, league_id, sport_id
+    FROM events
+    WHERE (final_score IS NULL OR final_score = '')
+    AND event_timestamp < %s
+    AND (NOT upcoming OR event_timestamp >= %s)
     ORDER BY event_timestamp DESC;
     """
+    limite_agendados = datetime.now(pytz.utc) - timedelta(hours=UPCOMING_STALE_HOURS)
+    try:
+        with get_cursor(conn) as cur:
+            cur.execute(query, (older_than, limite_agendados))
+            rows = [dict(row) for row in cur.fetchall()]
+        conn.commit()
+        return rows
+    except Exception as e:
+        print(f"Erro ao buscar eventos pendentes de placar: {e}")
+        conn.rollback()
+        raise
 
-    updated_count = 0
 
+def update_event_scores_bulk(conn, scores, page_size=500):
+    """
+    Grava vários placares com um único UPDATE ... FROM (VALUES ...) por lote.
+    'scores' é um dict {event_id: placar}. Não faz commit.
+    Retorna a lista de event_ids atualizados.
+    """
+    if not scores:
+        return []
+    query = """
+    UPDATE events
+    SET final_score = v.final_score, upcoming = FALSE, updated_at = NOW()
+    FROM (VALUES %s) AS v(event_id, final_score)
+    WHERE events.event_id = v.event_id
+    RETURNING events.event_id;
+    """
+    values = sorted((int(event_id), score) for event_id, score in scores.items())  # Mesma ordem de travas dos upserts
     try:
         with get_cursor(conn) as cur:
-            cur.execute(query_get_pending, (threshold,))
-            pending_events = cur.fetchall()
-
-            if not pending_events:
-                print(f"Nenhum evento pendente de atualização de placar encontrado.")
-                return 0
-
-            print(f"Encontrados {len(pending_events)} eventos para atualizar o placar.")
-
-            # Cria um cliente API para consultar os eventos
-            from api.client import BetsAPIClient
-            from utils.helpers import parse_score
-
-            api_client = BetsAPIClient()
-
-            for event in pending_events:
-                event_id = event["event_id"]
-                print(f"Buscando atualização para evento ID: {event_id}")
-
-                try:
-                    # Endpoint diretamente para não depender do método
-                    endpoint = f"{api_client.base_url_v1}/event/view"
-                    params = {"event_id": event_id}
-
-                    event_data = api_client._make_request(endpoint, params)
-
-                    # Debug para entender o formato retornado
-                    print(f"DEBUG - Formato da resposta: {type(event_data)}")
-                    if event_data:
-                        print(f"DEBUG - Chaves na resposta: {list(event_data.keys())}")
-                        if "results" in event_data:
-                            result_type = type(event_data["results"])
-                            print(f"DEBUG - Tipo de 'results': {result_type}")
-                            if result_type == dict:
-                                print(f"DEBUG - Chaves em 'results': {list(event_data['results'].keys())}")
-                            elif result_type == list and len(event_data["results"]) > 0:
-                                print(f"DEBUG - Primeiro item em 'results' lista: {type(event_data['results'][0])}")
-                                if isinstance(event_data["results"][0], dict):
-                                    print(f"DEBUG - Chaves no primeiro item: {list(event_data['results'][0].keys())}")
-
-                    if not event_data or event_data.get("success") != 1:
-                        print(f"  → Não foi possível obter dados para o evento ID {event_id}")
-                        continue
-
-                    # Tenta extrair o placar de diferentes formatos possíveis
-                    score = None
-                    results = event_data.get("results", {})
-
-                    # Formato 1: results é um dicionário com chave 'ss'
-                    if isinstance(results, dict) and "ss" in results:
-                        score = parse_score(results.get("ss", ""))
-
-                    # Formato 2: results é uma lista com pelo menos um item que é dicionário com chave 'ss'
-                    elif isinstance(results, list) and len(results) > 0 and isinstance(results[0], dict):
-                        score = parse_score(results[0].get("ss", ""))
-
-                    # Formato 3: results tem uma chave 'scores' que contém o placar
-                    elif isinstance(results, dict) and "scores" in results:
-                        scores = results.get("scores", {})
-                        if isinstance(scores, dict):
-                            # Pode estar em diferentes formatos dependendo do esporte
-                            if "ft" in scores:  # 'ft' = full time
-                                score = scores.get("ft", "")
-                            elif "total" in scores:
-                                score = scores.get("total", "")
-
-                    if score:
-                        # Atualiza o placar no banco de dados
-                        update_query = """
-                        UPDATE events 
-                        SET final_score = %s, updated_at = NOW() 
-                        WHERE event_id = %s;
-                        """
-
-                        cur.execute(update_query, (score, event_id))
-                        updated_count += 1
-                        print(f"  → Evento ID {event_id} atualizado com placar: {score}")
-                    else:
-                        print(f"  → Evento ID {event_id} ainda sem placar disponível ou formato inválido.")
-                        # Tenta extrair o placar diretamente da resposta completa
-                        print(f"  → Resposta da API: {event_data}")
-
-                except Exception as e:
-                    print(f"Erro ao atualizar evento ID {event_id}: {e}")
-                    import traceback
-
-                    print(traceback.format_exc())
-                    continue
-
-            # Commit após processar todos os eventos
-            conn.commit()
-
-        print(f"Atualização completa. {updated_count} eventos tiveram seu placar atualizado.")
-        return updated_count
-
+            rows = execute_values(cur, query, values, template="(%s::bigint, %s)", page_size=page_size, fetch=True)
+            DB_ROWS_WRITTEN.inc(len(rows), table="events_scores")
+            return [row[0] for row in rows]
     except Exception as e:
-        print(f"Erro ao atualizar placares pendentes: {e}")
-        import traceback
-
-        print(traceback.format_exc())
-        conn.rollback()
+        print(f"Erro ao gravar lote de {len(values)} placares: {e}")
         raise
+
+
+def update_pending_event_scores(conn):
+    """
+    Busca eventos sem placar que já deveriam ter acontecido (data passada) e
+    atualiza o placar deles consultando a API em lote (ver collector.scores).
+
+    Retorna a quantidade de eventos atualizados.
+    """
+    from collector.scores import resolve_pending_scores
+
+    return resolve_pending_scores(conn)
@@ -0,0 +1,378 @@
+# db/h2h.py
+"""
+Confronto direto (head-to-head) entre jogadores e forma recente de cada jogador.
+
+player_h2h guarda, por par de jogadores, os últimos H2H_RECENT_GAMES confrontos
+com placar (e as odds 1x2 pré-jogo) já ordenados do mais novo para o mais
+antigo, além dos totais sobre esses jogos. player_form guarda os últimos 20
+jogos de cada jogador e a forma nas janelas de FORM_WINDOWS jogos. As duas
+tabelas são lidas por chave primária: uma linha por par ou por jogador.
+
+O par é gravado com player_a < player_b (ordem de código, COLLATE "C"):
+
+    SELECT * FROM player_h2h
+    WHERE player_a = LEAST('Joao' COLLATE "C", 'Maria') AND player_b = GREATEST('Joao' COLLATE "C", 'Maria');
+
+Manutenção incremental: update_head_to_head relê do banco os eventos recém
+gravados (na mesma transação, depois do upsert e das odds) e mescla cada jogo
+nas listas dos pares e jogadores afetados, por event_id — regravar o mesmo jogo
+não duplica nada. H2HIndex mantém as duas tabelas em memória para o servidor
+de leitura.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+from psycopg2.extras import Json, execute_values
+
+from api import codec
+from config.settings import AGGREGATES_ENABLED, H2H_RECENT_GAMES
+from db.database import get_cursor, DB_ROWS_WRITTEN
+from utils.profiling import section
+
+FORM_WINDOWS = (5, 10, 20)
+FORM_RECENT_GAMES = max(FORM_WINDOWS)
+PONTOS = {"W": 3, "D": 1, "L": 0}
+
+H2H_SCHEMA = """
+CREATE TABLE IF NOT EXISTS player_h2h (
+    player_a TEXT COLLATE "C" NOT NULL,
+    player_b TEXT COLLATE "C" NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    a_wins INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    b_wins INTEGER NOT NULL DEFAULT 0,
+    a_goals INTEGER NOT NULL DEFAULT 0,
+    b_goals INTEGER NOT NULL DEFAULT 0,
+    recent JSONB NOT NULL DEFAULT '[]',
+    last_game_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (player_a, player_b)
+);
+
+CREATE TABLE IF NOT EXISTS player_form (
+    player_name TEXT NOT NULL PRIMARY KEY,
+    form_5 TEXT NOT NULL DEFAULT '',
+    form_10 TEXT NOT NULL DEFAULT '',
+    form_20 TEXT NOT NULL DEFAULT '',
+    points_5 INTEGER NOT NULL DEFAULT 0,
+    points_10 INTEGER NOT NULL DEFAULT 0,
+    points_20 INTEGER NOT NULL DEFAULT 0,
+    recent JSONB NOT NULL DEFAULT '[]',
+    last_game_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+_PLACAR_SQL = "final_score ~ '^[0-9]+-[0-9]+$'"
+
+
+def ensure_h2h_tables(conn):
+    """Cria player_h2h e player_form se não existirem."""
+    with get_cursor(conn) as cur:
+        cur.execute(H2H_SCHEMA)
+    conn.commit()
+
+
+def pair_key(player_a, player_b):
+    """Chave do par na ordem gravada (player_a < player_b)."""
+    return (player_a, player_b) if player_a < player_b else (player_b, player_a)
+
+
+# ----- Montagem das linhas (funções puras sobre listas de jogos) -----
+
+
+def _mesclar(recentes, novos, limite):
+    """Mescla jogos por event_id (o novo prevalece) e mantém os 'limite' mais recentes."""
+    por_id = {jogo["event_id"]: jogo for jogo in recentes}
+    por_id.update((jogo["event_id"], jogo) for jogo in novos)
+    return sorted(por_id.values(), key=lambda jogo: (jogo["ts"], jogo["event_id"]), reverse=True)[:limite]
+
+
+def _gols(jogo, jogador):
+    """(gols de 'jogador', gols do adversário) num jogo do confronto."""
+    casa, fora = (int(gols) for gols in jogo["score"].split("-"))
+    return (casa, fora) if jogo["home"] == jogador else (fora, casa)
+
+
+def summarize_h2h(player_a, recentes):
+    """Totais do ponto de vista de player_a sobre a lista de confrontos."""
+    resumo = {"games": len(recentes), "a_wins": 0, "draws": 0, "b_wins": 0, "a_goals": 0, "b_goals": 0}
+    for jogo in recentes:
+        gols_a, gols_b = _gols(jogo, player_a)
+        resumo["a_goals"] += gols_a
+        resumo["b_goals"] += gols_b
+        resumo["a_wins" if gols_a > gols_b else "b_wins" if gols_a < gols_b else "draws"] += 1
+    return resumo
+
+
+def summarize_form(recentes):
+    """form_N ("WDL..." do mais novo para o mais antigo) e points_N para cada janela."""
+    resultados = "".join(jogo["result"] for jogo in recentes)
+    forma = {}
+    for janela in FORM_WINDOWS:
+        forma[f"form_{janela}"] = resultados[:janela]
+        forma[f"points_{janela}"] = sum(PONTOS[resultado] for resultado in resultados[:janela])
+    return forma
+
+
+def _jogos_por_chave(rows, odds):
+    """Separa os eventos em jogos por par e por jogador, no formato guardado em 'recent'."""
+    por_par = {}
+    por_jogador = {}
+    for row in rows:
+        casa, fora = row["home_player_name"], row["away_player_name"]
+        gols_casa, gols_fora = (int(gols) for gols in row["final_score"].split("-"))
+        ts = row["event_timestamp"].astimezone(timezone.utc).isoformat()  # Mesmo fuso: ordena como texto
+        jogo = {"event_id": row["event_id"], "ts": ts, "league_id": row["league_id"], "home": casa, "score": row["final_score"]}
+        if row["event_id"] in odds:
+            jogo["odds"] = odds[row["event_id"]]
+        por_par.setdefault(pair_key(casa, fora), []).append(jogo)
+
+        for jogador, adversario, pro, contra in ((casa, fora, gols_casa, gols_fora), (fora, casa, gols_fora, gols_casa)):
+            resultado = "W" if pro > contra else "L" if pro < contra else "D"
+            por_jogador.setdefault(jogador, []).append(
+                {"event_id": row["event_id"], "ts": ts, "opponent": adversario, "gf": pro, "ga": contra, "result": resultado}
+            )
+    return por_par, por_jogador
+
+
+def _linha_h2h(chave, recentes):
+    resumo = summarize_h2h(chave[0], recentes)
+    ultimo = datetime.fromisoformat(recentes[0]["ts"]) if recentes else None
+    return chave + (
+        resumo["games"],
+        resumo["a_wins"],
+        resumo["draws"],
+        resumo["b_wins"],
+        resumo["a_goals"],
+        resumo["b_goals"],
+        Json(recentes, dumps=codec.dumps),
+        ultimo,
+    )
+
+
+def _linha_forma(jogador, recentes):
+    forma = summarize_form(recentes)
+    ultimo = datetime.fromisoformat(recentes[0]["ts"]) if recentes else None
+    return (
+        jogador,
+        forma["form_5"],
+        forma["form_10"],
+        forma["form_20"],
+        forma["points_5"],
+        forma["points_10"],
+        forma["points_20"],
+        Json(recentes, dumps=codec.dumps),
+        ultimo,
+    )
+
+
+# ----- Gravação -----
+
+_GRAVAR_H2H = """
+INSERT INTO player_h2h (player_a, player_b, games, a_wins, draws, b_wins, a_goals, b_goals, recent, last_game_at)
+VALUES %s
+ON CONFLICT (player_a, player_b) DO UPDATE SET
+    games = EXCLUDED.games, a_wins = EXCLUDED.a_wins, draws = EXCLUDED.draws, b_wins = EXCLUDED.b_wins,
+    a_goals = EXCLUDED.a_goals, b_goals = EXCLUDED.b_goals, recent = EXCLUDED.recent,
+    last_game_at = EXCLUDED.last_game_at, updated_at = NOW();
+"""
+
+_GRAVAR_FORMA = """
+INSERT INTO player_form (player_name, form_5, form_10, form_20, points_5, points_10, points_20, recent, last_game_at)
+VALUES %s
+ON CONFLICT (player_name) DO UPDATE SET
+    form_5 = EXCLUDED.form_5, form_10 = EXCLUDED.form_10, form_20 = EXCLUDED.form_20,
+    points_5 = EXCLUDED.points_5, points_10 = EXCLUDED.points_10, points_20 = EXCLUDED.points_20,
+    recent = EXCLUDED.recent, last_game_at = EXCLUDED.last_game_at, updated_at = NOW();
+"""
+
+
+def _odds_1x2(cur, event_ids):
+    cur.execute(
+        """
+        SELECT DISTINCT ON (event_id) event_id, odds_data
+        FROM odds
+        WHERE event_id = ANY(%s) AND odds_market = 'prematch_1x2'
+        ORDER BY event_id, odds_timestamp DESC NULLS LAST;
+        """,
+        (list(event_ids),),
+    )
+    return {row["event_id"]: row["odds_data"] for row in cur.fetchall()}
+
+
+def update_head_to_head(conn, event_ids):
+    """
+    Mescla em player_h2h/player_form os eventos com placar entre 'event_ids'.
+    Chamar depois de gravar eventos e odds, na mesma transação. Não faz commit.
+    Retorna a quantidade de pares atualizados.
+    """
+    if not AGGREGATES_ENABLED or not event_ids:
+        return 0
+    with get_cursor(conn) as cur, section("head_to_head"):
+        cur.execute(
+            f"""
+            SELECT event_id, league_id, event_timestamp, home_player_name, away_player_name, final_score
+            FROM events
+            WHERE event_id = ANY(%s) AND {_PLACAR_SQL} AND event_timestamp IS NOT NULL
+              AND COALESCE(home_player_name, '') <> '' AND COALESCE(away_player_name, '') <> '';
+            """,
+            ([int(event_id) for event_id in event_ids],),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return 0
+        por_par, por_jogador = _jogos_por_chave(rows, _odds_1x2(cur, [row["event_id"] for row in rows]))
+        pares = sorted(por_par)
+        jogadores = sorted(por_jogador)
+
+        # Garante as linhas e as trava em ordem de chave: gravadores concorrentes se enfileiram sem deadlock
+        execute_values(cur, "INSERT INTO player_h2h (player_a, player_b) VALUES %s ON CONFLICT DO NOTHING;", pares)
+        execute_values(
+            cur, "INSERT INTO player_form (player_name) VALUES %s ON CONFLICT DO NOTHING;", [(nome,) for nome in jogadores]
+        )
+        cur.execute(
+            """
+            SELECT player_a, player_b, recent FROM player_h2h
+            WHERE (player_a, player_b) IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+            ORDER BY player_a, player_b
+            FOR UPDATE;
+            """,
+            ([a for a, _ in pares], [b for _, b in pares]),
+        )
+        atuais_pares = {(row["player_a"], row["player_b"]): row["recent"] for row in cur.fetchall()}
+        cur.execute(
+            "SELECT player_name, recent FROM player_form WHERE player_name = ANY(%s) ORDER BY player_name FOR UPDATE;",
+            (jogadores,),
+        )
+        atuais_jogadores = {row["player_name"]: row["recent"] for row in cur.fetchall()}
+
+        linhas_h2h = [
+            _linha_h2h(chave, _mesclar(atuais_pares.get(chave, []), por_par[chave], H2H_RECENT_GAMES)) for chave in pares
+        ]
+        linhas_forma = [
+            _linha_forma(nome, _mesclar(atuais_jogadores.get(nome, []), por_jogador[nome], FORM_RECENT_GAMES))
+            for nome in jogadores
+        ]
+        execute_values(cur, _GRAVAR_H2H, linhas_h2h)
+        execute_values(cur, _GRAVAR_FORMA, linhas_forma)
+    DB_ROWS_WRITTEN.inc(len(linhas_h2h), table="player_h2h")
+    DB_ROWS_WRITTEN.inc(len(linhas_forma), table="player_form")
+    return len(linhas_h2h)
+
+
+def prune_head_to_head(conn, cutoff):
+    """Remove pares e jogadores sem jogos desde 'cutoff' (acompanha a retenção). Não faz commit."""
+    if not AGGREGATES_ENABLED:
+        return
+    with get_cursor(conn) as cur:
+        cur.execute("DELETE FROM player_h2h WHERE last_game_at < %s;", (cutoff,))
+        cur.execute("DELETE FROM player_form WHERE last_game_at < %s;", (cutoff,))
+
+
+def rebuild_head_to_head(conn, batch_size=5000):
+    """Recalcula player_h2h e player_form a partir de todos os eventos com placar. Não faz commit."""
+    inicio = datetime.now()
+    por_par = {}
+    por_jogador = {}
+    with get_cursor(conn) as cur:
+        cur.execute(H2H_SCHEMA)
+        cur.execute("LOCK TABLE events IN SHARE MODE;")
+        cur.execute("TRUNCATE player_h2h, player_form;")
+        cur.execute(
+            f"""
+            SELECT event_id, league_id, event_timestamp, home_player_name, away_player_name, final_score
+            FROM events
+            WHERE {_PLACAR_SQL} AND event_timestamp IS NOT NULL
+              AND COALESCE(home_player_name, '') <> '' AND COALESCE(away_player_name, '') <> '';
+            """
+        )
+        todos = cur.fetchall()
+        for i in range(0, len(todos), batch_size):
+            rows = todos[i : i + batch_size]
+            pares, jogadores = _jogos_por_chave(rows, _odds_1x2(cur, [row["event_id"] for row in rows]))
+            for chave, jogos in pares.items():
+                por_par[chave] = _mesclar(por_par.get(chave, []), jogos, H2H_RECENT_GAMES)
+            for nome, jogos in jogadores.items():
+                por_jogador[nome] = _mesclar(por_jogador.get(nome, []), jogos, FORM_RECENT_GAMES)
+
+        execute_values(cur, _GRAVAR_H2H, [_linha_h2h(chave, jogos) for chave, jogos in sorted(por_par.items())])
+        execute_values(cur, _GRAVAR_FORMA, [_linha_forma(nome, jogos) for nome, jogos in sorted(por_jogador.items())])
+    duracao = (datetime.now() - inicio).total_seconds()
+    print(f"Confrontos recalculados em {duracao:.1f}s: {len(por_par)} pares, {len(por_jogador)} jogadores.")
+    return len(por_par), len(por_jogador)
+
+
+# ----- Consulta -----
+
+
+def _orientar(row, player_a):
+    """Linha de player_h2h do ponto de vista de player_a."""
+    dados = dict(row)
+    if dados["player_a"] != player_a:
+        dados["player_a"], dados["player_b"] = dados["player_b"], dados["player_a"]
+        dados["a_wins"], dados["b_wins"] = dados["b_wins"], dados["a_wins"]
+        dados["a_goals"], dados["b_goals"] = dados["b_goals"], dados["a_goals"]
+    return dados
+
+
+def get_head_to_head(conn, player_a, player_b):
+    """Confronto entre dois jogadores (totais do ponto de vista de player_a) ou None."""
+    chave = pair_key(player_a, player_b)
+    with get_cursor(conn) as cur:
+        cur.execute("SELECT * FROM player_h2h WHERE player_a = %s AND player_b = %s;", chave)
+        row = cur.fetchone()
+    return _orientar(row, player_a) if row else None
+
+
+def get_player_form(conn, player_name):
+    """Forma recente de um jogador ou None."""
+    with get_cursor(conn) as cur:
+        cur.execute("SELECT * FROM player_form WHERE player_name = %s;", (player_name,))
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
+class H2HIndex:
+    """player_h2h e player_form em memória, por nome sem diferenciar maiúsculas."""
+
+    OVERLAP = timedelta(seconds=60)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pares = {}  # (a, b) normalizados e ordenados -> linha
+        self._formas = {}  # nome normalizado -> linha
+        self._marca = None
+        self.version = 0
+
+    @staticmethod
+    def _chave_par(player_a, player_b):
+        return tuple(sorted((player_a.casefold(), player_b.casefold())))
+
+    def refresh(self, conn):
+        """Lê as linhas alteradas desde a última leitura (todas, na primeira). Retorna linhas aplicadas."""
+        filtro, params = ("WHERE updated_at > %s", (self._marca - self.OVERLAP,)) if self._marca else ("", ())
+        with get_cursor(conn) as cur:
+            cur.execute(f"SELECT * FROM player_h2h {filtro};", params)
+            pares = [dict(row) for row in cur.fetchall()]
+            cur.execute(f"SELECT * FROM player_form {filtro};", params)
+            formas = [dict(row) for row in cur.fetchall()]
+        marcas = [row["updated_at"] for row in pares + formas]
+        with self._lock:
+            for row in pares:
+                self._pares[self._chave_par(row["player_a"], row["player_b"])] = row
+            for row in formas:
+                self._formas[row["player_name"].casefold()] = row
+            if marcas:
+                self._marca = max(marcas + ([self._marca] if self._marca else []))
+                self.version += 1
+        return len(marcas)
+
+    def head_to_head(self, player_a, player_b):
+        row = self._pares.get(self._chave_par(player_a, player_b))
+        if row is None:
+            return None
+        return _orientar(row, row["player_a"] if row["player_a"].casefold() == player_a.casefold() else row["player_b"])
+
+    def form(self, player_name):
+        return self._formas.get(player_name.casefold())
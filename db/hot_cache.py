@@ -0,0 +1,248 @@
+# db/hot_cache.py
+"""
+Índice em memória dos jogos das últimas READ_SERVER_WINDOW_HOURS horas, usado
+pelo servidor de leitura (api_server.py).
+
+Aquecido uma vez a partir do Postgres (warm) e depois atualizado por polling
+(refresh): cada leitura busca só os eventos que o coletor inseriu ou alterou
+desde a última marca (COALESCE(updated_at, inserted_at)), com uma sobreposição
+para não perder transações que commitaram fora de ordem. Jogos agendados
+(events.upcoming, --mode upcoming) e horários futuros ficam de fora: o índice só
+tem jogos que já começaram. Como as mudanças não trazem linhas apagadas (fixtures
+velhos, retenção), cada refresh confere também quais IDs da janela ainda existem.
+Consultas quentes (recentes, evento, últimos jogos de um jogador) não tocam o
+banco nem a API. 'version' muda sempre que o conteúdo muda e serve de base
+para os ETags das respostas.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+from config.settings import READ_SERVER_WINDOW_HOURS
+from db.database import get_cursor
+from db.models import EVENT_COLUMNS, Event
+
+REFRESH_OVERLAP = timedelta(seconds=60)  # Transações que commitaram depois de outras mais novas
+# Linhas que o índice serve: jogos da janela que já começaram (agendados só entram ao começar)
+_FILTRO_JANELA = "event_timestamp >= %s AND event_timestamp <= NOW() AND NOT upcoming"
+_SEM_HORARIO = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def iso_value(valor):
+    """datetime em ISO 8601; demais valores inalterados."""
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def _chave(nome):
+    return nome.casefold() if nome else None
+
+
+def _evento_de_linha(row):
+    return Event(*(row[coluna] for coluna in EVENT_COLUMNS))
+
+
+def _odds_por_evento(rows):
+    """Último snapshot de cada mercado por evento: {event_id: {odds_market: dict}}."""
+    por_evento = {}
+    for row in rows:
+        mercados = por_evento.setdefault(row["event_id"], {})
+        atual = mercados.get(row["odds_market"])
+        if atual is None or (row["odds_timestamp"] or _SEM_HORARIO) >= (atual["odds_timestamp"] or _SEM_HORARIO):
+            mercados[row["odds_market"]] = {
+                "bookmaker": row["bookmaker"],
+                "odds_timestamp": row["odds_timestamp"],
+                "odds": row["odds_data"],
+            }
+    return por_evento
+
+
+def event_to_json(evento, odds=None):
+    """Evento (e odds por mercado, se informadas) como dict serializável em JSON."""
+    dados = {coluna: iso_value(valor) for coluna, valor in zip(EVENT_COLUMNS, evento.row())}
+    if odds is not None:
+        dados["odds"] = {
+            mercado: {"bookmaker": item["bookmaker"], "odds_timestamp": iso_value(item["odds_timestamp"]), "odds": item["odds"]}
+            for mercado, item in sorted(odds.items())
+        }
+    return dados
+
+
+def fetch_event(conn, event_id):
+    """
+    Evento e odds direto do banco (para IDs fora da janela em memória). Retorna (Event, odds) ou None.
+    Jogos agendados que ainda não começaram não são servidos, como no índice.
+    """
+    with get_cursor(conn) as cur:
+        cur.execute(
+            f"SELECT {', '.join(EVENT_COLUMNS)} FROM events WHERE event_id = %s AND NOT upcoming;", (int(event_id),)
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        cur.execute(
+            "SELECT event_id, bookmaker, odds_market, odds_timestamp, odds_data FROM odds WHERE event_id = %s;",
+            (int(event_id),),
+        )
+        odds = _odds_por_evento(cur.fetchall()).get(int(event_id), {})
+    return _evento_de_linha(row), odds
+
+
+class HotIndex:
+    """Eventos recentes com odds, indexados por ID, liga e jogador."""
+
+    def __init__(self, window_hours=READ_SERVER_WINDOW_HOURS):
+        self.window = timedelta(hours=window_hours)
+        self.version = 0
+        self.loaded_at = None
+        self._lock = threading.RLock()
+        self._eventos = {}  # event_id -> Event
+        self._odds = {}  # event_id -> {odds_market: {...}}
+        self._por_jogador = {}  # nome normalizado -> set(event_id)
+        self._recentes = []  # event_ids do mais novo para o mais antigo
+        self._marca = None  # Maior COALESCE(updated_at, inserted_at) já lido
+
+    # ----- Carga -----
+
+    def _ler(self, conn, desde=None):
+        inicio = datetime.now(timezone.utc) - self.window
+        filtros = [_FILTRO_JANELA]
+        params = [inicio]
+        if desde is not None:
+            filtros.append("COALESCE(updated_at, inserted_at) > %s")
+            params.append(desde - REFRESH_OVERLAP)
+        with get_cursor(conn) as cur:
+            cur.execute(
+                f"""
+                SELECT {", ".join(EVENT_COLUMNS)}, COALESCE(updated_at, inserted_at) AS alterado_em
+                FROM events
+                WHERE {" AND ".join(filtros)};
+                """,
+                params,
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return [], {}, None
+            cur.execute(
+                """
+                SELECT event_id, bookmaker, odds_market, odds_timestamp, odds_data
+                FROM odds
+                WHERE event_id = ANY(%s);
+                """,
+                ([row["event_id"] for row in rows],),
+            )
+            odds = _odds_por_evento(cur.fetchall())
+        marca = max((row["alterado_em"] for row in rows if row["alterado_em"] is not None), default=None)
+        return [_evento_de_linha(row) for row in rows], odds, marca
+
+    def _ids_na_janela(self, conn):
+        """IDs que o índice deveria ter agora (a leitura de mudanças não traz linhas apagadas)."""
+        with get_cursor(conn) as cur:
+            cur.execute(
+                f"SELECT event_id FROM events WHERE {_FILTRO_JANELA};", (datetime.now(timezone.utc) - self.window,)
+            )
+            return {row["event_id"] for row in cur.fetchall()}
+
+    def warm(self, conn):
+        """Carrega a janela inteira do banco. Retorna a quantidade de eventos."""
+        eventos, odds, marca = self._ler(conn)
+        with self._lock:
+            self._eventos = {}
+            self._odds = {}
+            self._por_jogador = {}
+            self._aplicar(eventos, odds)
+            self._marca = marca
+            self.loaded_at = datetime.now(timezone.utc)
+            self.version += 1
+            return len(self._eventos)
+
+    def refresh(self, conn):
+        """Aplica as mudanças desde a última leitura e descarta o que saiu da janela. Retorna eventos alterados."""
+        if self.loaded_at is None:
+            return self.warm(conn)
+        eventos, odds, marca = self._ler(conn, desde=self._marca)
+        presentes = self._ids_na_janela(conn)  # Depois das mudanças: o que sumiu entre as duas leituras também sai
+        with self._lock:
+            alterados = self._aplicar(eventos, odds)
+            removidos = self._expirar(presentes)
+            if marca is not None and (self._marca is None or marca > self._marca):
+                self._marca = marca
+            if alterados or removidos:
+                self.version += 1
+            return alterados
+
+    def _aplicar(self, eventos, odds):
+        alterados = 0
+        for evento in eventos:
+            event_id = evento.event_id
+            odds_evento = odds.get(event_id, {})
+            anterior = self._eventos.get(event_id)
+            if anterior == evento and self._odds.get(event_id, {}) == odds_evento:
+                continue
+            if anterior is not None:
+                self._desindexar(anterior)
+            self._eventos[event_id] = evento
+            self._odds[event_id] = odds_evento
+            for nome in (evento.home_player_name, evento.away_player_name):
+                if nome:
+                    self._por_jogador.setdefault(_chave(nome), set()).add(event_id)
+            alterados += 1
+        if alterados:
+            self._ordenar()
+        return alterados
+
+    def _desindexar(self, evento):
+        for nome in (evento.home_player_name, evento.away_player_name):
+            ids = self._por_jogador.get(_chave(nome))
+            if ids is not None:
+                ids.discard(evento.event_id)
+                if not ids:
+                    del self._por_jogador[_chave(nome)]
+
+    def _expirar(self, presentes=None):
+        """Descarta o que saiu da janela e, com 'presentes', os IDs que não estão mais no banco."""
+        inicio = datetime.now(timezone.utc) - self.window
+        antigos = [
+            evento
+            for evento in self._eventos.values()
+            if evento.event_timestamp is None
+            or evento.event_timestamp < inicio
+            or (presentes is not None and evento.event_id not in presentes)
+        ]
+        for evento in antigos:
+            self._desindexar(evento)
+            del self._eventos[evento.event_id]
+            self._odds.pop(evento.event_id, None)
+        if antigos:
+            self._ordenar()
+        return len(antigos)
+
+    def _ordenar(self):
+        self._recentes = sorted(self._eventos, key=lambda event_id: self._eventos[event_id].event_timestamp, reverse=True)
+
+    # ----- Consultas -----
+
+    def __len__(self):
+        return len(self._eventos)
+
+    def get(self, event_id):
+        """(Event, odds) do evento ou None se não estiver na janela."""
+        with self._lock:
+            evento = self._eventos.get(int(event_id))
+            return (evento, self._odds.get(evento.event_id, {})) if evento is not None else None
+
+    def recent(self, limit=50, league_id=None):
+        """Eventos mais recentes (opcionalmente de uma liga)."""
+        with self._lock:
+            eventos = (self._eventos[event_id] for event_id in self._recentes)
+            if league_id is not None:
+                eventos = (evento for evento in eventos if evento.league_id == league_id)
+            return [evento for _, evento in zip(range(limit), eventos)]
+
+    def player_games(self, player_name, limit=10, league_id=None):
+        """Últimos jogos de um jogador (nome sem diferenciar maiúsculas)."""
+        with self._lock:
+            ids = self._por_jogador.get(_chave(player_name), ())
+            eventos = [self._eventos[event_id] for event_id in ids]
+        if league_id is not None:
+            eventos = [evento for evento in eventos if evento.league_id == league_id]
+        eventos.sort(key=lambda evento: evento.event_timestamp, reverse=True)
+        return eventos[:limit]
@@ -0,0 +1,109 @@
+# db/live.py
+"""
+Estado dos jogos ao vivo (collector/live.py).
+
+live_events guarda o estado atual de cada jogo acompanhado (uma linha por
+evento, reescrita só quando o hash do payload muda). live_event_changes guarda
+só o que mudou em cada alteração (placar, status, placares por tempo), com null
+indicando campo removido — o mesmo formato de delta de odds_history.
+"""
+from psycopg2.extras import Json, execute_values
+
+from api import codec
+from db.database import get_cursor, DB_ROWS_WRITTEN
+
+LIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS live_events (
+    event_id BIGINT PRIMARY KEY,
+    league_id BIGINT,
+    time_status TEXT,
+    score TEXT,
+    minute INTEGER,
+    state JSONB NOT NULL,
+    payload_hash TEXT NOT NULL,
+    first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ended_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_live_events_open ON live_events (league_id) WHERE ended_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS live_event_changes (
+    event_id BIGINT NOT NULL,
+    ts TIMESTAMPTZ NOT NULL,
+    diff JSONB NOT NULL,
+    PRIMARY KEY (event_id, ts)
+);
+"""
+
+
+def ensure_live_tables(conn):
+    """Cria live_events e live_event_changes se não existirem."""
+    with get_cursor(conn) as cur:
+        cur.execute(LIVE_SCHEMA)
+    conn.commit()
+
+
+def load_open_live_events(conn):
+    """Jogos ainda abertos: {event_id: (league_id, payload_hash, state)} (retomada após reinício)."""
+    with get_cursor(conn) as cur:
+        cur.execute("SELECT event_id, league_id, payload_hash, state FROM live_events WHERE ended_at IS NULL;")
+        return {row["event_id"]: (row["league_id"], row["payload_hash"], row["state"]) for row in cur.fetchall()}
+
+
+def save_live_changes(conn, mudancas):
+    """
+    Grava as alterações de um polling: 'mudancas' é uma lista de
+    (event_id, league_id, time_status, score, minute, state, payload_hash, ts, diff).
+    Não faz commit. Retorna a quantidade de eventos gravados.
+    """
+    if not mudancas:
+        return 0
+    estados = [
+        (event_id, league_id, time_status, score, minute, Json(state, dumps=codec.dumps), payload_hash, ts)
+        for event_id, league_id, time_status, score, minute, state, payload_hash, ts, _ in mudancas
+    ]
+    diffs = [(event_id, ts, Json(diff, dumps=codec.dumps)) for event_id, _, _, _, _, _, _, ts, diff in mudancas]
+    with get_cursor(conn) as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO live_events (event_id, league_id, time_status, score, minute, state, payload_hash, changed_at)
+            VALUES %s
+            ON CONFLICT (event_id) DO UPDATE SET
+                league_id = EXCLUDED.league_id,
+                time_status = EXCLUDED.time_status,
+                score = EXCLUDED.score,
+                minute = EXCLUDED.minute,
+                state = EXCLUDED.state,
+                payload_hash = EXCLUDED.payload_hash,
+                changed_at = EXCLUDED.changed_at,
+                ended_at = NULL;
+            """,
+            estados,
+        )
+        execute_values(cur, "INSERT INTO live_event_changes (event_id, ts, diff) VALUES %s ON CONFLICT DO NOTHING;", diffs)
+    DB_ROWS_WRITTEN.inc(len(estados), table="live_events")
+    DB_ROWS_WRITTEN.inc(len(diffs), table="live_event_changes")
+    return len(estados)
+
+
+def mark_live_ended(conn, event_ids):
+    """Marca como encerrados os jogos que saíram do /events/inplay. Não faz commit."""
+    if not event_ids:
+        return
+    with get_cursor(conn) as cur:
+        cur.execute(
+            "UPDATE live_events SET ended_at = NOW() WHERE event_id = ANY(%s) AND ended_at IS NULL;",
+            ([int(event_id) for event_id in event_ids],),
+        )
+
+
+def prune_live(conn, cutoff):
+    """Remove o acompanhamento ao vivo anterior a 'cutoff' (se as tabelas existirem). Não faz commit."""
+    with get_cursor(conn) as cur:
+        cur.execute("SELECT to_regclass('live_events') IS NOT NULL AS existe;")
+        if not cur.fetchone()["existe"]:
+            return
+        cur.execute("DELETE FROM live_event_changes WHERE ts < %s;", (cutoff,))
+        cur.execute("DELETE FROM live_events WHERE first_seen_at < %s;", (cutoff,))
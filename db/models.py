@@ -0,0 +1,221 @@
+# db/models.py
+"""
+Registros tipados de evento e odds, montados uma única vez a partir do JSON da API.
+
+Substituem os dicts avulsos entre a coleta e o banco: os tipos (IDs inteiros,
+datetimes, placar validado) são resolvidos em from_api e a gravação em lote só
+chama row(). Com __slots__ cada registro ocupa uma fração de um dict de 14 chaves,
+o que permite manter a janela inteira de DAYS_TO_KEEP de uma liga em memória
+(ver benchmarks/bench_models.py para o custo de parsing e o tamanho por registro).
+"""
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+from api import codec
+from config.settings import TARGET_SPORT_ID
+from utils.helpers import extrair_time_jogador, converter_timestamp, parse_score
+
+# Ordem das colunas usada por Event.row() e pelos INSERTs de db.database
+EVENT_COLUMNS = (
+    "event_id",
+    "sport_id",
+    "league_id",
+    "league_name",
+    "event_timestamp",
+    "home_team_id",
+    "home_team_name",
+    "home_player_name",
+    "away_team_id",
+    "away_team_name",
+    "away_player_name",
+    "final_score",
+    "has_odds",
+    "last_odds_update",
+)
+
+BOOKMAKER = "Bet365"  # Focar nas odds da Bet365 por enquanto
+
+# Mercados pré-jogo: (id na API, odds_market, (chave gravada, chave na API)..., chaves obrigatórias)
+MERCADOS = (
+    ("1_1", "prematch_1x2", (("home", "home_od"), ("draw", "draw_od"), ("away", "away_od"), ("ss", "ss")), ()),
+    (
+        "1_2",
+        "prematch_asian_handicap",
+        (("handicap", "handicap"), ("home", "home_od"), ("away", "away_od"), ("ss", "ss")),
+        ("home", "away"),
+    ),
+    (
+        "1_3",
+        "prematch_over_under",
+        (("line", "handicap"), ("over", "over_od"), ("under", "under_od"), ("ss", "ss")),
+        ("over", "under"),
+    ),
+)
+
+
+def _to_int(value):
+    """Converte para int preservando None e "" (IDs chegam como string da API)."""
+    return int(value) if value not in (None, "") else None
+
+
+@lru_cache(maxsize=8192)
+def _separar_nome(nome):
+    """
+    extrair_time_jogador com cache e strings internadas: numa liga os mesmos
+    'Time (Jogador)' se repetem em centenas de jogos, então o regex roda uma vez
+    por nome e todos os registros compartilham as mesmas strings.
+    """
+    time, jogador = extrair_time_jogador(nome)
+    return sys.intern(time), (sys.intern(jogador) if jogador else None)
+
+
+@lru_cache(maxsize=4096)
+def _timestamp(timestamp_unix):
+    """converter_timestamp com cache: add_time e last_update se repetem entre os mercados de um jogo."""
+    return converter_timestamp(timestamp_unix)
+
+
+@lru_cache(maxsize=1024)
+def _internar(texto):
+    return sys.intern(texto) if isinstance(texto, str) else texto
+
+
+@dataclass(slots=True)
+class Event:
+    """Jogo de eSoccer pronto para a tabela events."""
+
+    event_id: int
+    sport_id: int | None
+    league_id: int | None
+    league_name: str | None
+    event_timestamp: datetime | None
+    home_team_id: int | None
+    home_team_name: str | None
+    home_player_name: str | None
+    away_team_id: int | None
+    away_team_name: str | None
+    away_player_name: str | None
+    final_score: str | None
+    has_odds: bool | None = None  # None mantém o valor já existente no DB
+    last_odds_update: datetime | None = None
+    upcoming: bool = False  # Agendado ainda não iniciado (collector/upcoming.py); fora de EVENT_COLUMNS/row()
+
+    @classmethod
+    def from_api(cls, jogo_data, has_odds=None, last_odds_update=None):
+        """
+        Monta o evento a partir de um item de /events/ended ou /event/view.
+        Levanta ValueError se algum ID não for numérico.
+        """
+        league_data = jogo_data.get("league") or {}
+        home_data = jogo_data.get("home") or {}
+        away_data = jogo_data.get("away") or {}
+        home_team_name, home_player = _separar_nome(home_data.get("name", ""))
+        away_team_name, away_player = _separar_nome(away_data.get("name", ""))
+        return cls(
+            int(jogo_data["id"]),
+            _to_int(jogo_data.get("sport_id", TARGET_SPORT_ID)),
+            _to_int(league_data.get("id")),
+            _internar(league_data.get("name", "")),
+            converter_timestamp(jogo_data.get("time")),
+            _to_int(home_data.get("id")),
+            home_team_name,
+            home_player,
+            _to_int(away_data.get("id")),
+            away_team_name,
+            away_player,
+            parse_score(jogo_data.get("ss")),
+            has_odds,
+            last_odds_update,
+        )
+
+    def row(self):
+        """Tupla na ordem de EVENT_COLUMNS."""
+        return (
+            self.event_id,
+            self.sport_id,
+            self.league_id,
+            self.league_name,
+            self.event_timestamp,
+            self.home_team_id,
+            self.home_team_name,
+            self.home_player_name,
+            self.away_team_id,
+            self.away_team_name,
+            self.away_player_name,
+            self.final_score,
+            self.has_odds,
+            self.last_odds_update,
+        )
+
+
+@dataclass(slots=True)
+class OddsSnapshot:
+    """Um mercado de odds de um evento, com odds_data já serializado em JSON."""
+
+    event_id: int
+    bookmaker: str
+    odds_market: str
+    odds_timestamp: datetime | None
+    odds_data: str
+    event_timestamp: datetime | None = None  # Chave de partição da tabela odds
+
+    def row(self, com_event_timestamp=False):
+        """Tupla (event_id, bookmaker, odds_market, odds_timestamp, odds_data[, event_timestamp])."""
+        if com_event_timestamp:
+            return (self.event_id, self.bookmaker, self.odds_market, self.odds_timestamp, self.odds_data, self.event_timestamp)
+        return (self.event_id, self.bookmaker, self.odds_market, self.odds_timestamp, self.odds_data)
+
+
+def parse_odds_summary(odds_summary_data, event_id, event_timestamp=None):
+    """
+    Converte o resumo de odds (/v2/event/odds/summary) em OddsSnapshot dos
+    mercados pré-jogo da Bet365. Retorna (snapshots, last_update) — lista vazia
+    e None se não houver odds válidas.
+    """
+    if not odds_summary_data or odds_summary_data.get("success") != 1:
+        return [], None
+
+    bet365_data = (odds_summary_data.get("results") or {}).get(BOOKMAKER) or {}
+    odds_start = (bet365_data.get("odds") or {}).get("start") or {}  # Odds pré-jogo
+    if not odds_start:
+        return [], None
+
+    event_id = int(event_id)
+    snapshots = []
+    for market_id, odds_market, campos, obrigatorios in MERCADOS:
+        mercado = odds_start.get(market_id)
+        if not mercado:
+            continue
+        # Remove chaves com valor None antes de salvar
+        odds_data = {chave: mercado[origem] for chave, origem in campos if mercado.get(origem) is not None}
+        if not odds_data or any(chave not in odds_data for chave in obrigatorios):
+            continue
+        snapshots.append(
+            OddsSnapshot(
+                event_id,
+                BOOKMAKER,
+                odds_market,
+                _timestamp(mercado.get("add_time")),  # add_time do mercado, se disponível
+                codec.dumps(odds_data),  # Codificado uma única vez
+                event_timestamp,
+            )
+        )
+
+    return snapshots, _timestamp(bet365_data.get("last_update"))
+
+
+@dataclass(slots=True)
+class OddsTick:
+    """Um tick do histórico de odds guardado como delta (ver db/odds_history.py)."""
+
+    event_id: int
+    odds_market: str
+    ts: datetime
+    delta: str  # JSON só com os campos que mudaram desde o tick anterior (null = campo removido)
+    event_timestamp: datetime | None = None  # Chave de partição da tabela odds_history
+
+    def row(self):
+        """Tupla (event_id, odds_market, ts, delta, event_timestamp)."""
+        return (self.event_id, self.odds_market, self.ts, self.delta, self.event_timestamp)
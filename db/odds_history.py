@@ -0,0 +1,205 @@
+# db/odds_history.py
+"""
+Histórico completo das odds de um evento (/v2/event/odds), não só o 'start'.
+
+Cada mercado é uma série de ticks ordenada por add_time. Para ocupar pouco,
+cada linha guarda só o delta em relação ao tick anterior do mesmo mercado: o
+primeiro tick vem completo, os seguintes só com os campos que mudaram (null
+indica campo removido). Ticks sem mudança não são gravados. A chave primária
+(event_id, odds_market, ts) serve de índice para a leitura do movimento de linha,
+que é uma varredura de faixa + reconstrução em memória (get_line_movement).
+
+O crescimento é limitado pela mesma janela de DAYS_TO_KEEP: em schema comum a
+FK com ON DELETE CASCADE acompanha a limpeza de events; em schema particionado
+(db/partitions.py) as partições de odds_history são descartadas junto.
+"""
+from datetime import datetime, timezone
+
+from psycopg2.extras import execute_values
+
+from api import codec
+from config.settings import ODDS_HISTORY_MARKETS
+from db.database import get_cursor, is_partitioned, reset_partition_cache, DB_ROWS_WRITTEN
+from db.models import OddsTick
+from db.partitions import PARTITIONED_SCHEMA, ensure_future_partitions
+from utils.profiling import section
+
+ODDS_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS odds_history (
+    event_id BIGINT NOT NULL REFERENCES events (event_id) ON DELETE CASCADE,
+    odds_market TEXT NOT NULL,
+    ts TIMESTAMPTZ NOT NULL,
+    delta JSONB NOT NULL,
+    event_timestamp TIMESTAMPTZ,
+    PRIMARY KEY (event_id, odds_market, ts)
+);
+"""
+
+CAMPOS_IGNORADOS = frozenset(("id", "add_time"))  # Identificador e horário do tick não entram no estado
+
+
+def ensure_odds_history_table(conn):
+    """Cria odds_history (particionada se events for particionada) se não existir."""
+    with get_cursor(conn) as cur:
+        if is_partitioned(conn, "events"):
+            cur.execute(PARTITIONED_SCHEMA)  # Idempotente: só cria o que falta
+        else:
+            cur.execute(ODDS_HISTORY_SCHEMA)
+    reset_partition_cache()  # odds_history pode ter acabado de ser criada
+    if is_partitioned(conn, "odds_history"):
+        ensure_future_partitions(conn)
+    conn.commit()
+
+
+def _horario(tick):
+    try:
+        return int(tick.get("add_time"))
+    except (TypeError, ValueError):
+        return None
+
+
+def delta_encode(event_id, odds_market, ticks, event_timestamp=None):
+    """
+    Converte os ticks de um mercado (dicts da API, em qualquer ordem) em OddsTick com deltas.
+    Ticks com o mesmo add_time são fundidos (vale o último pelo id).
+    """
+    ordenados = sorted(
+        (tick for tick in ticks if _horario(tick) is not None),
+        key=lambda tick: (_horario(tick), int(tick["id"]) if str(tick.get("id", "")).isdigit() else 0),
+    )
+    deltas = []  # [(add_time, delta)]
+    estado = {}
+    for tick in ordenados:
+        novo = {campo: valor for campo, valor in tick.items() if campo not in CAMPOS_IGNORADOS and valor is not None}
+        delta = {campo: valor for campo, valor in novo.items() if estado.get(campo) != valor}
+        delta.update({campo: None for campo in estado if campo not in novo})
+        estado = novo
+        if not delta:
+            continue  # Sem mudança: não ocupa uma linha
+        horario = _horario(tick)
+        if deltas and deltas[-1][0] == horario:
+            deltas[-1][1].update(delta)
+        else:
+            deltas.append((horario, delta))
+
+    return [
+        OddsTick(
+            event_id,
+            odds_market,
+            datetime.fromtimestamp(horario, timezone.utc),
+            codec.dumps(delta),
+            event_timestamp,
+        )
+        for horario, delta in deltas
+    ]
+
+
+def parse_event_odds(event_odds_data, event_id, event_timestamp=None, markets=ODDS_HISTORY_MARKETS):
+    """
+    Converte a resposta de /v2/event/odds em OddsTick de todos os mercados
+    (ou só de 'markets', se informado). Retorna lista vazia se não houver odds.
+    """
+    if not event_odds_data or event_odds_data.get("success") != 1:
+        return []
+    results = event_odds_data.get("results") or {}
+    series = results.get("odds") if isinstance(results, dict) else None
+    if not series:
+        return []
+
+    event_id = int(event_id)
+    ticks = []
+    for odds_market, lista in series.items():
+        if markets and odds_market not in markets:
+            continue
+        if isinstance(lista, list):
+            ticks.extend(delta_encode(event_id, odds_market, lista, event_timestamp))
+    return ticks
+
+
+def insert_odds_history_bulk(conn, ticks, page_size=1000):
+    """
+    Insere vários OddsTick com um único INSERT multi-linha por lote.
+    Não faz commit. Retorna a quantidade de linhas efetivamente inseridas.
+    """
+    if not ticks:
+        return 0
+    query = """
+    INSERT INTO odds_history (event_id, odds_market, ts, delta, event_timestamp)
+    VALUES %s
+    ON CONFLICT DO NOTHING
+    RETURNING event_id;
+    """
+    values = [tick.row() for tick in ticks]
+    try:
+        with get_cursor(conn) as cur, section("insert_odds_history"):
+            rows = execute_values(cur, query, values, page_size=page_size, fetch=True)
+            DB_ROWS_WRITTEN.inc(len(rows), table="odds_history")
+            return len(rows)
+    except Exception as e:
+        print(f"Erro ao gravar lote de {len(values)} ticks de histórico de odds: {e}")
+        raise
+
+
+def reconstruir(deltas):
+    """Aplica os deltas em ordem e devolve [(ts, estado completo)] — o movimento de linha."""
+    estado = {}
+    serie = []
+    for ts, delta in deltas:
+        for campo, valor in delta.items():
+            if valor is None:
+                estado.pop(campo, None)
+            else:
+                estado[campo] = valor
+        serie.append((ts, dict(estado)))
+    return serie
+
+
+def get_line_movement(conn, event_id, odds_market=None, event_timestamp=None):
+    """
+    Movimento de linha de um evento: {odds_market: [(ts, estado)]}.
+    'event_timestamp' é opcional e só serve para o Postgres podar partições.
+    """
+    filtros = ["event_id = %s"]
+    params = [int(event_id)]
+    if odds_market:
+        filtros.append("odds_market = %s")
+        params.append(odds_market)
+    if event_timestamp is not None:
+        filtros.append("event_timestamp = %s")
+        params.append(event_timestamp)
+    query = f"""
+    SELECT odds_market, ts, delta
+    FROM odds_history
+    WHERE {" AND ".join(filtros)}
+    ORDER BY odds_market, ts;
+    """
+    por_mercado = {}
+    with get_cursor(conn) as cur:
+        cur.execute(query, params)
+        for row in cur.fetchall():
+            por_mercado.setdefault(row["odds_market"], []).append((row["ts"], row["delta"]))
+    return {mercado: reconstruir(deltas) for mercado, deltas in por_mercado.items()}
+
+
+def events_without_history(conn, days, limit=1000, antes=None):
+    """
+    Eventos com odds nos últimos 'days' dias que ainda não têm histórico gravado,
+    do mais recente para o mais antigo. 'antes' é o (event_timestamp, event_id) do
+    último evento da página anterior: a paginação é por chave composta porque muitos
+    jogos começam no mesmo minuto (eventos cuja API não devolve ticks continuam sem
+    histórico e não voltam).
+    """
+    query = """
+    SELECT e.event_id, e.event_timestamp
+    FROM events e
+    WHERE e.has_odds
+      AND e.event_timestamp >= NOW() - make_interval(days => %s)
+      AND (%s::timestamptz IS NULL OR (e.event_timestamp, e.event_id) < (%s, %s))
+      AND NOT EXISTS (SELECT 1 FROM odds_history h WHERE h.event_id = e.event_id)
+    ORDER BY e.event_timestamp DESC, e.event_id DESC
+    LIMIT %s;
+    """
+    antes_ts, antes_id = antes if antes is not None else (None, None)
+    with get_cursor(conn) as cur:
+        cur.execute(query, (int(days), antes_ts, antes_ts, antes_id, int(limit)))
+        return [(row["event_id"], row["event_timestamp"]) for row in cur.fetchall()]
@@ -0,0 +1,342 @@
+# db/partitions.py
+"""
+Particionamento por faixa de tempo (event_timestamp) das tabelas events e odds.
+
+Com as tabelas particionadas, a retenção de DAYS_TO_KEEP deixa de ser um
+DELETE diário (tuplas mortas, vacuum e locks durante a ingestão) e passa a ser
+DETACH + DROP de partições inteiras, que é praticamente instantâneo.
+
+- odds também é particionada por event_timestamp (do evento), então as
+  partições das duas tabelas cobrem as mesmas faixas e são descartadas juntas.
+- Tabelas particionadas não têm a FK odds -> events (o DROP de partição
+  substitui o ON DELETE CASCADE).
+- Cada tabela tem uma partição DEFAULT como rede de segurança para linhas fora
+  das faixas criadas; ensure_partitions move essas linhas ao criar a faixa.
+- A chave primária passa a ser (event_id, event_timestamp), então o horário do
+  evento é obrigatório e o ON CONFLICT de db.database usa as duas colunas. O
+  Postgres não garante event_id único entre partições: os upserts de db.database
+  movem a linha (com odds e histórico) quando o horário de um jogo muda.
+
+Para migrar um banco existente use scripts/migrate_partitions.py.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from config.settings import PARTITION_INTERVAL, PARTITIONS_AHEAD, DAYS_TO_KEEP
+from db.aggregates import remove_events
+from db.h2h import prune_head_to_head
+from db.live import prune_live
+from db.database import (
+    get_cursor,
+    is_partitioned,
+    reset_partition_cache,
+    delete_old_events,
+    retention_cutoff,
+    EVENTS_UPCOMING_COLUMN,
+)
+
+PARTITIONED_TABLES = ("odds_history", "odds", "events")  # Ordem de descarte: dependentes antes de events
+
+PARTITIONED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id BIGINT NOT NULL,
+    sport_id INTEGER,
+    league_id BIGINT,
+    league_name TEXT,
+    event_timestamp TIMESTAMPTZ,
+    home_team_id BIGINT,
+    home_team_name TEXT,
+    home_player_name TEXT,
+    away_team_id BIGINT,
+    away_team_name TEXT,
+    away_player_name TEXT,
+    final_score TEXT,
+    has_odds BOOLEAN NOT NULL DEFAULT FALSE,
+    last_odds_update TIMESTAMPTZ,
+    inserted_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ,
+    upcoming BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (event_id, event_timestamp)
+) PARTITION BY RANGE (event_timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_events_league_timestamp ON events (league_id, event_timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_event_id ON events (event_id);
+CREATE INDEX IF NOT EXISTS idx_events_pending_score ON events (event_timestamp)
+    WHERE final_score IS NULL OR final_score = '';
+
+CREATE TABLE IF NOT EXISTS odds (
+    id BIGSERIAL,
+    event_id BIGINT NOT NULL,
+    bookmaker TEXT NOT NULL,
+    odds_market TEXT NOT NULL,
+    odds_timestamp TIMESTAMPTZ,
+    odds_data JSONB,
+    collection_timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    event_timestamp TIMESTAMPTZ,
+    PRIMARY KEY (id, event_timestamp),
+    UNIQUE (event_id, bookmaker, odds_market, odds_timestamp, event_timestamp)
+) PARTITION BY RANGE (event_timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_odds_event ON odds (event_id);
+
+CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT;
+CREATE TABLE IF NOT EXISTS odds_default PARTITION OF odds DEFAULT;
+
+-- Histórico de odds com deltas (ver db/odds_history.py)
+CREATE TABLE IF NOT EXISTS odds_history (
+    event_id BIGINT NOT NULL,
+    odds_market TEXT NOT NULL,
+    ts TIMESTAMPTZ NOT NULL,
+    delta JSONB NOT NULL,
+    event_timestamp TIMESTAMPTZ,
+    PRIMARY KEY (event_id, odds_market, ts, event_timestamp)
+) PARTITION BY RANGE (event_timestamp);
+
+CREATE TABLE IF NOT EXISTS odds_history_default PARTITION OF odds_history DEFAULT;
+"""
+
+
+def _inicio_periodo(dia, interval=PARTITION_INTERVAL):
+    """Primeiro dia da partição que contém 'dia' (semanas começam na segunda-feira)."""
+    if interval == "week":
+        return dia - timedelta(days=dia.weekday())
+    return dia
+
+
+def _proximo_periodo(inicio, interval=PARTITION_INTERVAL):
+    return inicio + timedelta(days=7 if interval == "week" else 1)
+
+
+def partition_name(table, inicio):
+    return f"{table}_p{inicio.strftime('%Y%m%d')}"
+
+
+def _limite(dia):
+    """Limite da faixa em UTC (o particionamento é por TIMESTAMPTZ)."""
+    return datetime(dia.year, dia.month, dia.day, tzinfo=timezone.utc)
+
+
+def create_partitioned_schema(conn):
+    """Cria events/odds particionadas (se não existirem) e as partições do período atual em diante."""
+    with get_cursor(conn) as cur:
+        cur.execute(PARTITIONED_SCHEMA)
+    ensure_future_partitions(conn)
+
+
+def _criar_particao(cur, table, inicio, fim):
+    """
+    Cria a partição [inicio, fim) de 'table', movendo antes as linhas dessa faixa
+    que tenham caído na partição DEFAULT (senão o ATTACH falharia).
+    """
+    nome = partition_name(table, inicio)
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL AS existe;", (nome,))
+    if cur.fetchone()["existe"]:
+        return False
+
+    de, ate = _limite(inicio), _limite(fim)
+    cur.execute(f"CREATE TABLE {nome} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);")
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL AS existe;", (f"{table}_default",))
+    if cur.fetchone()["existe"]:
+        cur.execute(
+            f"""
+            WITH movidas AS (
+                DELETE FROM {table}_default
+                WHERE event_timestamp >= %s AND event_timestamp < %s
+                RETURNING *
+            )
+            INSERT INTO {nome} SELECT * FROM movidas;
+            """,
+            (de, ate),
+        )
+    cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {nome} FOR VALUES FROM (%s) TO (%s);", (de, ate))
+    return True
+
+
+def ensure_partitions(conn, start, end, interval=PARTITION_INTERVAL):
+    """
+    Garante partições de events e odds cobrindo os dias [start, end] (datas).
+    Não faz nada se as tabelas não forem particionadas. Não faz commit.
+    Retorna a quantidade de partições criadas.
+    """
+    if isinstance(start, datetime):
+        start = start.date()
+    if isinstance(end, datetime):
+        end = end.date()
+    criadas = 0
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        inicio = _inicio_periodo(start, interval)
+        with get_cursor(conn) as cur:
+            while inicio <= end:
+                fim = _proximo_periodo(inicio, interval)
+                if _criar_particao(cur, table, inicio, fim):
+                    criadas += 1
+                inicio = fim
+    if criadas:
+        print(f"{criadas} partições criadas para {start} a {end} ({interval}).")
+    return criadas
+
+
+def ensure_future_partitions(conn, ahead=PARTITIONS_AHEAD, interval=PARTITION_INTERVAL):
+    """Cria as partições do período atual e das 'ahead' seguintes (ingestão nunca cai na DEFAULT)."""
+    hoje = datetime.now(timezone.utc).date()
+    fim = hoje
+    for _ in range(ahead):
+        fim = _proximo_periodo(_inicio_periodo(fim, interval), interval)
+    return ensure_partitions(conn, hoje, fim, interval)
+
+
+def list_partitions(conn, table):
+    """Lista (nome, inicio, fim) das partições de faixa da tabela, em ordem (sem a DEFAULT)."""
+    query = """
+    SELECT c.relname AS nome,
+           (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \\(''([^'']+)''\\)'))[1]::timestamptz AS inicio,
+           (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \\(''([^'']+)''\\)'))[1]::timestamptz AS fim
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    WHERE p.relname = %s AND pg_table_is_visible(p.oid)
+      AND pg_get_expr(c.relpartbound, c.oid) <> 'DEFAULT'
+    ORDER BY inicio;
+    """
+    with get_cursor(conn) as cur:
+        cur.execute(query, (table,))
+        return [(row["nome"], row["inicio"], row["fim"]) for row in cur.fetchall()]
+
+
+def apply_retention(conn, days_to_keep=DAYS_TO_KEEP):
+    """
+    Aplica a retenção de 'days_to_keep' dias.
+
+    Tabelas particionadas: partições inteiramente anteriores ao corte são
+    desanexadas (DETACH) e descartadas (DROP); a partição que contém o corte é
+    mantida inteira até expirar. Também cria as partições futuras.
+    Tabelas comuns: cai no DELETE de delete_old_events.
+    Em ambos os casos os eventos removidos são antes subtraídos dos agregados.
+    Não faz commit. Retorna a quantidade de partições (ou eventos) removidos.
+    """
+    if not is_partitioned(conn, "events"):
+        if days_to_keep <= 0:
+            return delete_old_events(conn, days_to_keep=days_to_keep)
+        cutoff = retention_cutoff(days_to_keep)
+        remove_events(conn, "events", antes=cutoff)
+        prune_head_to_head(conn, cutoff)
+        prune_live(conn, cutoff)
+        return delete_old_events(conn, days_to_keep=days_to_keep, cutoff_date_utc=cutoff)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
+    print(f"Aplicando retenção por partição: descartando faixas anteriores a {cutoff.strftime('%Y-%m-%d %H:%M %Z')}...")
+
+    removidas = 0
+    with get_cursor(conn) as cur:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(conn, table):
+                continue
+            for nome, _, fim in list_partitions(conn, table):
+                if fim is None or fim > cutoff:
+                    break  # Ordenadas por início: as demais são mais novas
+                if table == "events":
+                    remove_events(conn, nome)
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {nome};")
+                cur.execute(f"DROP TABLE {nome};")
+                removidas += 1
+                print(f" -> Partição {nome} descartada.")
+            # Linhas antigas que tenham caído na DEFAULT saem por DELETE (volume pequeno)
+            if table == "events":
+                remove_events(conn, "events_default", antes=cutoff)
+            cur.execute(f"DELETE FROM {table}_default WHERE event_timestamp < %s;", (cutoff,))
+
+    prune_head_to_head(conn, cutoff)
+    prune_live(conn, cutoff)
+    ensure_future_partitions(conn)
+    print(f" -> {removidas} partições antigas removidas.")
+    return removidas
+
+
+def migrate_to_partitions(conn, interval=PARTITION_INTERVAL):
+    """
+    Converte events/odds (e odds_history, se existir) comuns em particionadas, copiando os dados.
+    As tabelas antigas ficam como *_legacy para conferência.
+    Não faz commit (o chamador decide; tudo roda numa transação).
+    """
+    if is_partitioned(conn, "events"):
+        print("Tabelas já são particionadas; nada a migrar.")
+        return False
+
+    with get_cursor(conn) as cur:
+        cur.execute("SELECT MIN(event_timestamp)::date AS inicio, MAX(event_timestamp)::date AS fim FROM events;")
+        faixa = cur.fetchone()
+        cur.execute("SELECT to_regclass('odds_history') IS NOT NULL AS existe;")
+        com_historico = cur.fetchone()["existe"]
+        cur.execute(EVENTS_UPCOMING_COLUMN)  # Bancos anteriores à coluna
+        if com_historico:
+            cur.execute("ALTER TABLE odds_history RENAME TO odds_history_legacy;")
+        cur.execute("ALTER TABLE odds RENAME TO odds_legacy;")
+        cur.execute("ALTER TABLE events RENAME TO events_legacy;")
+        # Nomes de índices/constraints são globais no schema: renomeia os antigos para liberar os nomes
+        for indice in (
+            "idx_events_timestamp",
+            "idx_events_league_timestamp",
+            "idx_events_event_id",
+            "idx_events_pending_score",
+            "idx_odds_event",
+        ):
+            cur.execute(f"ALTER INDEX IF EXISTS {indice} RENAME TO {indice}_legacy;")
+        cur.execute(PARTITIONED_SCHEMA)
+
+    reset_partition_cache()
+    inicio = faixa["inicio"] or date.today()
+    fim = max(faixa["fim"] or date.today(), date.today())
+    ensure_partitions(conn, inicio, fim, interval)
+    ensure_future_partitions(conn, interval=interval)
+
+    with get_cursor(conn) as cur:
+        cur.execute(
+            """
+            INSERT INTO events (
+                event_id, sport_id, league_id, league_name, event_timestamp,
+                home_team_id, home_team_name, home_player_name,
+                away_team_id, away_team_name, away_player_name,
+                final_score, has_odds, last_odds_update, inserted_at, updated_at, upcoming
+            )
+            SELECT event_id, sport_id, league_id, league_name, event_timestamp,
+                   home_team_id, home_team_name, home_player_name,
+                   away_team_id, away_team_name, away_player_name,
+                   final_score, COALESCE(has_odds, FALSE), last_odds_update, COALESCE(inserted_at, NOW()), updated_at,
+                   upcoming
+            FROM events_legacy
+            WHERE event_timestamp IS NOT NULL;  -- Chave de partição obrigatória
+            """
+        )
+        eventos = cur.rowcount
+        cur.execute(
+            """
+            INSERT INTO odds (
+                event_id, bookmaker, odds_market, odds_timestamp, odds_data, collection_timestamp, event_timestamp
+            )
+            SELECT o.event_id, o.bookmaker, o.odds_market, o.odds_timestamp, o.odds_data,
+                   COALESCE(o.collection_timestamp, NOW()), e.event_timestamp
+            FROM odds_legacy o
+            JOIN events_legacy e ON e.event_id = o.event_id
+            WHERE e.event_timestamp IS NOT NULL
+            ON CONFLICT DO NOTHING;
+            """
+        )
+        odds = cur.rowcount
+        historico = 0
+        if com_historico:
+            cur.execute(
+                """
+                INSERT INTO odds_history (event_id, odds_market, ts, delta, event_timestamp)
+                SELECT event_id, odds_market, ts, delta, event_timestamp
+                FROM odds_history_legacy
+                WHERE event_timestamp IS NOT NULL
+                ON CONFLICT DO NOTHING;
+                """
+            )
+            historico = cur.rowcount
+    print(
+        f"Migração: {eventos} eventos, {odds} odds e {historico} ticks de histórico "
+        "copiados para as tabelas particionadas."
+    )
+    return True
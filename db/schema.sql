@@ -0,0 +1,176 @@
+-- db/schema.sql
+-- Tabelas usadas pelo coletor. Idempotente: pode ser executado mais de uma vez.
+
+-- Jogos encerrados de eSoccer
+CREATE TABLE IF NOT EXISTS events (
+    event_id BIGINT PRIMARY KEY,
+    sport_id INTEGER,
+    league_id BIGINT,
+    league_name TEXT,
+    event_timestamp TIMESTAMPTZ,
+    home_team_id BIGINT,
+    home_team_name TEXT,
+    home_player_name TEXT,
+    away_team_id BIGINT,
+    away_team_name TEXT,
+    away_player_name TEXT,
+    final_score TEXT,
+    has_odds BOOLEAN NOT NULL DEFAULT FALSE,
+    last_odds_update TIMESTAMPTZ,
+    inserted_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ,
+    upcoming BOOLEAN NOT NULL DEFAULT FALSE  -- Agendado ainda não iniciado (collector/upcoming.py)
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (event_timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_league_timestamp ON events (league_id, event_timestamp);
+-- Busca de placares pendentes (update-scores)
+CREATE INDEX IF NOT EXISTS idx_events_pending_score ON events (event_timestamp)
+    WHERE final_score IS NULL OR final_score = '';
+
+-- Odds pré-jogo da Bet365 (um registro por mercado)
+CREATE TABLE IF NOT EXISTS odds (
+    id BIGSERIAL PRIMARY KEY,
+    event_id BIGINT NOT NULL REFERENCES events (event_id) ON DELETE CASCADE,
+    bookmaker TEXT NOT NULL,
+    odds_market TEXT NOT NULL,
+    odds_timestamp TIMESTAMPTZ,
+    odds_data JSONB,
+    collection_timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (event_id, bookmaker, odds_market, odds_timestamp)
+);
+
+CREATE INDEX IF NOT EXISTS idx_odds_event ON odds (event_id);
+
+-- Histórico completo de odds com deltas entre ticks (ver db/odds_history.py)
+CREATE TABLE IF NOT EXISTS odds_history (
+    event_id BIGINT NOT NULL REFERENCES events (event_id) ON DELETE CASCADE,
+    odds_market TEXT NOT NULL,
+    ts TIMESTAMPTZ NOT NULL,
+    delta JSONB NOT NULL,
+    event_timestamp TIMESTAMPTZ,
+    PRIMARY KEY (event_id, odds_market, ts)
+);
+
+-- Agregados mantidos na gravação (ver db/aggregates.py; recalcular com --mode rebuild-aggregates)
+CREATE TABLE IF NOT EXISTS player_stats (
+    player_name TEXT NOT NULL,
+    league_id BIGINT NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    scored_games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    goals_for INTEGER NOT NULL DEFAULT 0,
+    goals_against INTEGER NOT NULL DEFAULT 0,
+    last_game_at TIMESTAMPTZ,
+    PRIMARY KEY (player_name, league_id)
+);
+
+CREATE TABLE IF NOT EXISTS team_stats (
+    team_name TEXT NOT NULL,
+    league_id BIGINT NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    scored_games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    goals_for INTEGER NOT NULL DEFAULT 0,
+    goals_against INTEGER NOT NULL DEFAULT 0,
+    last_game_at TIMESTAMPTZ,
+    PRIMARY KEY (team_name, league_id)
+);
+
+CREATE TABLE IF NOT EXISTS league_daily_stats (
+    league_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    league_name TEXT,
+    games INTEGER NOT NULL DEFAULT 0,
+    scored_games INTEGER NOT NULL DEFAULT 0,
+    with_odds INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (league_id, day)
+);
+
+-- Confronto direto entre jogadores e forma recente (ver db/h2h.py)
+CREATE TABLE IF NOT EXISTS player_h2h (
+    player_a TEXT COLLATE "C" NOT NULL,
+    player_b TEXT COLLATE "C" NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    a_wins INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    b_wins INTEGER NOT NULL DEFAULT 0,
+    a_goals INTEGER NOT NULL DEFAULT 0,
+    b_goals INTEGER NOT NULL DEFAULT 0,
+    recent JSONB NOT NULL DEFAULT '[]',
+    last_game_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (player_a, player_b)
+);
+
+CREATE TABLE IF NOT EXISTS player_form (
+    player_name TEXT NOT NULL PRIMARY KEY,
+    form_5 TEXT NOT NULL DEFAULT '',
+    form_10 TEXT NOT NULL DEFAULT '',
+    form_20 TEXT NOT NULL DEFAULT '',
+    points_5 INTEGER NOT NULL DEFAULT 0,
+    points_10 INTEGER NOT NULL DEFAULT 0,
+    points_20 INTEGER NOT NULL DEFAULT 0,
+    recent JSONB NOT NULL DEFAULT '[]',
+    last_game_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Jogos ao vivo (python main.py --mode live): estado atual e o diff de cada alteração
+CREATE TABLE IF NOT EXISTS live_events (
+    event_id BIGINT PRIMARY KEY,
+    league_id BIGINT,
+    time_status TEXT,
+    score TEXT,
+    minute INTEGER,
+    state JSONB NOT NULL,
+    payload_hash TEXT NOT NULL,
+    first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ended_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_live_events_open ON live_events (league_id) WHERE ended_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS live_event_changes (
+    event_id BIGINT NOT NULL,
+    ts TIMESTAMPTZ NOT NULL,
+    diff JSONB NOT NULL,
+    PRIMARY KEY (event_id, ts)
+);
+
+-- Uso da cota da API por hora, modo e endpoint (api/quota.py, db/api_usage.py)
+CREATE TABLE IF NOT EXISTS api_usage (
+    hour_start TIMESTAMPTZ NOT NULL,
+    mode TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    rate_limited INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (hour_start, mode, endpoint)
+);
+
+-- Estado das coletas ('ended_events', 'new_games:<league_id>', ...)
+CREATE TABLE IF NOT EXISTS fetch_state (
+    fetch_type TEXT PRIMARY KEY,
+    last_processed_page INTEGER NOT NULL DEFAULT 0,
+    last_processed_timestamp TIMESTAMPTZ,
+    status TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Progresso do backfill por página (ver collector/checkpoints.py)
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    day TEXT NOT NULL,
+    league_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    total_pages INTEGER,
+    task_total INTEGER,
+    games INTEGER NOT NULL DEFAULT 0,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (day, league_id, page)
+);
@@ -2,30 +2,86 @@
 import time
 import signal
 import sys
-import json  # Para salvar odds como JSONB
 from datetime import datetime, timedelta, timezone
 import pytz
 import argparse  # Para argumentos de linha de comando
-import concurrent.futures  # Para processamento paralelo
+import threading
 import traceback
-
-from config.settings import TARGET_SPORT_ID, TIMEZONE, REQUEST_DELAY_SECONDS, ESOCCER_LEAGUE_IDS, ESOCCER_LEAGUE_NAMES
+import concurrent.futures
+
+from config.settings import (
+    TARGET_SPORT_ID,
+    TIMEZONE,
+    ESOCCER_LEAGUE_IDS,
+    PIPELINE_PAGE_WORKERS,
+    PIPELINE_ODDS_WORKERS,
+    PIPELINE_DB_WRITERS,
+    INCREMENTAL_MAX_PAGES,
+    INCREMENTAL_OVERLAP_SECONDS,
+    INCREMENTAL_RETRY_HOURS,
+    DAEMON_FETCH_INTERVAL_SECONDS,
+    DAEMON_SCORES_INTERVAL_SECONDS,
+    DAEMON_RETENTION_INTERVAL_SECONDS,
+    DAYS_TO_KEEP,
+    METRICS_PORT,
+    METRICS_HOST,
+    ODDS_HISTORY_ENABLED,
+    LIVE_INTERVAL_SECONDS,
+    UPCOMING_REFRESH_SECONDS,
+    AGGREGATES_ENABLED,
+    API_REQUESTS_PER_SECOND,
+    QUOTA_RESERVE_CALLS,
+)
 from api.client import BetsAPIClient
+from api.cache import print_cache_stats
+from api.quota import quota
+from collector.backfill_planner import (
+    estimar_por_historico,
+    sondar_primeiras_paginas,
+    planejar_unidades,
+    orcamento_de_chamadas,
+    tamanho_pela_pagina,
+    WorkUnit,
+)
+from collector.checkpoints import CheckpointWriter, ensure_checkpoint_table, load_checkpoints
+from collector.live import LivePoller
+from collector.upcoming import UpcomingScheduler
+from collector.pipeline import IngestionPipeline
 from db.database import (
     get_db_connection,
-    create_db_connection,  # Nova função para conexão direta
-    delete_old_events,  # Removido get/update_fetch_state por enquanto
-    upsert_event,
-    insert_odds,
-    update_event_odds_status,
+    create_db_connection,  # Empresta uma conexão do pool
+    release_db_connection,
+    close_db_pool,
+    upsert_events_bulk,
+    insert_odds_bulk,
+    get_events_with_odds,
     update_pending_event_scores,
     update_fetch_state,
     get_fetch_state,
+    ensure_event_columns,
+)
+from db.api_usage import ApiUsageWriter, get_api_usage
+from db.aggregates import apply_event_batch, ensure_aggregate_tables, rebuild_aggregates
+from db.h2h import ensure_h2h_tables, rebuild_head_to_head, update_head_to_head
+from db.live import ensure_live_tables
+from db.partitions import apply_retention, ensure_partitions
+from db.models import Event, parse_odds_summary
+from db.odds_history import (
+    ensure_odds_history_table,
+    parse_event_odds,
+    insert_odds_history_bulk,
+    events_without_history,
 )
-from utils.helpers import extrair_time_jogador, inverter_handicap, converter_timestamp, parse_score
+from utils.helpers import inverter_handicap, converter_timestamp
+from utils.scheduler import PeriodicScheduler
+from utils.classifier import classifier, POR_ID
+from utils.metrics import start_metrics_server, print_metrics_summary
+from utils.profiling import section, iniciar_profiling, finalizar_profiling
 
 # Variável global para controlar o loop principal e permitir interrupção graciosa
 running = True
+# Busca também o histórico completo de odds de cada jogo novo (--odds-history)
+buscar_historico_odds = ODDS_HISTORY_ENABLED
 
 
 def signal_handler(sig, frame):
@@ -34,6 +90,7 @@ def signal_handler(sig, frame):
     if running:  # Evita múltiplas mensagens se pressionar Ctrl+C várias vezes
         print("\nRecebido sinal de interrupção. Tentando finalizar graciosamente...")
         running = False
+        quota.release()  # Jobs esperando a virada da cota não seguram o encerramento
     else:
         print("Finalização forçada.")
         sys.exit(1)
@@ -46,8 +103,7 @@ signal.signal(signal.SIGTERM, signal_handler)
 
 def deve_processar_liga(league_id):
     """Verifica se a liga é de eSoccer com base no ID."""
-    # Verifica se o ID da liga está na lista de IDs de eSoccer
-    return league_id in ESOCCER_LEAGUE_IDS
+    return classifier.is_known_league(league_id)
 
 
 def is_esoccer_game(league_name, home_team, away_team):
@@ -55,354 +111,164 @@ def is_esoccer_game(league_name, home_team, away_team):
     Verifica se um jogo é especificamente de eSoccer e não outro tipo de eSport.
     Analisa o nome da liga e o formato dos times para identificar jogos de eSoccer.
     """
-    # Lista de palavras-chave que indicam eSoccer
-    esoccer_keywords = ["esoccer", "soccer", "fifa", "pes", "pro evolution", "efootball"]
-
-    # Lista de palavras-chave que indicam outros eSports (não eSoccer)
-    other_esports_keywords = [
-        "cs:",
-        "cs go",
-        "counter-strike",
-        "dota",
-        "league of legends",
-        "lol",
-        "valorant",
-        "overwatch",
-        "starcraft",
-        "hearthstone",
-        "rocket league",
-    ]
-
-    # Verificar palavras-chave de eSoccer no nome da liga
-    if league_name:
-        league_name_lower = league_name.lower()
-        # Se encontrar alguma palavra-chave de eSoccer
-        if any(keyword in league_name_lower for keyword in esoccer_keywords):
-            return True
-        # Se encontrar palavras-chave de outros eSports, não é eSoccer
-        if any(keyword in league_name_lower for keyword in other_esports_keywords):
-            return False
-
-    # Verificar o padrão típico de jogos de eSoccer: "Time (Jogador)"
-    team_pattern_found = False
-    if home_team and "(" in home_team and ")" in home_team:
-        team_pattern_found = True
-    if away_team and "(" in away_team and ")" in away_team:
-        team_pattern_found = True
-
-    return team_pattern_found
-
-
-def processar_odds(odds_summary_data, event_id):
-    """Processa os dados de odds e retorna uma lista de dicts para inserção."""
-    odds_para_inserir = []
-    if not odds_summary_data or odds_summary_data.get("success") != 1:
-        # print(f"    -> Sem dados de odds válidos para Event ID: {event_id}") # Log menos verboso
-        return odds_para_inserir, None  # Retorna lista vazia e None timestamp
-
-    results = odds_summary_data.get("results", {})
-    # Focar nas odds da Bet365 por enquanto
-    bet365_data = results.get("Bet365", {})
-    odds_start = bet365_data.get("odds", {}).get("start", {})  # Odds pré-jogo
-
-    if not odds_start:
-        # print(f"    -> Sem odds 'start' (pré-jogo) da Bet365 para Event ID: {event_id}") # Log menos verboso
-        return odds_para_inserir, None
-
-    # Timestamp das odds (se disponível, senão usaremos o da coleta)
-    # A API V2 pode não fornecer timestamp para 'start' odds facilmente, usar None por agora
-    # --- Correção: Buscar timestamp dentro de cada mercado ---
-    # odds_ts = None # converter_timestamp(odds_start.get('time_str')) se disponível
-
-    # 1. Mercado 1X2 (ID: 1_1)
-    if "1_1" in odds_start:
-        market_1x2 = odds_start["1_1"]
-        add_time_ts = converter_timestamp(market_1x2.get("add_time"))
-        odds_data = {
-            "home": market_1x2.get("home_od"),
-            "draw": market_1x2.get("draw_od"),
-            "away": market_1x2.get("away_od"),
-            "ss": market_1x2.get("ss"),  # Placar no momento da odd (para live)
-            # 'add_time': add_time_ts # Adicionado como timestamp principal
-        }
-        # Remove chaves com valor None antes de salvar
-        odds_data_clean = {k: v for k, v in odds_data.items() if v is not None}
-        if odds_data_clean:  # Só adiciona se tiver alguma odd válida
-            odds_para_inserir.append(
-                {
-                    "event_id": event_id,
-                    "bookmaker": "Bet365",
-                    "odds_market": "prematch_1x2",
-                    "odds_timestamp": add_time_ts,  # Usar o add_time do mercado se disponível
-                    "odds_data": json.dumps(odds_data_clean),  # Salva como JSON string
-                }
-            )
-
-    # 2. Mercado Handicap Asiático (ID: 1_2)
-    if "1_2" in odds_start:
-        market_ah = odds_start["1_2"]
-        add_time_ts = converter_timestamp(market_ah.get("add_time"))
-        handicap_val = market_ah.get("handicap")
-        odds_data = {
-            "handicap": handicap_val,
-            "home": market_ah.get("home_od"),
-            "away": market_ah.get("away_od"),
-            "ss": market_ah.get("ss"),
-            # 'add_time': add_time_ts
-        }
-        odds_data_clean = {k: v for k, v in odds_data.items() if v is not None}
-        if odds_data_clean and "home" in odds_data_clean and "away" in odds_data_clean:
-            odds_para_inserir.append(
-                {
-                    "event_id": event_id,
-                    "bookmaker": "Bet365",
-                    "odds_market": "prematch_asian_handicap",
-                    "odds_timestamp": add_time_ts,
-                    "odds_data": json.dumps(odds_data_clean),
-                }
-            )
-
-    # 3. Mercado Over/Under (Gols) (ID: 1_3)
-    if "1_3" in odds_start:
-        market_ou = odds_start["1_3"]
-        add_time_ts = converter_timestamp(market_ou.get("add_time"))
-        line_val = market_ou.get("handicap")  # Linha Over/Under
-        odds_data = {
-            "line": line_val,
-            "over": market_ou.get("over_od"),
-            "under": market_ou.get("under_od"),
-            "ss": market_ou.get("ss"),
-            # 'add_time': add_time_ts
-        }
-        odds_data_clean = {k: v for k, v in odds_data.items() if v is not None}
-        if odds_data_clean and "over" in odds_data_clean and "under" in odds_data_clean:
-            odds_para_inserir.append(
-                {
-                    "event_id": event_id,
-                    "bookmaker": "Bet365",
-                    "odds_market": "prematch_over_under",
-                    "odds_timestamp": add_time_ts,
-                    "odds_data": json.dumps(odds_data_clean),
-                }
-            )
-
-    # Extrai o 'last_update' timestamp das odds da Bet365 se disponível
-    bet365_last_update_ts = bet365_data.get("last_update")
-    last_odds_update_time = converter_timestamp(bet365_last_update_ts)
-
-    return odds_para_inserir, last_odds_update_time
+    return classifier.is_esoccer(None, league_name, home_team, away_team)
 
 
-def processar_jogo(conn, api_client, jogo_data):
-    """Processa os dados de um único jogo e suas odds."""
-    global running
-    if not running:
-        return False  # Sai se a flag de parada foi acionada
-
+def preparar_jogo(api_client, jogo_data, buscar_odds=True, motivo=None):
+    """
+    Monta o evento e as odds de um único jogo, sem tocar no banco.
+    Retorna (Event, [OddsSnapshot], [OddsTick]) ou None se o jogo não for de eSoccer.
+    Com buscar_odds=False (evento já tem odds no DB) a chamada de odds é pulada.
+    O histórico de odds ([OddsTick]) só é buscado com buscar_historico_odds ligado.
+    'motivo' é a classificação já feita pela página (evita classificar de novo).
+    Exceções de parsing sobem para o chamador contabilizar como falha.
+    """
     event_id = jogo_data.get("id")
     if not event_id:
         print("Aviso: Jogo sem ID encontrado, pulando.")
-        return True  # Continua processando outros jogos
-
-    # Verificar se o jogo é de eSoccer
-    league_data = jogo_data.get("league", {})
-    league_id = league_data.get("id")
-    league_name = league_data.get("name", "")
-
-    # Extrair dados dos times para verificação
-    home_data = jogo_data.get("home", {})
-    away_data = jogo_data.get("away", {})
-    home_team_name = home_data.get("name", "")
-    away_team_name = away_data.get("name", "")
-
-    # Aplicar duas verificações:
-    # 1. Verificar se a liga está na lista de ligas de eSoccer conhecidas
-    # 2. Verificar se o formato do jogo parece ser eSoccer (e não outro eSport)
-    is_known_league = league_id and deve_processar_liga(league_id)
-    is_esoccer = is_esoccer_game(league_name, home_team_name, away_team_name)
+        return None
 
     # Só processa se for eSoccer (por ID da liga OU pelas características)
-    if not (is_known_league or is_esoccer):
+    if motivo is None:
+        motivo = classifier.classify(jogo_data)
+    if motivo is None:
         # Pulamos silenciosamente jogos que não são de eSoccer
-        return True  # Continua processando outros jogos
+        return None
 
-    print(
-        f"  -> Processando Event ID: {event_id} (eSoccer - {'ID conhecida' if is_known_league else 'formato reconhecido'})"
+    print(f"  -> Processando Event ID: {event_id} (eSoccer - {'ID conhecida' if motivo == POR_ID else 'formato reconhecido'})")
+
+    evento = Event.from_api(jogo_data)
+
+    # Busca as odds antes de gravar para que has_odds vá no mesmo INSERT do evento
+    odds_list = []
+    # Jogo já encerrado: o resumo de odds pode ser cacheado em disco (por quanto tempo depende da idade)
+    odds_summary = (
+        api_client.get_event_odds_summary(event_id, final=True, event_timestamp=evento.event_timestamp)
+        if buscar_odds
+        else None
     )
+    if odds_summary:
+        with section("processar_odds"):
+            odds_list, last_update_time = parse_odds_summary(odds_summary, evento.event_id, evento.event_timestamp)
+        if odds_list:
+            evento.has_odds = True
+            # Usa now() se last_update_time não veio da API
+            evento.last_odds_update = last_update_time if last_update_time else datetime.now(pytz.utc)
 
-    # Extrair dados básicos
-    home_player = None
-    away_player = None
-
-    home_team_name, home_player = extrair_time_jogador(home_team_name)
-    away_team_name, away_player = extrair_time_jogador(away_team_name)
-    event_time = converter_timestamp(jogo_data.get("time"))
-    score = parse_score(jogo_data.get("ss"))
-
-    # Monta dict do evento para o DB
-    event_dict = {
-        "event_id": event_id,  # Será convertido para int em upsert_event
-        "sport_id": jogo_data.get("sport_id", TARGET_SPORT_ID),
-        "league_id": league_id,
-        "league_name": league_name,
-        "event_timestamp": event_time,
-        "home_team_id": home_data.get("id"),
-        "home_team_name": home_team_name,
-        "home_player_name": home_player,
-        "away_team_id": away_data.get("id"),
-        "away_team_name": away_team_name,
-        "away_player_name": away_player,
-        "final_score": score,
-        "has_odds": None,  # Não definir aqui, deixar o DB manter o valor ou atualizar após buscar odds
-        "last_odds_update": None,
-    }
+    historico = []
+    if buscar_odds and buscar_historico_odds:
+        event_odds = api_client.get_event_odds(event_id, final=True, event_timestamp=evento.event_timestamp)
+        historico = parse_event_odds(event_odds, evento.event_id, evento.event_timestamp)
 
-    try:
-        # Verificar se o objeto de conexão é válido
-        if not hasattr(conn, "cursor"):
-            raise ValueError(
-                f"Objeto de conexão inválido para evento {event_id}. Conexão deve ser uma conexão PostgreSQL direta."
-            )
+    return evento, odds_list, historico
 
-        # 1. Inserir/Atualizar evento no DB
-        upsert_event(conn, event_dict)
-        # print(f"     Evento {event_id} salvo/atualizado.") # Log menos verboso
-
-        # 2. Buscar e processar Odds
-        odds_summary = api_client.get_event_odds_summary(event_id)
-        if odds_summary:
-            odds_list, last_update_time = processar_odds(odds_summary, event_id)
-
-            if odds_list:
-                inserted_count = insert_odds(conn, odds_list)
-                # print(f"     {inserted_count} odds inseridas.") # Log menos verboso
-                # Atualiza o status do evento para indicar que tem odds
-                if inserted_count > 0:
-                    # Usa now() se last_update_time não veio da API
-                    update_time = last_update_time if last_update_time else datetime.now(pytz.utc)
-                    update_event_odds_status(conn, event_id, True, update_time)
-            # else:
-            # print(f"     Nenhuma odd válida processada.") # Log menos verboso
-        # else:
-        # print(f"     Falha ao buscar odds.") # Log menos verboso
-
-        conn.commit()  # Commit após processar este evento com sucesso
-        return True  # Indica sucesso
 
+def gravar_lote(conn, eventos, odds_list, historico=()):
+    """
+    Grava eventos, odds, histórico de odds e agregados com INSERTs multi-linha e um único commit.
+    Se o lote falhar, refaz evento a evento para isolar o registro problemático.
+    Retorna o conjunto de event_ids (str) que não puderam ser gravados.
+    """
+    if not eventos:
+        return set()
+
+    try:
+        apply_event_batch(conn, eventos)  # Agregados a partir do estado anterior (antes do upsert)
+        upsert_events_bulk(conn, eventos)  # Eventos primeiro por causa da FK das odds
+        insert_odds_bulk(conn, odds_list)
+        insert_odds_history_bulk(conn, historico)
+        update_head_to_head(conn, [evento.event_id for evento in eventos])  # Depois das odds (entram no confronto)
+        conn.commit()
+        return set()
     except Exception as e:
-        print(f"Erro ao processar evento {event_id} ou suas odds: {e}")
+        print(f"Erro na gravação em lote de {len(eventos)} eventos: {e}. Tentando evento a evento...")
+        conn.rollback()
+
+    odds_por_evento = {}
+    for odds_item in odds_list:
+        odds_por_evento.setdefault(odds_item.event_id, []).append(odds_item)
+    historico_por_evento = {}
+    for tick in historico:
+        historico_por_evento.setdefault(tick.event_id, []).append(tick)
+
+    falhados = set()
+    for evento in eventos:
+        event_id = evento.event_id
         try:
-            # Verifica se a conexão tem o método rollback antes de chamar
-            if hasattr(conn, "rollback"):
+            apply_event_batch(conn, [evento])
+            upsert_events_bulk(conn, [evento])
+            insert_odds_bulk(conn, odds_por_evento.get(event_id, []))
+            insert_odds_history_bulk(conn, historico_por_evento.get(event_id, []))
+            update_head_to_head(conn, [event_id])
+            conn.commit()
+        except Exception as e:
+            print(f"Erro ao processar evento {event_id} ou suas odds: {e}")
+            try:
                 conn.rollback()  # Desfaz alterações deste evento
-            else:
-                print(
-                    f"AVISO: Não foi possível fazer rollback para o evento {event_id}, objeto conn não possui método rollback"
-                )
-        except Exception as rollback_error:
-            print(f"ERRO ao tentar fazer rollback para evento {event_id}: {rollback_error}")
-
-        # Considerar parar ou continuar? Para um job diário, talvez seja melhor
-        # registrar o erro e continuar com os outros jogos/dias.
-        # Se for um erro crítico (ex: DB inacessível), a exceção vai subir.
-        return False  # Indica falha no processamento deste jogo
-
+            except Exception as rollback_error:
+                print(f"ERRO ao tentar fazer rollback para evento {event_id}: {rollback_error}")
+            falhados.add(str(event_id))
+    return falhados
 
-def fetch_and_process_day(conn, api_client, target_date):
-    """Busca e processa todos os eventos encerrados para um dia específico."""
-    global running
-    day_str = target_date.strftime("%Y%m%d")
-    print(f"\nIniciando busca para o dia: {day_str}")
 
-    current_page = 1
-    total_jogos_dia = 0
-    total_esoccer_dia = 0  # Contador para jogos de eSoccer
-    falhas_dia = 0
+def salvar_lote(conn, eventos, odds_list, historico=()):
+    """Grava os eventos e odds de uma página num único commit. Retorna (gravados, falhas)."""
+    falhados = gravar_lote(conn, eventos, odds_list, historico)
+    return len(eventos) - len(falhados), len(falhados)
 
-    while running:
-        # Busca eventos de eSports (sport_id=3)
-        event_data = api_client.get_ended_events(page=current_page, sport_id=TARGET_SPORT_ID, day_str=day_str)
 
-        if not running:
-            break  # Verifica após a chamada de API também
-
-        if not event_data:
-            print(f"Erro crítico ao buscar dados para {day_str}, página {current_page}. Abortando dia.")
-            # Poderia implementar retry aqui antes de desistir
-            break
-
-        jogos = event_data.get("results", [])
-        pager = event_data.get("pager")
-
-        if not jogos:
-            if current_page == 1:
-                print(f"Nenhum jogo encontrado para o dia {day_str}.")
-            else:
-                print(f"Fim dos jogos para o dia {day_str} na página {current_page-1}.")
-            break  # Sai do loop de páginas para este dia
-
-        # Contagem de possíveis jogos de eSoccer na página atual
-        esoccer_por_id = sum(1 for jogo in jogos if jogo.get("league", {}).get("id") in ESOCCER_LEAGUE_IDS)
-
-        # Contagem de possíveis jogos de eSoccer pelo formato do nome
-        esoccer_por_formato = sum(
-            1
-            for jogo in jogos
-            if is_esoccer_game(
-                jogo.get("league", {}).get("name", ""),
-                jogo.get("home", {}).get("name", ""),
-                jogo.get("away", {}).get("name", ""),
-            )
-        )
+def ids_com_odds(conn, jogos):
+    """Consulta de uma vez quais jogos da página já têm odds no banco."""
+    event_ids = [jogo["id"] for jogo in jogos if str(jogo.get("id") or "").isdigit()]
+    return get_events_with_odds(conn, event_ids)
 
-        print(
-            f"Processando {len(jogos)} eventos eSports da página {current_page} para {day_str} "
-            f"(identificados: {esoccer_por_id} por ID da liga, {esoccer_por_formato} por formato)..."
-        )
 
-        processados = 0
-        falhas = 0
+def processar_jogo(conn, api_client, jogo_data):
+    """Processa os dados de um único jogo e suas odds."""
+    global running
+    if not running:
+        return False  # Sai se a flag de parada foi acionada
 
-        for jogo in jogos:
-            if not running:
-                break  # Verifica antes de cada jogo
+    try:
+        preparado = preparar_jogo(api_client, jogo_data)
+    except Exception as e:
+        print(f"Erro ao processar evento {jogo_data.get('id')} ou suas odds: {e}")
+        return False
+    if not preparado:
+        return True  # Jogo ignorado (não é eSoccer); continua processando outros jogos
 
-            result = processar_jogo(conn, api_client, jogo)
-            # A função processar_jogo já filtra e processa apenas jogos de eSoccer
-            # Se não for eSoccer, ela retorna True sem fazer nada
+    evento, odds_list, historico = preparado
+    _, falhas = salvar_lote(conn, [evento], odds_list, historico)
+    return falhas == 0
 
-            # Verificar se este jogo é de eSoccer (por ID ou formato)
-            league_id = jogo.get("league", {}).get("id")
-            is_known_league = league_id and league_id in ESOCCER_LEAGUE_IDS
 
-            is_esoccer_format = is_esoccer_game(
-                jogo.get("league", {}).get("name", ""),
-                jogo.get("home", {}).get("name", ""),
-                jogo.get("away", {}).get("name", ""),
-            )
+def fetch_and_process_day(target_date):
+    """
+    Busca e processa todos os eventos encerrados para um dia específico.
+    As páginas do dia passam pelo IngestionPipeline: odds e gravação de um jogo
+    se sobrepõem às dos outros em vez de se somarem jogo a jogo.
+    """
+    day_str = target_date.strftime("%Y%m%d")
+    print(f"\nIniciando busca para o dia: {day_str}")
 
-            if is_known_league or is_esoccer_format:
-                if result:
-                    processados += 1
-                else:
-                    falhas += 1
+    resumo = {"total": 0, "gravados": 0, "falhas": 0}
+    resumo_lock = threading.Lock()
 
-        total_jogos_dia += len(jogos)
-        total_esoccer_dia += processados
-        falhas_dia += falhas
+    def pagina_concluida(unit, page, total_pages, total, gravados, falhas):
+        with resumo_lock:
+            resumo["total"] = max(resumo["total"], total or 0)
+            resumo["gravados"] += gravados
+            resumo["falhas"] += falhas
 
-        # Verificar se há mais páginas
-        if pager and "page" in pager and "total_pages" in pager:
-            current_page = int(pager["page"]) + 1
-            if current_page > int(pager["total_pages"]):
-                print(f"Fim das páginas para o dia {day_str}.")
-                break
-        else:
-            print(f"Aviso: Informações de paginação ausentes ou inválidas. Abortando após primeira página.")
-            break
+    # Sem plano de páginas (total_pages=None): a unidade segue o pager até a última página
+    pipeline = criar_pipeline(on_unit_done=pagina_concluida)
+    stats = pipeline.run([WorkUnit(day_str, None, 1, None, 0, None)])
+    if stats["pages_failed"]:
+        print(f"Erro crítico ao buscar dados para {day_str}. Dia incompleto.")
 
-        # Pausa para evitar problemas de rate limit
-        time.sleep(REQUEST_DELAY_SECONDS)
+    total_jogos_dia = resumo["total"]
+    total_esoccer_dia = resumo["gravados"] + resumo["falhas"]  # Jogos de eSoccer vistos (sucesso + falha)
+    falhas_dia = resumo["falhas"]
 
     # Resumo do dia
     print(f"\nResumo para {day_str}:")
@@ -416,15 +282,119 @@ def fetch_and_process_day(conn, api_client, target_date):
     return total_esoccer_dia - falhas_dia  # Retorna apenas jogos de eSoccer processados com sucesso
 
 
-def run_daily_update(conn, api_client):
+def fetch_new_games(conn):
+    """
+    Busca incremental de jogos encerrados de todas as ligas de eSoccer.
+
+    Cada liga é uma unidade do IngestionPipeline que percorre as páginas mais
+    recentes (sem filtro de dia) e para ao alcançar a marca d'água salva em
+    fetch_state ('new_games:<league_id>'), revisitando INCREMENTAL_OVERLAP_SECONDS
+    antes dela para cobrir jogos que terminaram fora de ordem. Jogos que já têm
+    odds no banco não geram nova chamada de odds. 'conn' só lê e grava as marcas;
+    o pipeline empresta conexões do pool. Retorna a quantidade de jogos gravados.
+
+    Um jogo que falha segura a marca logo antes do seu horário, para ser tentado
+    de novo na próxima execução, por até INCREMENTAL_RETRY_HOURS; depois disso a
+    marca passa por ele (um jogo que sempre falha não congela a liga).
+    """
+    ligas = {}
+    for league_id in ESOCCER_LEAGUE_IDS:
+        state = get_fetch_state(conn, f"new_games:{league_id}")
+        watermark = state["last_processed_timestamp"] if state else None
+        ligas[str(league_id)] = {
+            "watermark": watermark,
+            "limite": watermark - timedelta(seconds=INCREMENTAL_OVERLAP_SECONDS) if watermark else None,
+            "mais_recente": watermark,
+            "paginas": 0,
+            "gravados": 0,
+            "falhas": 0,
+            "falhas_jogos": [],  # event_time (ou None) de cada jogo que não pôde ser gravado
+        }
+    conn.commit()
+    ligas_lock = threading.Lock()
+
+    def alcancou_marca(limite, event_time):
+        return bool(limite and event_time and event_time < limite)  # Daqui para trás tudo já foi ingerido
+
+    def filtrar_jogos(unit, jogos):
+        liga = ligas[str(unit.league_id)]
+        novos = []
+        for jogo in jogos:
+            event_time = converter_timestamp(jogo.get("time"))
+            if alcancou_marca(liga["limite"], event_time):
+                continue
+            novos.append(jogo)
+            if event_time:
+                with ligas_lock:
+                    if liga["mais_recente"] is None or event_time > liga["mais_recente"]:
+                        liga["mais_recente"] = event_time
+        return novos
+
+    def parar_na_pagina(unit, page, jogos):
+        limite = ligas[str(unit.league_id)]["limite"]
+        return page >= INCREMENTAL_MAX_PAGES or any(
+            alcancou_marca(limite, converter_timestamp(jogo.get("time"))) for jogo in jogos
+        )
+
+    def pagina_concluida(unit, page, total_pages, total, gravados, falhas):
+        with ligas_lock:
+            liga = ligas[str(unit.league_id)]
+            liga["paginas"] = max(liga["paginas"], page)
+            liga["gravados"] += gravados
+            liga["falhas"] += falhas  # Inclui página que não pôde ser lida
+
+    def jogo_falhou(unit, jogo):
+        with ligas_lock:
+            ligas[str(unit.league_id)]["falhas_jogos"].append(converter_timestamp((jogo or {}).get("time")))
+
+    with quota.job("fetch-new-games"):  # Prioridade alta mesmo dentro de outros modos (herdada pelo pipeline)
+        pipeline = criar_pipeline(
+            on_unit_done=pagina_concluida,
+            filtrar_jogos=filtrar_jogos,
+            stop_after=parar_na_pagina,
+            on_game_failed=jogo_falhou,
+        )
+        pipeline.run([WorkUnit(None, league_id, 1, None, 0, None) for league_id in ESOCCER_LEAGUE_IDS])
+
+    desistir_antes = datetime.now(pytz.utc) - timedelta(hours=INCREMENTAL_RETRY_HOURS)
+    total = 0
+    for league_id, liga in ligas.items():
+        total += liga["gravados"]
+        print(
+            f"Liga {league_id}: {liga['gravados']} jogos gravados em {liga['paginas']} página(s), {liga['falhas']} falhas."
+        )
+        # Interrompido ou página que não pôde ser lida: mantém a marca e revisita tudo na próxima execução
+        if not running or liga["falhas"] > len(liga["falhas_jogos"]):
+            continue
+        nova_marca = liga["mais_recente"]
+        for event_time in liga["falhas_jogos"]:
+            if event_time is None:
+                continue  # Jogo sem horário não é filtrado pela marca; volta sempre que aparecer
+            if event_time < desistir_antes:
+                print(f"Liga {league_id}: jogo de {event_time} falha há mais de {INCREMENTAL_RETRY_HOURS}h; a marca passa dele.")
+                continue
+            nova_marca = min(nova_marca, event_time - timedelta(seconds=1))
+        # A marca nunca recua: um jogo com falha dentro da sobreposição já é revisitado
+        if not nova_marca or (liga["watermark"] and nova_marca <= liga["watermark"]):
+            continue
+        try:
+            update_fetch_state(conn, f"new_games:{league_id}", timestamp=nova_marca, status="idle")
+            conn.commit()
+        except Exception as e:
+            print(f"Erro ao gravar a marca d'água da liga {league_id}: {e}")
+            conn.rollback()
+    return total
+
+
+def run_daily_update(conn):
     """Executa a limpeza e busca dos últimos 2 dias."""
     global running
     print("\n===== Iniciando Atualização Diária =====")
 
-    # 1. Deletar dados antigos (sempre executa)
+    # 1. Descartar dados antigos (sempre executa): DROP de partições ou DELETE
     try:
-        delete_old_events(conn, days_to_keep=60)
-        conn.commit()  # Commit após delete bem-sucedido
+        apply_retention(conn, days_to_keep=DAYS_TO_KEEP)
+        conn.commit()  # Commit após a limpeza bem-sucedida
     except Exception as e_del:
         print(f"Erro crítico durante a limpeza de eventos antigos: {e_del}")
         # Parar a execução se a limpeza falhar pode ser mais seguro
@@ -438,11 +408,11 @@ def run_daily_update(conn, api_client):
 
     # Processa ontem primeiro
     if running:
-        fetch_and_process_day(conn, api_client, ontem)
+        fetch_and_process_day(ontem)
 
     # Processa hoje
     if running:
-        fetch_and_process_day(conn, api_client, hoje)
+        fetch_and_process_day(hoje)
 
     print("\n===== Atualização Diária Finalizada =====")
 
@@ -463,7 +433,7 @@ def run_scheduled_score_updates(interval_minutes=30):
         try:
             print(f"\n[Atualização Agendada] Iniciando atualização de placares...")
 
-            # Cria uma nova conexão específica para esta tarefa
+            # Empresta uma conexão do pool compartilhado para esta tarefa
             conn = create_db_connection()
             api_client = BetsAPIClient()
 
@@ -473,9 +443,8 @@ def run_scheduled_score_updates(interval_minutes=30):
             except Exception as e:
                 print(f"[Atualização Agendada] Erro: {e}")
             finally:
-                # Garante que a conexão seja fechada
-                if conn:
-                    conn.close()
+                # Garante que a conexão volte ao pool
+                release_db_connection(conn)
 
             # Espera pelo próximo intervalo, verificando a flag running a cada 30 segundos
             wait_time = interval_minutes * 60
@@ -504,9 +473,21 @@ def backfill_esports(
     specific_leagues=None,
     update_scores=False,
     update_interval=30,
+    resume=False,
+    estimate_only=False,
 ):
-    """Processa eventos históricos (backfill) para datas e ligas específicas."""
-    print(f"Iniciando backfill com {workers} workers")
+    """
+    Processa eventos históricos (backfill) para datas e ligas específicas.
+    Cada página concluída é registrada em backfill_checkpoints; com resume=True
+    as unidades já concluídas numa execução anterior são puladas.
+    Antes de começar imprime o orçamento de chamadas; com estimate_only=True para aí.
+    """
+    # Os workers só fazem chamadas de odds; conexões do banco ficam com os estágios
+    # de páginas e de gravação do pipeline, então não há limite pelo DB_POOL_MAX
+    print(
+        f"Iniciando backfill com {workers} workers de odds "
+        f"({PIPELINE_PAGE_WORKERS} de páginas, {PIPELINE_DB_WRITERS} de gravação)"
+    )
 
     # Configura datas de início e fim
     if start_date_str:
@@ -561,10 +542,8 @@ def backfill_esports(
 
     # Se a atualização de placares estiver habilitada, inicia a thread de atualização
     score_update_thread = None
-    if update_scores:
+    if update_scores and not estimate_only:
         print(f"Habilitando atualização automática de placares a cada {update_interval} minutos")
-        import threading
-
         score_update_thread = threading.Thread(
             target=run_scheduled_score_updates,
             args=(update_interval,),
@@ -572,41 +551,72 @@ def backfill_esports(
         )
         score_update_thread.start()
 
-    try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            # Criar um dict para mapear futures para suas respectivas tarefas
-            futures = {executor.submit(process_task, task): task for task in tasks}
-
-            # Processar os resultados à medida que as tarefas são concluídas
-            for future in concurrent.futures.as_completed(futures):
-                completed_tasks += 1
+    checkpoints = CheckpointWriter()
 
-                if not running:
-                    print("Interrupção detectada. Cancelando tarefas restantes...")
-                    executor.shutdown(wait=False, cancel_futures=True)
-                    break
-
-                task = futures[future]
-                date_str, league_id = task
-
-                # Mostrar progresso
-                progress = (completed_tasks / total_tasks) * 100
+    try:
+        # 1. Estima o tamanho de cada liga pelo histórico e carrega checkpoints anteriores
+        concluidas, conhecidas = set(), {}
+        with get_db_connection() as conn:
+            estimativas = estimar_por_historico(conn, leagues_to_process)
+            ensure_checkpoint_table(conn)
+            # Dias locais podem cair no dia UTC vizinho; a folga evita a partição DEFAULT
+            ensure_partitions(conn, start_date - timedelta(days=1), end_date + timedelta(days=1))
+            if resume:
+                concluidas, conhecidas = load_checkpoints(conn, [task[0] for task in tasks], leagues_to_process)
+                print(f"Retomando: {len(concluidas)} páginas já concluídas serão puladas.")
+
+        # 2. Orçamento pelo histórico e sonda a página 1 apenas das tarefas sem checkpoint de página 1
+        conhecidas = {task: conhecidas[(task[0], str(task[1]))] for task in tasks if (task[0], str(task[1])) in conhecidas}
+        chamadas_por_jogo = 2 if buscar_historico_odds else 1  # Resumo de odds (+ histórico completo)
+        previstas = planejar_unidades(tasks, {}, estimativas, conhecidas, concluidas)
+        imprimir_orcamento("previsto pelo histórico", orcamento_de_chamadas(previstas, chamadas_por_jogo), chamadas_por_jogo)
+        if estimate_only:
+            return 0
+        a_sondar = [task for task in tasks if task not in conhecidas]
+        primeiras = sondar_primeiras_paginas(a_sondar, buscar_primeira_pagina, workers, estimativas)
+
+        # 3. Divide as tarefas em páginas e ordena da maior para a menor (LPT)
+        units = planejar_unidades(tasks, primeiras, estimativas, conhecidas, concluidas)
+        total_units = len(units)
+        print(f"Total de unidades (páginas) a processar: {total_units}")
+        imprimir_orcamento("após a sondagem", orcamento_de_chamadas(units, chamadas_por_jogo), chamadas_por_jogo)
+
+        jogos_por_tarefa = {task: 0 for task in tasks}
+        falhas_por_tarefa = {task: 0 for task in tasks}
+        progresso_lock = threading.Lock()
+        completed_units = 0
+
+        def pagina_concluida(unit, page, total_pages, total, gravados, falhas):
+            """Chamado pelo pipeline quando todos os jogos de uma página foram gravados (ou falharam)."""
+            nonlocal completed_units
+            task = (unit.date_str, unit.league_id)
+            with progresso_lock:
+                completed_units += 1
+                jogos_por_tarefa[task] += gravados
+                falhas_por_tarefa[task] += falhas
+                progress = min(completed_units / total_units * 100, 100.0) if total_units else 100.0
                 print(
-                    f"Progresso: {completed_tasks}/{total_tasks} ({progress:.1f}%) - Processando dia {date_str}, liga {league_id}"
+                    f"Progresso: {completed_units}/{total_units} ({progress:.1f}%) - "
+                    f"dia {unit.date_str}, liga {unit.league_id}, página {page}"
                 )
+            if falhas == 0 and running:
+                checkpoints.mark_done(unit.date_str, unit.league_id, page, total_pages, total, gravados)
 
-                try:
-                    result = future.result()
-                    if result is not None and result > 0:
-                        games_processed += result
-                        successful_tasks += 1
-                        print(f"✓ Tarefa concluída: dia {date_str}, liga {league_id} - {result} jogos processados")
-                    else:
-                        failed_tasks += 1
-                        print(f"✗ Tarefa falhou ou sem jogos: dia {date_str}, liga {league_id}")
-                except Exception as e:
-                    failed_tasks += 1
-                    print(f"✗ Erro na tarefa para dia {date_str}, liga {league_id}: {e}")
+        # 4. Pipeline: páginas -> odds (workers) -> gravação em lote, na ordem planejada
+        pipeline = criar_pipeline(on_unit_done=pagina_concluida, odds_workers=workers)
+        stats = pipeline.run(units)
+        if not running:
+            print("Interrupção detectada. Unidades restantes foram canceladas.")
+        if stats["pages_failed"]:
+            print(f"Aviso: {stats['pages_failed']} páginas não puderam ser lidas da API.")
+
+        for task in tasks:
+            completed_tasks += 1
+            if jogos_por_tarefa[task] > 0 and falhas_por_tarefa[task] == 0:
+                successful_tasks += 1
+            elif falhas_por_tarefa[task] > 0:
+                failed_tasks += 1
+            games_processed += jogos_por_tarefa[task]
     except KeyboardInterrupt:
         print("Interrompido pelo usuário. Finalizando tarefas...")
         running = False
@@ -614,6 +624,9 @@ def backfill_esports(
         print(f"Erro durante o backfill: {e}")
         traceback.print_exc()
     finally:
+        # Persiste o progresso acumulado antes de sair (inclusive em SIGTERM)
+        checkpoints.flush()
+
         # Sinaliza para a thread de atualização de placares parar
         running = False
 
@@ -630,176 +643,280 @@ def backfill_esports(
     return games_processed
 
 
-def process_task(params):
-    """Processa uma tarefa de dia/liga específica em thread paralela."""
-    date_str, league_id = params
-    thread_conn = None  # Inicializa como None para verificar mais tarde
+def imprimir_orcamento(rotulo, orcamento, chamadas_por_jogo):
+    """Mostra as chamadas previstas de um backfill contra a cota restante da hora."""
+    paginas, jogos, chamadas = orcamento
+    horas = quota.budget_hours(chamadas, API_REQUESTS_PER_SECOND)
+    restante = quota.remaining()
+    print(
+        f"Orçamento de API ({rotulo}): até {chamadas} chamadas ({paginas} páginas + {jogos} jogos x {chamadas_por_jogo}), "
+        f"~{horas:.1f}h de cota; {restante} chamadas restantes nesta hora."
+    )
+    if chamadas > restante - QUOTA_RESERVE_CALLS:
+        print(
+            f"  O backfill pausa quando restarem {QUOTA_RESERVE_CALLS} chamadas na hora "
+            f"(reservadas para novos jogos e placares) e continua na hora seguinte."
+        )
 
-    try:
-        # Cria conexões dedicadas para esta thread
-        thread_conn = create_db_connection()  # Esta função retorna uma conexão direta, não um context manager
-        if not thread_conn:
-            print(f"ERRO: Não foi possível criar conexão com o banco para dia {date_str}, liga {league_id}")
-            return 0
 
-        thread_api_client = BetsAPIClient()
+_thread_local = threading.local()
 
-        # Converte a string de data para objeto datetime
-        target_date = datetime.strptime(date_str, "%Y%m%d").date()
 
-        # Processa eventos para esta combinação de dia/liga
-        result = fetch_and_process_league_day(thread_conn, thread_api_client, target_date, league_id)
+def get_thread_api_client():
+    """Um BetsAPIClient por thread, reaproveitado entre unidades (sessão HTTP aquecida)."""
+    client = getattr(_thread_local, "api_client", None)
+    if client is None:
+        client = BetsAPIClient()
+        _thread_local.api_client = client
+    return client
 
-        return result
-    except Exception as e:
-        league_name = next(
-            (name for id, name in zip(ESOCCER_LEAGUE_IDS, ESOCCER_LEAGUE_NAMES) if id == league_id),
-            f"Unknown League {league_id}",
-        )
-        print(f"ERRO na tarefa para {date_str}, liga {league_name}: {e}")
-        traceback.print_exc()
-        return 0
-    finally:
-        # Garante que a conexão seja fechada corretamente
-        if thread_conn:
-            try:
-                thread_conn.close()
-                print(f"Conexão fechada para tarefa {date_str}, liga {league_id}")
-            except Exception as e:
-                print(f"Erro ao fechar conexão: {e}")
 
+def buscar_pagina(date_str, league_id, page):
+    """Busca uma página de eventos encerrados de uma liga em um dia (sem dia: os mais recentes; sem liga: todas)."""
+    return get_thread_api_client().get_ended_events(
+        page=page,
+        sport_id=TARGET_SPORT_ID,
+        day_str=date_str,
+        league_id=league_id,  # Filtra diretamente pela liga na API
+    )
 
-def fetch_and_process_league_day(conn, api_client, target_date, league_id):
-    """Busca e processa todos os eventos de uma liga específica para um dia específico."""
-    day_str = target_date.strftime("%Y%m%d")
-    league_name = next(
-        (name for id, name in zip(ESOCCER_LEAGUE_IDS, ESOCCER_LEAGUE_NAMES) if id == league_id), league_id
+
+def buscar_primeira_pagina(task):
+    """Sonda a página 1 de uma tarefa (dia, liga) para estimar seu tamanho."""
+    date_str, league_id = task
+    return buscar_pagina(date_str, league_id, 1)
+
+
+def criar_pipeline(
+    on_unit_done=None, odds_workers=PIPELINE_ODDS_WORKERS, filtrar_jogos=None, stop_after=None, on_game_failed=None
+):
+    """
+    Monta o IngestionPipeline com as funções deste módulo.
+    Cada estágio empresta conexões do pool só pelo tempo de uso e cada thread usa o seu BetsAPIClient.
+    'filtrar_jogos(unit, jogos)' descarta jogos da página antes da classificação
+    e 'stop_after(unit, page, jogos)' encerra a unidade antes da última página.
+    """
+
+    def fetch_page(unit, page):
+        return buscar_pagina(unit.date_str, unit.league_id, page)
+
+    def select_games(unit, jogos):
+        if filtrar_jogos is not None:
+            jogos = filtrar_jogos(unit, jogos)
+        classificados, _ = classifier.classify_page(jogos)
+        if not classificados:
+            return []
+        with get_db_connection() as db:
+            com_odds = ids_com_odds(db, [jogo for jogo, _ in classificados])
+        return [
+            (jogo, motivo, str(jogo.get("id")).isdigit() and int(jogo["id"]) not in com_odds)
+            for jogo, motivo in classificados
+        ]
+
+    def prepare_game(jogo, motivo, buscar_odds):
+        return preparar_jogo(get_thread_api_client(), jogo, buscar_odds=buscar_odds, motivo=motivo)
+
+    def save_batch(eventos, odds_list, historico):
+        with get_db_connection() as db:
+            return gravar_lote(db, eventos, odds_list, historico)
+
+    return IngestionPipeline(
+        fetch_page=fetch_page,
+        select_games=select_games,
+        prepare_game=prepare_game,
+        save_batch=save_batch,
+        should_run=lambda: running,
+        on_unit_done=on_unit_done,
+        on_game_failed=on_game_failed,
+        page_info=lambda event_data, unit: tamanho_pela_pagina(event_data, unit.task_size),
+        stop_after=stop_after,
+        odds_workers=odds_workers,
     )
 
-    # Verificar se a conexão é válida
-    if not hasattr(conn, "cursor"):
-        print(f"ERRO: Conexão inválida para dia {day_str}, liga {league_id}. Objeto conn não possui método cursor.")
-        return 0
 
-    print(f"\nIniciando busca para o dia {day_str}, liga {league_name} (ID: {league_id})")
+def update_pending_scores(conn, api_client):
+    """Atualiza placares de jogos passados que ainda não têm placar registrado."""
+    print("===== Iniciando atualização de placares pendentes =====")
 
-    current_page = 1
-    total_jogos = 0
-    falhas = 0
+    start_time = time.time()
+    with quota.job("update-scores"):  # Prioridade alta mesmo na thread de placares do backfill
+        updated_count = update_pending_event_scores(conn)
 
-    while True:
-        try:
-            event_data = api_client.get_ended_events(
-                page=current_page,
-                sport_id=TARGET_SPORT_ID,
-                day_str=day_str,
-                league_id=league_id,  # Filtra diretamente pela liga na API
-            )
+    duration = time.time() - start_time
+    print(f"===== Atualização de placares concluída em {duration:.2f} segundos =====")
+    print(f"Total de eventos atualizados: {updated_count}")
 
-            if not event_data:
-                print(f"Erro crítico ao buscar dados para {day_str}, liga {league_id}, página {current_page}.")
-                break
+    return updated_count
 
-            jogos = event_data.get("results", [])
-            pager = event_data.get("pager")
 
-            if not jogos:
-                if current_page == 1:
-                    print(f"Nenhum jogo encontrado para o dia {day_str}, liga {league_id}.")
-                else:
-                    print(f"Fim dos jogos para o dia {day_str}, liga {league_id} na página {current_page-1}.")
+def backfill_odds_history(days=DAYS_TO_KEEP, workers=4, batch_size=200):
+    """
+    Busca o histórico completo de odds (/v2/event/odds) dos eventos da janela que
+    ainda não o têm, em lotes: 'workers' threads buscam e cada lote é gravado num commit.
+    """
+    print(f"===== Iniciando ingestão do histórico de odds ({days} dias, {workers} workers) =====")
+    with get_db_connection() as conn:
+        ensure_odds_history_table(conn)
+
+    def buscar(item):
+        event_id, event_timestamp = item
+        event_odds = get_thread_api_client().get_event_odds(event_id, final=True, event_timestamp=event_timestamp)
+        return parse_event_odds(event_odds, event_id, event_timestamp)
+
+    eventos_total = ticks_total = 0
+    antes = None
+    start_time = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        while running:
+            with get_db_connection() as conn:
+                pendentes = events_without_history(conn, days, limit=batch_size, antes=antes)
+            if not pendentes:
                 break
+            antes = (pendentes[-1][1], pendentes[-1][0])  # Chave (event_timestamp, event_id) da próxima página
+            ticks = []
+            for resultado in executor.map(buscar, pendentes):
+                ticks.extend(resultado)
+            with get_db_connection() as conn:
+                ticks_total += insert_odds_history_bulk(conn, ticks)
+            eventos_total += len(pendentes)
+            print(f"Histórico de odds: {eventos_total} eventos, {ticks_total} ticks gravados até {antes[0]}.")
 
-            print(
-                f"Processando {len(jogos)} eventos de eSoccer da página {current_page} para {day_str}, liga {league_id}..."
-            )
+    duration = time.time() - start_time
+    print(f"===== Histórico de odds concluído em {duration:.2f} segundos: {ticks_total} ticks de {eventos_total} eventos =====")
+    return ticks_total
 
-            processados = 0
-            falhas_pagina = 0
 
-            for jogo in jogos:
-                try:
-                    result = processar_jogo(conn, api_client, jogo)
-                    if result:
-                        processados += 1
-                        try:
-                            conn.commit()  # Confirma as alterações após processar cada jogo com sucesso
-                        except Exception as commit_error:
-                            print(f"Erro ao fazer commit após processar jogo {jogo.get('id')}: {commit_error}")
-                            falhas_pagina += 1
-                    else:
-                        falhas_pagina += 1
-                        try:
-                            if hasattr(conn, "rollback"):
-                                conn.rollback()  # Desfaz as alterações se houver falha
-                            else:
-                                print(
-                                    f"AVISO: Não foi possível fazer rollback para o jogo {jogo.get('id')}, objeto conn não possui método rollback"
-                                )
-                        except Exception as rollback_error:
-                            print(f"Erro ao fazer rollback para jogo {jogo.get('id')}: {rollback_error}")
-                except Exception as e:
-                    print(f"Erro ao processar jogo {jogo.get('id')}: {e}")
-                    try:
-                        if hasattr(conn, "rollback"):
-                            conn.rollback()  # Tenta fazer rollback
-                        else:
-                            print(
-                                f"AVISO: Não foi possível fazer rollback para o jogo {jogo.get('id')}, objeto conn não possui método rollback"
-                            )
-                    except Exception as rollback_error:
-                        print(f"Erro ao fazer rollback para jogo {jogo.get('id')}: {rollback_error}")
-                    falhas_pagina += 1
-
-            total_jogos += processados
-            falhas += falhas_pagina
-
-            # Verificar se há mais páginas
-            if pager and "page" in pager and "total_pages" in pager:
-                current_page = int(pager["page"]) + 1
-                if current_page > int(pager["total_pages"]):
-                    print(f"Fim das páginas para o dia {day_str}, liga {league_id}.")
-                    break
-            else:
-                print(
-                    f"Aviso: Informações de paginação ausentes. Abortando após primeira página para {day_str}, liga {league_id}."
-                )
-                break
+def run_daemon():
+    """
+    Processo de longa duração que substitui o cron: busca de novos jogos,
+    atualização de placares e limpeza rodam como jobs periódicos no mesmo
+    processo, reaproveitando o pool de conexões, a sessão HTTP e os caches.
+    Encerra graciosamente quando signal_handler desliga a flag 'running'.
+    """
+    print("===== Iniciando coletor em modo daemon =====")
+    metrics_server = start_metrics_server(METRICS_PORT, METRICS_HOST)
+    # O job de placares mantém sua sessão HTTP aquecida; a busca de novos jogos usa as threads do pipeline
+    scores_client = BetsAPIClient()
 
-            # Pausa para evitar problemas de rate limit
-            time.sleep(REQUEST_DELAY_SECONDS)
+    def job_fetch_new_games():
+        with get_db_connection() as conn:
+            novos = fetch_new_games(conn)
+            print(f"[Daemon] {novos} novos jogos gravados.")
 
-        except Exception as e:
-            print(f"Erro ao processar página {current_page} para dia {day_str}, liga {league_id}: {e}")
-            traceback.print_exc()
-            falhas += 1
-            break  # Sai do loop em caso de erro na página inteira
+    def job_update_scores():
+        with get_db_connection() as conn:
+            update_pending_scores(conn, scores_client)
 
-    print(f"Concluído dia {day_str}, liga {league_id}: {total_jogos} jogos processados, {falhas} falhas.")
-    return total_jogos
+    def job_retention():
+        with get_db_connection() as conn:
+            apply_retention(conn, days_to_keep=DAYS_TO_KEEP)
 
+    scheduler = PeriodicScheduler(should_run=lambda: running)
+    scheduler.add_job("fetch-new-games", DAEMON_FETCH_INTERVAL_SECONDS, job_fetch_new_games)
+    scheduler.add_job("update-scores", DAEMON_SCORES_INTERVAL_SECONDS, job_update_scores)
+    scheduler.add_job("retention", DAEMON_RETENTION_INTERVAL_SECONDS, job_retention)
 
-def update_pending_scores(conn, api_client):
-    """Atualiza placares de jogos passados que ainda não têm placar registrado."""
-    print("===== Iniciando atualização de placares pendentes =====")
+    try:
+        scheduler.run_forever()
+    finally:
+        scheduler.shutdown()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    print("===== Coletor daemon finalizado =====")
 
-    start_time = time.time()
-    updated_count = update_pending_event_scores(conn)
 
-    duration = time.time() - start_time
-    print(f"===== Atualização de placares concluída em {duration:.2f} segundos =====")
-    print(f"Total de eventos atualizados: {updated_count}")
+def run_live(api_client):
+    """
+    Acompanha os jogos ao vivo das ligas de eSoccer até o processo ser interrompido.
+    Cada liga é consultada no seu próprio intervalo adaptativo (ver collector/live.py).
+    """
+    print("===== Iniciando acompanhamento ao vivo =====")
+    metrics_server = start_metrics_server(METRICS_PORT, METRICS_HOST)
+    poller = LivePoller(api_client, fetch_odds=buscar_historico_odds)
+    with get_db_connection() as conn:
+        ensure_live_tables(conn)
+        print(f"{poller.restore(conn)} jogos ao vivo retomados do banco.")
+
+    try:
+        while running:
+            league_id, quando = poller.next_due()
+            espera = quando - time.monotonic()
+            if espera > 0:
+                time.sleep(min(espera, 1.0))  # Acorda a cada segundo para checar 'running'
+                continue
+            try:
+                with get_db_connection() as conn:
+                    intervalo = poller.poll_league(conn, league_id)
+            except Exception as e:
+                print(f"Erro no polling ao vivo da liga {league_id}: {e}")
+                traceback.print_exc()
+                intervalo = LIVE_INTERVAL_SECONDS
+            poller.schedule(league_id, intervalo)
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    print("===== Acompanhamento ao vivo finalizado =====")
 
-    return updated_count
+
+def run_upcoming(api_client):
+    """
+    Insere os jogos agendados antes do início e captura as odds pré-jogo de cada um
+    pouco antes do apito, até o processo ser interrompido (ver collector/upcoming.py).
+    """
+    print("===== Iniciando coleta de jogos agendados =====")
+    metrics_server = start_metrics_server(METRICS_PORT, METRICS_HOST)
+    agenda = UpcomingScheduler(api_client)
+    proxima_leitura = 0.0
+
+    try:
+        while running:
+            agora = time.time()
+            if agora >= proxima_leitura:
+                try:
+                    with get_db_connection() as conn:
+                        agenda.refresh(conn)
+                except Exception as e:
+                    print(f"Erro ao atualizar os jogos agendados: {e}")
+                    traceback.print_exc()
+                proxima_leitura = time.time() + UPCOMING_REFRESH_SECONDS
+                continue
+
+            quando = agenda.next_due()
+            if quando is None or quando > agora:
+                proximo = min(quando, proxima_leitura) if quando is not None else proxima_leitura
+                time.sleep(min(proximo - agora, 1.0))  # Acorda a cada segundo para checar 'running'
+                continue
+            try:
+                with get_db_connection() as conn:
+                    agenda.run_due(conn)
+            except Exception as e:
+                print(f"Erro ao capturar odds pré-jogo: {e}")
+                traceback.print_exc()
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    print("===== Coleta de jogos agendados finalizada =====")
 
 
 def main():
+    global buscar_historico_odds
     parser = argparse.ArgumentParser(description="Coletor de dados da BetsAPI com janela de 60 dias.")
     parser.add_argument(
         "--mode",
-        choices=["daily", "backfill", "update-scores", "fetch-new-games"],
+        choices=[
+            "daily",
+            "backfill",
+            "update-scores",
+            "fetch-new-games",
+            "daemon",
+            "odds-history",
+            "rebuild-aggregates",
+            "live",
+            "upcoming",
+            "quota",
+        ],
         default="daily",
-        help="Modo de execução: 'daily' (padrão) para atualização diária, 'backfill' para busca histórica, 'update-scores' para atualizar placares pendentes, 'fetch-new-games' para buscar apenas novos jogos.",
+        help="Modo de execução: 'daily' (padrão) para atualização diária, 'backfill' para busca histórica, 'update-scores' para atualizar placares pendentes, 'fetch-new-games' para buscar apenas novos jogos, 'daemon' para rodar continuamente com agendador interno, 'odds-history' para buscar o histórico completo de odds dos eventos já gravados, 'rebuild-aggregates' para recalcular player_stats/team_stats/league_daily_stats, player_h2h e player_form a partir de events, 'live' para acompanhar os jogos em andamento (placar a cada poucos segundos), 'upcoming' para inserir os jogos agendados e capturar as odds pré-jogo antes do início, 'quota' para mostrar o uso da cota da API nas últimas 24h por modo e endpoint.",
     )
     parser.add_argument(
         "--workers", type=int, default=4, help="Número de workers para execução paralela (somente no modo backfill)."
@@ -825,9 +942,42 @@ def main():
         default=30,
         help="Intervalo em minutos entre as atualizações de placares durante o backfill (padrão: 30).",
     )
+    parser.add_argument(
+        "--full-scan",
+        action="store_true",
+        help="No modo fetch-new-games, varre todas as páginas de hoje e amanhã em vez da busca incremental.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="No modo backfill, pula as páginas já concluídas numa execução anterior (backfill_checkpoints).",
+    )
+    parser.add_argument(
+        "--estimate-only",
+        action="store_true",
+        help="No modo backfill, só imprime o orçamento de chamadas de API previsto e sai.",
+    )
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        help="Grava o resumo de métricas (JSON) neste arquivo ao final da execução.",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile",
+        metavar="PREFIXO",
+        help="Roda o modo sob o profiler por amostragem e grava PREFIXO.wall.folded, PREFIXO.cpu.folded e PREFIXO.json (padrão: profile).",
+    )
+    parser.add_argument(
+        "--odds-history",
+        action="store_true",
+        help="Busca também o histórico completo de odds (/v2/event/odds) de cada jogo novo (ODDS_HISTORY_ENABLED=1).",
+    )
     args = parser.parse_args()
 
     print(f"Executando em modo: {args.mode}")
+    buscar_historico_odds = buscar_historico_odds or args.odds_history
     if args.mode == "backfill":
         print(f"Configuração: {args.days} dias com {args.workers} workers em paralelo.")
         if args.start_date:
@@ -840,12 +990,32 @@ def main():
         print(f"Placares pendentes serão atualizados a cada {args.update_interval} minutos durante o backfill.")
 
     api_client = BetsAPIClient()
+    quota.set_mode(args.mode)
+    usage_writer = None
+
+    if args.profile:
+        iniciar_profiling()
 
     try:
+        usage_writer = ApiUsageWriter().start()  # Contagem de chamadas por modo/endpoint em api_usage
+
+        with get_db_connection() as conn:
+            ensure_event_columns(conn)  # events.upcoming em bancos criados antes da coluna
+
+        if AGGREGATES_ENABLED and args.mode != "rebuild-aggregates":
+            with get_db_connection() as conn:
+                ensure_aggregate_tables(conn)
+                ensure_h2h_tables(conn)
+
+        if buscar_historico_odds:
+            print("Histórico completo de odds será gravado em odds_history.")
+            with get_db_connection() as conn:
+                ensure_odds_history_table(conn)
+
         if args.mode == "daily":
             # Atualização diária usa uma única conexão gerenciada
             with get_db_connection() as conn:
-                run_daily_update(conn, api_client)
+                run_daily_update(conn)
 
                 # Atualiza placares pendentes se solicitado
                 if args.update_scores_after:
@@ -860,10 +1030,12 @@ def main():
                 limit_days=args.days,
                 update_scores=args.update_scores_during,
                 update_interval=args.update_interval,
+                resume=args.resume,
+                estimate_only=args.estimate_only,
             )
 
             # Atualiza placares pendentes após o backfill, se solicitado
-            if args.update_scores_after and not args.update_scores_during:
+            if args.update_scores_after and not args.update_scores_during and not args.estimate_only:
                 with get_db_connection() as conn:
                     update_pending_scores(conn, api_client)
 
@@ -876,23 +1048,60 @@ def main():
             # Modo que busca apenas novos jogos, sem atualizar placares ou fazer limpeza
             print("===== Iniciando busca por novos jogos =====")
 
-            # Busca jogos de hoje e amanhã para garantir cobertura completa
-            local_tz = pytz.timezone(TIMEZONE)
-            hoje = datetime.now(local_tz)
-            amanha = hoje + timedelta(days=1)
-
             with get_db_connection() as conn:
-                # Busca eventos apenas para hoje e amanhã
-                fetch_and_process_day(conn, api_client, hoje)
-                fetch_and_process_day(conn, api_client, amanha)
+                if args.full_scan:
+                    # Varredura completa de hoje e amanhã (comportamento antigo)
+                    local_tz = pytz.timezone(TIMEZONE)
+                    hoje = datetime.now(local_tz)
+                    amanha = hoje + timedelta(days=1)
+                    fetch_and_process_day(hoje)
+                    fetch_and_process_day(amanha)
+                else:
+                    # Busca incremental: só páginas mais novas que a marca d'água de cada liga
+                    novos = fetch_new_games(conn)
+                    print(f"Total de novos jogos gravados: {novos}")
 
             print("===== Busca por novos jogos concluída =====")
 
+        elif args.mode == "daemon":
+            run_daemon()
+
+        elif args.mode == "odds-history":
+            backfill_odds_history(days=args.days, workers=args.workers)
+
+        elif args.mode == "live":
+            run_live(api_client)
+
+        elif args.mode == "upcoming":
+            run_upcoming(api_client)
+
+        elif args.mode == "quota":
+            with get_db_connection() as conn:
+                linhas = get_api_usage(conn, hours=24)
+            print(f"Uso da cota nas últimas 24h ({quota.remaining()} chamadas restantes nesta hora):")
+            for linha in linhas:
+                print(
+                    f"  {linha['mode']:<20} {linha['endpoint']:<28} {linha['calls']:>8} chamadas "
+                    f"({linha['rate_limited']} 429s, {linha['hours_active']}h ativas)"
+                )
+
+        elif args.mode == "rebuild-aggregates":
+            with get_db_connection() as conn:
+                rebuild_aggregates(conn)
+                rebuild_head_to_head(conn)
+
     except Exception as e:
         print(f"Erro inesperado não tratado na execução principal ({args.mode}): {e}")
         traceback.print_exc()
         sys.exit(1)  # Sai com erro
     finally:
+        if args.profile:
+            finalizar_profiling(args.profile)
+        print_metrics_summary(args.metrics_out)
+        if usage_writer is not None:
+            usage_writer.stop()
+        close_db_pool()
+        print_cache_stats()
         status = "concluído" if running else "interrompido"
         print(f"Coletor ({args.mode}) {status}.")
 
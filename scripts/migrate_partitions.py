@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script para converter as tabelas events/odds em tabelas particionadas por tempo
+(ver db/partitions.py). As tabelas antigas ficam como *_legacy.
+"""
+import argparse
+
+from db.database import get_db_connection
+from db.partitions import migrate_to_partitions, list_partitions
+from config.settings import PARTITION_INTERVAL
+
+
+def migrate(interval, drop_legacy=False):
+    """Migra numa única transação; qualquer erro desfaz tudo."""
+    print("=== Migração para tabelas particionadas ===")
+
+    try:
+        with get_db_connection() as conn:
+            if not migrate_to_partitions(conn, interval):
+                return
+            if drop_legacy:
+                with conn.cursor() as cur:
+                    cur.execute("DROP TABLE IF EXISTS odds_history_legacy;")
+                    cur.execute("DROP TABLE odds_legacy;")
+                    cur.execute("DROP TABLE events_legacy;")
+                print("Tabelas *_legacy removidas.")
+            for table in ("events", "odds", "odds_history"):
+                print(f"{table}: {len(list_partitions(conn, table))} partições")
+
+        print("\n=== Migração concluída ===")
+
+    except Exception as e:
+        print(f"Erro na migração (nada foi alterado): {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte events/odds em tabelas particionadas.")
+    parser.add_argument("--interval", choices=("day", "week"), default=PARTITION_INTERVAL, help="Tamanho de cada partição.")
+    parser.add_argument("--drop-legacy", action="store_true", help="Remove events_legacy/odds_legacy após copiar.")
+    args = parser.parse_args()
+    migrate(args.interval, args.drop_legacy)
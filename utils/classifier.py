@@ -0,0 +1,118 @@
+# utils/classifier.py
+import re
+
+from config.settings import ESOCCER_LEAGUE_IDS
+
+# Palavras-chave que indicam eSoccer
+ESOCCER_KEYWORDS = ("esoccer", "soccer", "fifa", "pes", "pro evolution", "efootball")
+
+# Palavras-chave que indicam outros eSports (não eSoccer)
+OTHER_ESPORTS_KEYWORDS = (
+    "cs:",
+    "cs go",
+    "counter-strike",
+    "dota",
+    "league of legends",
+    "lol",
+    "valorant",
+    "overwatch",
+    "starcraft",
+    "hearthstone",
+    "rocket league",
+)
+
+# Motivos de classificação
+POR_ID = "id"  # Liga está em ESOCCER_LEAGUE_IDS
+POR_FORMATO = "formato"  # Nome da liga ou formato "Time (Jogador)" indica eSoccer
+
+
+def _compilar(keywords):
+    """Uma única regex com todas as palavras-chave (mesma semântica de 'kw in texto')."""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords), re.IGNORECASE)
+
+
+class EsoccerClassifier:
+    """
+    Classificador de jogos de eSoccer construído uma vez por processo.
+
+    - IDs de liga num frozenset (lookup O(1)).
+    - Palavras-chave compiladas numa regex por grupo, em vez de any(...) sobre listas.
+    - O veredito pelo nome da liga é memorizado por league_id, então cada liga
+      distinta é analisada uma única vez, mesmo em varreduras com milhares de jogos.
+    """
+
+    def __init__(self, league_ids=ESOCCER_LEAGUE_IDS):
+        self.league_ids = frozenset(str(league_id) for league_id in league_ids)
+        self._esoccer_re = _compilar(ESOCCER_KEYWORDS)
+        self._outros_re = _compilar(OTHER_ESPORTS_KEYWORDS)
+        self._veredito_por_liga = {}
+
+    def is_known_league(self, league_id):
+        return league_id is not None and str(league_id) in self.league_ids
+
+    def _veredito_nome(self, league_name):
+        """True (eSoccer), False (outro eSport) ou None (nome não decide)."""
+        if not league_name:
+            return None
+        if self._esoccer_re.search(league_name):
+            return True
+        if self._outros_re.search(league_name):
+            return False
+        return None
+
+    def veredito_liga(self, league_id, league_name):
+        chave = league_id if league_id is not None else league_name
+        try:
+            return self._veredito_por_liga[chave]
+        except KeyError:
+            veredito = self._veredito_nome(league_name)
+            self._veredito_por_liga[chave] = veredito
+            return veredito
+
+    @staticmethod
+    def _formato_jogador(home_team, away_team):
+        """Padrão típico de jogos de eSoccer: "Time (Jogador)"."""
+        for team in (home_team, away_team):
+            if team and "(" in team and ")" in team:
+                return True
+        return False
+
+    def is_esoccer(self, league_id, league_name, home_team, away_team):
+        """Mesma regra de main.is_esoccer_game, com o veredito da liga memorizado."""
+        veredito = self.veredito_liga(league_id, league_name)
+        if veredito is not None:
+            return veredito
+        return self._formato_jogador(home_team, away_team)
+
+    def classify(self, jogo):
+        """Retorna POR_ID, POR_FORMATO ou None (não é eSoccer) para um jogo da API."""
+        league = jogo.get("league") or {}
+        league_id = league.get("id")
+        if self.is_known_league(league_id):
+            return POR_ID
+        home_team = (jogo.get("home") or {}).get("name", "")
+        away_team = (jogo.get("away") or {}).get("name", "")
+        if self.is_esoccer(league_id, league.get("name", ""), home_team, away_team):
+            return POR_FORMATO
+        return None
+
+    def classify_page(self, jogos):
+        """
+        Classifica cada jogo da página exatamente uma vez.
+        Retorna (selecionados, contagens): selecionados é uma lista de (jogo, motivo)
+        só com jogos de eSoccer; contagens traz {POR_ID, POR_FORMATO, "ignorados"}.
+        """
+        selecionados = []
+        contagens = {POR_ID: 0, POR_FORMATO: 0, "ignorados": 0}
+        for jogo in jogos:
+            motivo = self.classify(jogo)
+            if motivo is None:
+                contagens["ignorados"] += 1
+                continue
+            contagens[motivo] += 1
+            selecionados.append((jogo, motivo))
+        return selecionados, contagens
+
+
+# Instância única por processo
+classifier = EsoccerClassifier()
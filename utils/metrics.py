@@ -0,0 +1,289 @@
+# utils/metrics.py
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Precisão dos histogramas: 2^5 sub-faixas por potência de 2 (erro relativo < ~3%)
+HISTOGRAM_SUB_BITS = 5
+HISTOGRAM_SCALE = 1_000_000  # Valores em segundos são guardados em microssegundos
+QUANTIS = (0.5, 0.9, 0.99)
+
+
+def _chave_labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_labels(chave, extra=()):
+    pares = list(chave) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+class Counter:
+    """Contador monotônico com labels (ex: requisições por endpoint)."""
+
+    tipo = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        chave = _chave_labels(labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + amount
+
+    def amostras(self):
+        with self._lock:
+            return list(self._valores.items())
+
+    def render(self):
+        return [f"{self.name}{_formatar_labels(chave)} {valor}" for chave, valor in self.amostras()]
+
+    def snapshot(self):
+        return [{"labels": dict(chave), "value": valor} for chave, valor in self.amostras()]
+
+
+class Gauge(Counter):
+    """Valor instantâneo. set_function() permite ler o valor na hora da coleta (ex: tamanho de fila)."""
+
+    tipo = "gauge"
+
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self._funcoes = {}
+
+    def set(self, value, **labels):
+        chave = _chave_labels(labels)
+        with self._lock:
+            self._valores[chave] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        chave = _chave_labels(labels)
+        with self._lock:
+            if fn is None:
+                self._funcoes.pop(chave, None)
+            else:
+                self._funcoes[chave] = fn
+
+    def amostras(self):
+        with self._lock:
+            valores = dict(self._valores)
+            funcoes = list(self._funcoes.items())
+        for chave, fn in funcoes:
+            try:
+                valores[chave] = fn()
+            except Exception:
+                continue  # Uma função quebrada não derruba a coleta inteira
+        return list(valores.items())
+
+
+class _Distribuicao:
+    """
+    Histograma no estilo HDR: buckets log-lineares com erro relativo limitado.
+    Cada potência de 2 é dividida em 2^HISTOGRAM_SUB_BITS faixas lineares, então
+    latências de microssegundos a minutos cabem em poucas centenas de buckets.
+    """
+
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def _indice(inteiro):
+        expoente = max(0, inteiro.bit_length() - HISTOGRAM_SUB_BITS)
+        return expoente, inteiro >> expoente
+
+    def record(self, value):
+        inteiro = max(0, int(value * HISTOGRAM_SCALE))
+        indice = self._indice(inteiro)
+        self.buckets[indice] = self.buckets.get(indice, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        alvo = max(1, int(round(q * self.count)))
+        acumulado = 0
+        for (expoente, mantissa) in sorted(self.buckets):
+            acumulado += self.buckets[(expoente, mantissa)]
+            if acumulado >= alvo:
+                # Ponto médio do bucket, limitado ao máximo observado
+                meio = ((mantissa << expoente) + ((1 << expoente) - 1) / 2) / HISTOGRAM_SCALE
+                return min(meio, self.max)
+        return self.max
+
+
+class Histogram:
+    """Histograma de latência com labels; exportado como summary (quantis, soma e contagem)."""
+
+    tipo = "summary"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        chave = _chave_labels(labels)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = _Distribuicao()
+            serie.record(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede a duração do bloco 'with' em segundos."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, **labels)
+
+    def _resumos(self):
+        with self._lock:
+            return [
+                (chave, serie.count, serie.total, serie.min, serie.max, [serie.quantile(q) for q in QUANTIS])
+                for chave, serie in self._series.items()
+            ]
+
+    def render(self):
+        linhas = []
+        for chave, count, total, _, _, quantis in self._resumos():
+            for q, valor in zip(QUANTIS, quantis):
+                linhas.append(f"{self.name}{_formatar_labels(chave, [('quantile', q)])} {valor:.6f}")
+            linhas.append(f"{self.name}_sum{_formatar_labels(chave)} {total:.6f}")
+            linhas.append(f"{self.name}_count{_formatar_labels(chave)} {count}")
+        return linhas
+
+    def snapshot(self):
+        resumo = []
+        for chave, count, total, minimo, maximo, quantis in self._resumos():
+            item = {"labels": dict(chave), "count": count, "sum": round(total, 6), "min": minimo, "max": maximo}
+            for q, valor in zip(QUANTIS, quantis):
+                item[f"p{int(q * 100)}"] = round(valor, 6)
+            resumo.append(item)
+        return resumo
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo. counter()/gauge()/histogram() retornam a métrica existente se já criada."""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _obter(self, cls, name, help_text):
+        with self._lock:
+            metrica = self._metricas.get(name)
+            if metrica is None:
+                metrica = self._metricas[name] = cls(name, help_text)
+            elif type(metrica) is not cls:
+                raise ValueError(f"Métrica '{name}' já registrada com outro tipo ({metrica.tipo}).")
+            return metrica
+
+    def counter(self, name, help_text=""):
+        return self._obter(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._obter(Gauge, name, help_text)
+
+    def histogram(self, name, help_text=""):
+        return self._obter(Histogram, name, help_text)
+
+    def _ordenadas(self):
+        with self._lock:
+            return sorted(self._metricas.values(), key=lambda metrica: metrica.name)
+
+    def render_prometheus(self):
+        """Formato texto de exposição do Prometheus (versão 0.0.4)."""
+        linhas = []
+        for metrica in self._ordenadas():
+            linhas.append(f"# HELP {metrica.name} {metrica.help}")
+            linhas.append(f"# TYPE {metrica.name} {metrica.tipo}")
+            linhas.extend(metrica.render())
+        return "\n".join(linhas) + "\n"
+
+    def snapshot(self):
+        """Resumo serializável em JSON de todas as métricas com pelo menos uma amostra."""
+        resumo = {"uptime_seconds": round(time.time() - self.started_at, 3)}
+        for metrica in self._ordenadas():
+            valores = metrica.snapshot()
+            if valores:
+                resumo[metrica.name] = valores
+        return resumo
+
+
+# Instância única por processo
+registry = MetricsRegistry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Não polui o log com cada scrape
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Serve /metrics (formato Prometheus) numa thread daemon. Retorna o servidor ou None se port=0."""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Aviso: Não foi possível iniciar o servidor de métricas em {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Métricas disponíveis em http://{host}:{port}/metrics")
+    return server
+
+
+def print_metrics_summary(path=None):
+    """Imprime o resumo das métricas em JSON (uma linha) e, se 'path' for informado, grava em arquivo."""
+    resumo = registry.snapshot()
+    print(f"Métricas: {json.dumps(resumo, ensure_ascii=False, sort_keys=True, default=str)}")
+    if path:
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(resumo, f, ensure_ascii=False, indent=2, sort_keys=True, default=str)
+            print(f"Resumo de métricas gravado em {path}")
+        except OSError as e:
+            print(f"Aviso: Não foi possível gravar métricas em {path}: {e}")
+    return resumo
@@ -0,0 +1,242 @@
+# utils/profiling.py
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+from config.settings import PROFILE_SAMPLE_INTERVAL
+
+# Seções só medem quando o profiling está ligado (--profile); fora disso custam uma checagem
+_ativo = False
+_secoes = {}  # nome -> [chamadas, wall, cpu]
+_secoes_lock = threading.Lock()
+_NULO = nullcontext()
+
+
+class _Secao:
+    """Mede wall time e CPU da thread atual (time.thread_time) de um bloco."""
+
+    __slots__ = ("nome", "medir_cpu", "wall0", "cpu0")
+
+    def __init__(self, nome, medir_cpu):
+        self.nome = nome
+        self.medir_cpu = medir_cpu
+
+    def __enter__(self):
+        self.cpu0 = time.thread_time() if self.medir_cpu else 0.0
+        self.wall0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall0
+        cpu = time.thread_time() - self.cpu0 if self.medir_cpu else None
+        with _secoes_lock:
+            acumulado = _secoes.setdefault(self.nome, [0, 0.0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += wall
+            if cpu is not None:
+                acumulado[2] += cpu
+        return False
+
+
+def section(nome, cpu=True):
+    """
+    Context manager que acumula wall e CPU de um subsistema (ex: "http_wait").
+    Em corrotinas use cpu=False: enquanto a corrotina espera, a thread roda outras
+    e o thread_time não pertenceria só a esta seção.
+    """
+    if not _ativo:
+        return _NULO
+    return _Secao(nome, cpu)
+
+
+def _cpu_da_thread(native_id):
+    """Ticks de CPU (utime + stime) de uma thread, lidos de /proc (Linux). None se indisponível."""
+    try:
+        with open(f"/proc/self/task/{native_id}/stat", "rb") as f:
+            campos = f.read().rsplit(b")", 1)[1].split()
+        return int(campos[11]) + int(campos[12])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _nome_thread(nome):
+    """Agrupa threads do mesmo estágio (odds-0, odds-1 ... -> odds)."""
+    base, _, sufixo = nome.rpartition("-")
+    if base and sufixo.isdigit():
+        return base
+    base, _, sufixo = nome.rpartition("_")
+    return base if base and sufixo.isdigit() else nome
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem de todas as threads (sys._current_frames).
+
+    A cada 'interval' segundos registra a pilha Python de cada thread em formato
+    "folded" (compatível com flamegraph.pl, inferno e speedscope). No Linux também
+    lê o tempo de CPU de cada thread em /proc: amostras em que a thread consumiu
+    CPU desde a anterior entram também na pilha "cpu", separando o que queima CPU
+    do que só está esperando rede, fila ou banco.
+    """
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.wall_stacks = Counter()
+        self.cpu_stacks = Counter()
+        self.samples = 0
+        self._cpu_anterior = {}
+        self._codigos = {}  # code object -> "arquivo.py:funcao"
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def _formatar(self, frame):
+        partes = []
+        while frame is not None:
+            code = frame.f_code
+            nome = self._codigos.get(code)
+            if nome is None:
+                nome = self._codigos[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+            partes.append(nome)
+            frame = frame.f_back
+        partes.reverse()
+        return ";".join(partes)
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == proprio:
+                continue
+            thread = threads.get(ident)
+            nome = _nome_thread(thread.name) if thread else str(ident)
+            pilha = f"{nome};{self._formatar(frame)}"
+            self.wall_stacks[pilha] += 1
+
+            native_id = getattr(thread, "native_id", None)
+            if native_id is None:
+                continue
+            cpu = _cpu_da_thread(native_id)
+            anterior = self._cpu_anterior.get(native_id)
+            self._cpu_anterior[native_id] = cpu
+            if cpu is not None and anterior is not None and cpu > anterior:
+                self.cpu_stacks[pilha] += 1
+        self.samples += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._amostrar()
+            except Exception as e:
+                print(f"Aviso: Falha ao amostrar pilhas do profiler: {e}")
+
+    def start(self):
+        self.started_at = (time.perf_counter(), time.process_time())
+        self._thread = threading.Thread(target=self._loop, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        wall0, cpu0 = self.started_at
+        self.wall = time.perf_counter() - wall0
+        self.cpu = time.process_time() - cpu0
+
+    @staticmethod
+    def _escrever_folded(path, stacks):
+        with open(path, "w", encoding="utf-8") as f:
+            for pilha, contagem in stacks.most_common():
+                f.write(f"{pilha} {contagem}\n")
+
+    def top_funcoes(self, stacks, n=15):
+        """Funções com mais amostras no topo da pilha (tempo próprio)."""
+        proprio = Counter()
+        for pilha, contagem in stacks.items():
+            proprio[pilha.rsplit(";", 1)[-1]] += contagem
+        return proprio.most_common(n)
+
+
+_profiler = None
+
+
+def iniciar_profiling(interval=PROFILE_SAMPLE_INTERVAL):
+    """Liga as seções e inicia o profiler por amostragem."""
+    global _ativo, _profiler
+    with _secoes_lock:
+        _secoes.clear()
+    _ativo = True
+    _profiler = SamplingProfiler(interval)
+    _profiler.start()
+    print(f"Profiling ativo (amostragem a cada {interval * 1000:.0f} ms).")
+    return _profiler
+
+
+def finalizar_profiling(prefixo="profile"):
+    """
+    Para o profiler e grava:
+    - <prefixo>.wall.folded: pilhas de todas as amostras (flamegraph de wall time)
+    - <prefixo>.cpu.folded: só amostras em que a thread consumiu CPU
+    - <prefixo>.json: wall vs CPU por seção e funções mais amostradas
+    Imprime um resumo e retorna o relatório.
+    """
+    global _ativo, _profiler
+    if _profiler is None:
+        return None
+    profiler = _profiler
+    profiler.stop()
+    _ativo = False
+    _profiler = None
+
+    with _secoes_lock:
+        secoes = {nome: list(valores) for nome, valores in _secoes.items()}
+
+    relatorio = {
+        "wall_seconds": round(profiler.wall, 3),
+        "process_cpu_seconds": round(profiler.cpu, 3),
+        "cpu_utilization": round(profiler.cpu / profiler.wall, 3) if profiler.wall else 0.0,
+        "samples": profiler.samples,
+        "sections": {
+            nome: {
+                "calls": chamadas,
+                "wall_seconds": round(wall, 3),
+                "cpu_seconds": round(cpu, 3),
+                "cpu_share_of_process": round(cpu / profiler.cpu, 3) if profiler.cpu else 0.0,
+            }
+            for nome, (chamadas, wall, cpu) in sorted(secoes.items(), key=lambda item: -item[1][1])
+        },
+        "top_self_cpu": profiler.top_funcoes(profiler.cpu_stacks),
+        "top_self_wall": profiler.top_funcoes(profiler.wall_stacks),
+    }
+
+    try:
+        SamplingProfiler._escrever_folded(f"{prefixo}.wall.folded", profiler.wall_stacks)
+        SamplingProfiler._escrever_folded(f"{prefixo}.cpu.folded", profiler.cpu_stacks)
+        with open(f"{prefixo}.json", "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"Aviso: Não foi possível gravar os arquivos de profiling ({prefixo}.*): {e}")
+
+    print("\n===== Profiling =====")
+    print(
+        f"Wall: {relatorio['wall_seconds']:.1f}s | CPU do processo: {relatorio['process_cpu_seconds']:.1f}s "
+        f"({relatorio['cpu_utilization'] * 100:.0f}% de um núcleo) | {profiler.samples} amostras"
+    )
+    print(f"{'Seção':<20}{'Chamadas':>10}{'Wall (s)':>12}{'CPU (s)':>12}{'% CPU proc.':>13}")
+    for nome, dados in relatorio["sections"].items():
+        print(
+            f"{nome:<20}{dados['calls']:>10}{dados['wall_seconds']:>12.2f}{dados['cpu_seconds']:>12.2f}"
+            f"{dados['cpu_share_of_process'] * 100:>12.1f}%"
+        )
+    if relatorio["top_self_cpu"]:
+        print("Funções com mais CPU (amostras no topo da pilha):")
+        for funcao, contagem in relatorio["top_self_cpu"][:10]:
+            print(f"  {contagem:>6}  {funcao}")
+    print(f"Flamegraphs: {prefixo}.wall.folded, {prefixo}.cpu.folded | Relatório: {prefixo}.json")
+    return relatorio
@@ -0,0 +1,82 @@
+# utils/scheduler.py
+import threading
+import time
+import traceback
+
+
+class PeriodicJob:
+    """Um job periódico. O lock impede duas execuções simultâneas do mesmo job."""
+
+    def __init__(self, name, interval_seconds, func, run_at_start=True):
+        self.name = name
+        self.interval = interval_seconds
+        self.func = func
+        self.next_run = time.monotonic() if run_at_start else time.monotonic() + interval_seconds
+        self.lock = threading.Lock()
+        self.thread = None
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+
+
+class PeriodicScheduler:
+    """
+    Agendador interno para o modo daemon.
+
+    Cada job roda na sua própria thread quando vence o intervalo. Se a execução
+    anterior ainda não terminou, a rodada é pulada (sem sobreposição, ao contrário
+    do cron). 'should_run' é consultado a cada tick para permitir parada graciosa.
+    """
+
+    def __init__(self, should_run, tick_seconds=1.0):
+        self.should_run = should_run
+        self.tick = tick_seconds
+        self.jobs = []
+
+    def add_job(self, name, interval_seconds, func, run_at_start=True):
+        job = PeriodicJob(name, interval_seconds, func, run_at_start)
+        self.jobs.append(job)
+        return job
+
+    def _run_job(self, job):
+        start = time.monotonic()
+        try:
+            print(f"[Daemon] Iniciando job '{job.name}'")
+            job.func()
+            job.runs += 1
+            print(f"[Daemon] Job '{job.name}' concluído em {time.monotonic() - start:.1f}s")
+        except Exception as e:
+            job.failures += 1
+            print(f"[Daemon] Erro no job '{job.name}': {e}")
+            traceback.print_exc()
+        finally:
+            job.lock.release()
+
+    def _dispatch(self, job, now):
+        # Agenda a próxima rodada a partir do horário previsto, não do término
+        job.next_run = max(job.next_run + job.interval, now)
+        if not job.lock.acquire(blocking=False):
+            job.skipped += 1
+            print(f"[Daemon] Job '{job.name}' ainda em execução; rodada pulada.")
+            return
+        job.thread = threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.name}", daemon=True)
+        job.thread.start()
+
+    def run_forever(self):
+        """Executa os jobs até should_run() retornar False."""
+        while self.should_run():
+            now = time.monotonic()
+            for job in self.jobs:
+                if now >= job.next_run:
+                    self._dispatch(job, now)
+            time.sleep(self.tick)
+
+    def shutdown(self, timeout=60):
+        """Aguarda os jobs em execução terminarem (até 'timeout' segundos no total)."""
+        deadline = time.monotonic() + timeout
+        for job in self.jobs:
+            if job.thread and job.thread.is_alive():
+                print(f"[Daemon] Aguardando job '{job.name}' terminar...")
+                job.thread.join(max(0, deadline - time.monotonic()))
+        for job in self.jobs:
+            print(f"[Daemon] Job '{job.name}': {job.runs} execuções, {job.skipped} puladas, {job.failures} falhas.")
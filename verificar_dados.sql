@@ -55,4 +55,20 @@ FROM events
 WHERE (final_score IS NULL OR final_score = '')
 AND event_timestamp < NOW() - INTERVAL '3 hours'
 ORDER BY event_timestamp DESC
-LIMIT 20; 
\ No newline at end of file
+LIMIT 20; 
+
+-- Mesmas contagens a partir dos agregados (db/aggregates.py), sem varrer events
+SELECT
+    league_id, MAX(league_name) AS league_name,
+    SUM(games) AS total_eventos,
+    SUM(scored_games) AS com_placar,
+    ROUND(100.0 * SUM(scored_games) / NULLIF(SUM(games), 0), 2) AS percentual_completo
+FROM league_daily_stats
+GROUP BY league_id
+ORDER BY total_eventos DESC;
+
+-- Jogadores com mais vitórias
+SELECT player_name, league_id, games, wins, draws, losses, goals_for, goals_against, last_game_at
+FROM player_stats
+ORDER BY wins DESC
+LIMIT 20;